@@ -0,0 +1,376 @@
+# bench/e2e.py
+"""
+Сквозной бенчмарк HTTP-роутов на синтетических данных.
+
+Перед каждым режимом каталог .bench/ создаётся заново: БД .bench/db.sqlite
+(миграции + seed_data synthetic), блобы, спулы и метрики прогона; затем студенты и преподаватели одновременно ходят
+по роутам:
+    студент:       /student/course/{id} → /student/course/{id}/module/{id}
+                   → /student/submit-test/{id} → /student/submit/{id}
+    преподаватель: /teacher/dashboard
+
+Режимы:
+    asgi    — приложение в этом же процессе (httpx.ASGITransport, с startup/shutdown)
+    uvicorn — отдельный процесс uvicorn, запросы по HTTP
+
+Для каждого роута — число запросов, rps, p50/p95/p99 и ошибки. Результат
+сравнивается с backend/bench/baseline.json: если p95 вырос или rps упал
+больше чем на --tolerance, скрипт завершается с кодом 1.
+
+Запуск из корня репозитория:
+    python -m backend.bench.e2e
+    python -m backend.bench.e2e --modes asgi --students 100 --rounds 5 --no-compare
+    python -m backend.bench.e2e --save-baseline     # после осознанного изменения
+
+Baseline зависит от машины: снимайте его там же, где сравниваете (CI-раннер).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from backend.bench.load_students import percentile
+
+BENCH_DIR = Path(".bench")
+BENCH_DB = BENCH_DIR / "db.sqlite"
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+ROUTES = ["course", "module", "submit-test", "submit", "teacher-dashboard"]
+# Разные файлы решений, но из небольшого набора — хранилище блобов не растёт от прогона к прогону
+SAMPLE_FILES = 20
+# p95 быстрых роутов шумит на единицы мс — такой рост регрессией не считаем
+MIN_DELTA_MS = 5.0
+SERVER_START_TIMEOUT = 60
+
+
+def bench_env() -> dict:
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{BENCH_DB}"
+    env.pop("DATABASE_REPLICA_URL", None)
+    # Блобы, снимки метрик и кэш шаблонов прогона — тоже в .bench/, не в рабочей копии
+    env["UPLOAD_DIR"] = str(BENCH_DIR / "uploads")
+    env["SUBMISSION_SPOOL_DIR"] = str(BENCH_DIR / "spool" / "submissions")
+    env["METRICS_DIR"] = str(BENCH_DIR / "spool" / "metrics")
+    env["JINJA_CACHE_DIR"] = str(BENCH_DIR / "spool" / "jinja")
+    return env
+
+
+def seed(args) -> None:
+    """Свежая БД с синтетикой: прогоны сравнимы между собой."""
+    shutil.rmtree(BENCH_DIR, ignore_errors=True)
+    BENCH_DIR.mkdir(parents=True)
+    subprocess.run(
+        [
+            sys.executable, "-m", "backend.src.seed_data", "synthetic",
+            "--students", str(args.dataset_students), "--courses", str(args.dataset_courses),
+            "--seed", str(args.seed),
+        ],
+        env=bench_env(), check=True, stdout=subprocess.DEVNULL,
+    )
+
+
+def build_plan(args):
+    """
+    Кто и куда ходит: для каждого студента — курс, на который он записан,
+    модуль-задание, тест и файловое задание этого курса.
+    """
+    from sqlalchemy import create_engine, select
+    from backend.src.models import User, Enrollment, Module, Assignment
+    from backend.src.quiz import compile_quiz, NUMERIC, MULTI
+
+    db = create_engine(f"sqlite:///{BENCH_DB}")
+    try:
+        with db.connect() as conn:
+            assignments = conn.execute(
+                select(Module.course_id, Module.id, Assignment.id, Assignment.test_data)
+                .join(Assignment, Assignment.module_id == Module.id)
+            ).all()
+            enrollments = conn.execute(
+                select(User.email, Enrollment.course_id)
+                .join(Enrollment, Enrollment.user_id == User.id)
+                .where(Enrollment.role == "student", User.email.like("load-student-%"))
+                .order_by(User.id, Enrollment.course_id)
+            ).all()
+            teachers = conn.scalars(
+                select(User.email).where(User.role == "teacher", User.email.like("load-teacher-%")).order_by(User.id)
+            ).all()
+    finally:
+        db.dispose()
+
+    courses = {}
+    for course_id, module_id, assignment_id, test_data in assignments:
+        course = courses.setdefault(course_id, {"modules": [], "tests": [], "files": []})
+        course["modules"].append(module_id)
+        if test_data:
+            quiz = compile_quiz(test_data)
+            answers = [1.0 if q.kind == NUMERIC else [0] if q.kind == MULTI else 0 for q in quiz.questions]
+            course["tests"].append((assignment_id, answers))
+        else:
+            course["files"].append(assignment_id)
+
+    rng = random.Random(args.seed)
+    by_student = {}
+    for email, course_id in enrollments:
+        course = courses.get(course_id)
+        if course and course["tests"] and course["files"]:
+            by_student.setdefault(email, []).append(course_id)
+    emails = sorted(by_student)[:args.students]
+    if len(emails) < args.students:
+        raise SystemExit(f"В синтетике только {len(emails)} подходящих студентов — увеличьте --dataset-students")
+
+    students = []
+    for email in emails:
+        course_id = rng.choice(by_student[email])
+        course = courses[course_id]
+        test_id, answers = rng.choice(course["tests"])
+        students.append({
+            "email": email,
+            "course": f"/student/course/{course_id}",
+            "module": f"/student/course/{course_id}/module/{rng.choice(course['modules'])}",
+            "submit-test": (f"/student/submit-test/{test_id}", answers),
+            "submit": f"/student/submit/{rng.choice(course['files'])}",
+        })
+    return students, list(teachers[:args.teachers])
+
+
+class Recorder:
+    def __init__(self):
+        self.timings = {route: [] for route in ROUTES}
+        self.errors = {route: 0 for route in ROUTES}
+        self.enabled = True
+
+    async def call(self, route, request):
+        start = time.perf_counter()
+        try:
+            response = await request
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        if self.enabled:
+            self.timings[route].append((time.perf_counter() - start) * 1000)
+            self.errors[route] += failed
+
+
+async def student_session(client, plan, rounds, recorder, n):
+    for i in range(rounds):
+        await recorder.call("course", client.get(plan["course"]))
+        await recorder.call("module", client.get(plan["module"]))
+        path, answers = plan["submit-test"]
+        await recorder.call("submit-test", client.post(path, json={"answers": answers}))
+        content = f"# Решение {(n + i) % SAMPLE_FILES}\nprint({(n + i) % SAMPLE_FILES})\n".encode("utf-8")
+        await recorder.call("submit", client.post(plan["submit"], files={"file": ("solution.py", content)}))
+
+
+async def teacher_session(client, rounds, recorder):
+    for _ in range(rounds):
+        await recorder.call("teacher-dashboard", client.get("/teacher/dashboard"))
+
+
+async def drive(make_client, students, teachers, args):
+    """Вход (по очереди, до замера), прогрев, замер. Возвращает результаты по роутам."""
+    student_clients = [make_client() for _ in students]
+    teacher_clients = [make_client() for _ in teachers]
+    recorder = Recorder()
+    try:
+        for client, plan in zip(student_clients, students):
+            await client.post("/register", data={"email": plan["email"], "role": "student"})
+        for client, email in zip(teacher_clients, teachers):
+            await client.post("/register", data={"email": email, "role": "teacher"})
+
+        async def run_all(rounds):
+            await asyncio.gather(
+                *(student_session(c, p, rounds, recorder, n)
+                  for n, (c, p) in enumerate(zip(student_clients, students))),
+                *(teacher_session(c, rounds, recorder) for c in teacher_clients),
+            )
+
+        if args.warmup:
+            recorder.enabled = False
+            await run_all(args.warmup)
+            recorder.enabled = True
+        started = time.perf_counter()
+        await run_all(args.rounds)
+        elapsed = time.perf_counter() - started
+    finally:
+        for client in student_clients + teacher_clients:
+            await client.aclose()
+    return summarize(recorder, elapsed)
+
+
+def summarize(recorder, elapsed):
+    results = {}
+    everything = []
+    for route in ROUTES:
+        values = recorder.timings[route]
+        everything.extend(values)
+        if values:
+            results[route] = stats(values, elapsed, recorder.errors[route])
+    results["total"] = stats(everything, elapsed, sum(recorder.errors.values()))
+    return results
+
+
+def stats(values, elapsed, errors):
+    return {
+        "requests": len(values),
+        "rps": round(len(values) / elapsed, 1),
+        "p50": round(statistics.median(values), 1),
+        "p95": round(percentile(values, 95), 1),
+        "p99": round(percentile(values, 99), 1),
+        "errors": errors,
+    }
+
+
+async def run_asgi(students, teachers, args):
+    # Переменные окружения bench_env() уже выставлены — приложение откроет .bench/db.sqlite
+    from backend.src.main import app
+    from backend.src.database import dispose_engines
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        # startup/shutdown приложения: очередь write_behind и остальное, как под uvicorn
+        async with app.router.lifespan_context(app):
+            return await drive(
+                lambda: httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120),
+                students, teachers, args,
+            )
+    finally:
+        await dispose_engines()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_server(base_url, process):
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise SystemExit(f"uvicorn завершился с кодом {process.returncode}")
+            try:
+                await client.get("/")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise SystemExit(f"uvicorn не ответил за {SERVER_START_TIMEOUT} с")
+
+
+async def run_uvicorn(students, teachers, args):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    # Один воркер: ключ SessionMiddleware случайный на процесс, cookie другого воркера недействительна
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.src.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        env=bench_env(),
+    )
+    try:
+        await wait_for_server(base_url, process)
+        limits = httpx.Limits(max_connections=1)  # как браузер студента: одно соединение keep-alive
+        return await drive(
+            lambda: httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits),
+            students, teachers, args,
+        )
+    finally:
+        process.terminate()  # shutdown дописывает очередь сабмишенов
+        process.wait(timeout=60)
+
+
+MODES = {"asgi": run_asgi, "uvicorn": run_uvicorn}
+
+
+def print_results(mode, results):
+    print(f"\n[{mode}]")
+    for route, r in results.items():
+        print(
+            f"  {route:18s} {r['requests']:6d} запр. {r['rps']:8.1f} rps | "
+            f"p50={r['p50']:7.1f} мс p95={r['p95']:7.1f} мс p99={r['p99']:7.1f} мс | ошибок {r['errors']}"
+        )
+
+
+def compare(results, baseline, tolerance):
+    """Строки с регрессиями: ошибки, рост p95 и падение rps сверх допуска."""
+    problems = []
+    for mode, routes in results.items():
+        for route, r in routes.items():
+            if r["errors"]:
+                problems.append(f"{mode} {route}: {r['errors']} ошибок")
+            base = baseline.get(mode, {}).get(route)
+            if not base:
+                continue
+            if r["p95"] > base["p95"] * (1 + tolerance) and r["p95"] - base["p95"] > MIN_DELTA_MS:
+                problems.append(f"{mode} {route}: p95 {base['p95']} → {r['p95']} мс")
+            if route == "total" and r["rps"] < base["rps"] * (1 - tolerance):
+                problems.append(f"{mode} {route}: rps {base['rps']} → {r['rps']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--students", type=int, default=10, help="одновременных студентов")
+    parser.add_argument("--teachers", type=int, default=2, help="одновременных преподавателей")
+    parser.add_argument("--rounds", type=int, default=10, help="проходов сценария на пользователя")
+    parser.add_argument("--warmup", type=int, default=1, help="проходов до замера")
+    parser.add_argument("--dataset-students", type=int, default=2000)
+    parser.add_argument("--dataset-courses", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tolerance", type=float, default=0.3, help="допустимое ухудшение (0.3 = 30%%)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="записать результат как новый baseline")
+    parser.add_argument("--no-compare", action="store_true")
+    args = parser.parse_args()
+
+    # До импорта приложения: режим asgi читает настройки БД из окружения
+    os.environ.update(bench_env())
+    os.environ.pop("DATABASE_REPLICA_URL", None)
+
+    config = {
+        key: getattr(args, key)
+        for key in ("students", "teachers", "rounds", "warmup", "dataset_students", "dataset_courses", "seed")
+    }
+    results = {}
+    for mode in args.modes:
+        seed(args)
+        students, teachers = build_plan(args)
+        results[mode] = asyncio.run(MODES[mode](students, teachers, args))
+        print_results(mode, results[mode])
+
+    if args.save_baseline:
+        args.baseline.write_text(
+            json.dumps({"config": config, "results": results}, ensure_ascii=False, indent=2) + "\n",
+            encoding="utf-8",
+        )
+        print(f"\n✅ Baseline сохранён в {args.baseline}")
+        return
+    if args.no_compare:
+        return
+    if not args.baseline.exists():
+        print(f"\n⚠️ Нет baseline ({args.baseline}) — сохраните его флагом --save-baseline")
+        return
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if baseline["config"] != config:
+        print(f"\n⚠️ Baseline снят с другими параметрами: {baseline['config']}")
+    problems = compare(results, baseline["results"], args.tolerance)
+    for line in problems:
+        print(f"❌ {line}")
+    if problems:
+        sys.exit(1)
+    print(f"\n✅ Регрессий нет (допуск {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
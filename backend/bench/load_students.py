@@ -0,0 +1,189 @@
+# bench/load_students.py
+"""
+Нагрузочный бенчмарк: N одновременных студентов открывают страницы курса.
+
+Каждый студент входит под своей учётной записью синтетики
+(load-student-<n>@load.test) и ходит по курсу, на который записан, —
+курс и модуль берутся из той же БД, что у сервера (--database-url).
+
+Запуск (сервер уже поднят на синтетике из seed_data):
+    python -m backend.src.seed_data synthetic --students 2000 --courses 50
+    uvicorn backend.src.main:app --port 8000
+    python -m backend.bench.load_students --url http://localhost:8000 --students 200
+
+Выводит p50/p95/p99 задержки по каждому роуту. Сравнение «до/после»:
+снимите baseline на старой версии сервера и сравните с ним новую —
+p99 каждого роута не должен вырасти больше чем на --tolerance
+(иначе код возврата 1):
+    python -m backend.bench.load_students --save-baseline before.json
+    python -m backend.bench.load_students --baseline before.json
+
+Замер рядом с этим файлом: синтетика --students 2000 --courses 50,
+200 студентов × 5 проходов, один воркер uvicorn на 1 CPU (клиент на той же
+машине). load_students_sync.json — исходная синхронная версия (сессия
+SQLAlchemy прямо в async-роутах), load_students_async.json — асинхронные
+сессии:
+    p99 курса 8219 → 2815 мс, модуля 8240 → 2894 мс, 30 → 153 rps
+Повторные прогоны шумят (100–150 rps, p99 2.8–4.3 с), но p99 в 2–3 раза ниже синхронного.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROUTES = ["course", "module"]
+
+
+def percentile(values, p):
+    """Перцентиль по отсортированному списку (nearest-rank)."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = max(0, math.ceil(p / 100 * len(values)) - 1)
+    return values[k]
+
+
+def plan_students(database_url, count):
+    """
+    Для каждого из count студентов синтетики — email, курс, на который он
+    записан, и первый модуль этого курса.
+    """
+    from sqlalchemy import create_engine, func, select
+    from backend.src.models import User, Enrollment, Module
+
+    db = create_engine(database_url)
+    try:
+        with db.connect() as conn:
+            first_order = (
+                select(Module.course_id, func.min(Module.order).label("order"))
+                .group_by(Module.course_id)
+                .subquery()
+            )
+            first_module = dict(conn.execute(
+                select(Module.course_id, func.min(Module.id))
+                .join(first_order, (first_order.c.course_id == Module.course_id) & (first_order.c.order == Module.order))
+                .group_by(Module.course_id)
+            ).all())
+            enrollments = conn.execute(
+                select(User.email, func.min(Enrollment.course_id))
+                .join(Enrollment, Enrollment.user_id == User.id)
+                .where(Enrollment.role == "student", User.email.like("load-student-%"),
+                       Enrollment.course_id.in_(first_module))
+                .group_by(User.id)
+                .order_by(User.id)
+                .limit(count)
+            ).all()
+    finally:
+        db.dispose()
+
+    if len(enrollments) < count:
+        raise SystemExit(f"В БД только {len(enrollments)} студентов синтетики с курсами — нужно {count}")
+    return [
+        {
+            "email": email,
+            "course": f"/student/course/{course_id}",
+            "module": f"/student/course/{course_id}/module/{first_module[course_id]}",
+        }
+        for email, course_id in enrollments
+    ]
+
+
+async def student_session(client, plan, rounds, timings):
+    for _ in range(rounds):
+        for route in ROUTES:
+            start = time.perf_counter()
+            response = await client.get(plan[route])
+            timings[route].append((time.perf_counter() - start) * 1000)
+            # Редирект вместо страницы (не записан, не вошёл) — не замер страницы
+            if response.status_code != 200:
+                raise SystemExit(f"{plan['email']}: {plan[route]} → {response.status_code}")
+
+
+async def run(args):
+    students = plan_students(args.database_url, args.students)
+    timings = {route: [] for route in ROUTES}
+    clients = [httpx.AsyncClient(base_url=args.url, timeout=120) for _ in students]
+    try:
+        # Вход до замера, по очереди: cookie сессии остаётся в клиенте студента
+        for client, plan in zip(clients, students):
+            await client.post("/register", data={"email": plan["email"], "role": "student"})
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            student_session(client, plan, args.rounds, timings) for client, plan in zip(clients, students)
+        ))
+        elapsed = time.perf_counter() - started
+    finally:
+        for client in clients:
+            await client.aclose()
+
+    total = sum(len(v) for v in timings.values())
+    print(f"{args.students} студентов, {total} запросов за {elapsed:.2f} с ({total / elapsed:.1f} rps)")
+    results = {}
+    for route, values in timings.items():
+        results[route] = {
+            "p50": round(statistics.median(values), 1),
+            "p95": round(percentile(values, 95), 1),
+            "p99": round(percentile(values, 99), 1),
+        }
+        print(f"{route:10s} p50={results[route]['p50']:7.1f} мс p95={results[route]['p95']:7.1f} мс p99={results[route]['p99']:7.1f} мс")
+    results["rps"] = round(total / elapsed, 1)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Печатает p99 «было → стало» по роутам. Возвращает роуты, где p99 вырос сверх допуска."""
+    regressions = []
+    print(f"\n{'роут':10s} {'p99 было':>10s} {'p99 стало':>10s}")
+    for route, r in results.items():
+        base = baseline.get(route)
+        if route == "rps" or not base:
+            continue
+        change = (r["p99"] - base["p99"]) / base["p99"] if base["p99"] else 0.0
+        print(f"{route:10s} {base['p99']:8.1f} мс {r['p99']:8.1f} мс ({change:+.0%})")
+        if change > tolerance:
+            regressions.append(route)
+    if "rps" in baseline:
+        print(f"{'rps':10s} {baseline['rps']:10.1f} {results['rps']:10.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument(
+        "--database-url", default=os.environ.get("DATABASE_URL", "sqlite:///./db.sqlite"),
+        help="БД сервера: из неё берутся студенты синтетики и их курсы",
+    )
+    parser.add_argument("--save-baseline", type=Path, help="записать результат в файл (для сравнения)")
+    parser.add_argument("--baseline", type=Path, help="сравнить p99 с сохранённым результатом")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="допустимый рост p99 (0.3 = 30%%)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.save_baseline:
+        config = {key: getattr(args, key) for key in ("students", "rounds")}
+        args.save_baseline.write_text(
+            json.dumps({"config": config, "results": results}, ensure_ascii=False, indent=2) + "\n",
+            encoding="utf-8",
+        )
+        print(f"\n✅ Результат сохранён в {args.save_baseline}")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"\n❌ p99 вырос больше чем на {args.tolerance:.0%}: " + ", ".join(regressions))
+            sys.exit(1)
+        print(f"\n✅ Регрессий p99 нет (допуск {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
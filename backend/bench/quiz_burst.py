@@ -0,0 +1,110 @@
+# bench/quiz_burst.py
+"""
+Бенчмарк сдачи теста: N студентов одновременно отправляют ответы.
+
+Сравнивает запись сабмишена прямо в запросе (direct) и отложенную запись
+пачками (write-behind, backend/src/write_behind.py). Приложение работает
+в этом же процессе (httpx.ASGITransport), БД — ./db.sqlite с демо-данными.
+
+Запуск из корня репозитория (после seed_data):
+    python -m backend.bench.quiz_burst --students 1000 --assignment-id 8
+
+Для каждого режима: задержка ответа p50/p95/p99, ошибки, общее время и
+время до момента, когда все сабмишены действительно лежат в БД.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from sqlalchemy import select, func
+
+from backend.bench.load_students import percentile
+from backend.src.database import engine, dispose_engines
+from backend.src.main import app
+from backend.src.models import Assignment, Submission
+from backend.src.quiz import compile_quiz, NUMERIC, MULTI
+from backend.src.write_behind import submission_queue
+
+
+def valid_answers(assignment_id):
+    with engine.connect() as conn:
+        test_data = conn.execute(
+            select(Assignment.test_data).where(Assignment.id == assignment_id)
+        ).scalar()
+    if not test_data:
+        raise SystemExit(f"Задание {assignment_id} — не тест")
+    quiz = compile_quiz(test_data)
+    return [1.0 if q.kind == NUMERIC else [0] if q.kind == MULTI else 0 for q in quiz.questions]
+
+
+def count_submissions(assignment_id):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(func.count()).select_from(Submission).where(Submission.assignment_id == assignment_id)
+        ).scalar()
+
+
+async def login(client, email):
+    await client.post("/register", data={"email": email, "role": "student"})
+
+
+async def submit(client, assignment_id, answers, timings, errors):
+    start = time.perf_counter()
+    try:
+        response = await client.post(f"/student/submit-test/{assignment_id}", json={"answers": answers})
+        if response.status_code != 200:
+            errors.append(response.status_code)
+    except Exception as e:  # таймаут пула соединений и т.п.
+        errors.append(type(e).__name__)
+    timings.append((time.perf_counter() - start) * 1000)
+
+
+async def run_mode(mode, clients, assignment_id, answers):
+    before = count_submissions(assignment_id)
+    if mode == "write-behind":
+        await submission_queue.start()
+
+    timings, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(submit(c, assignment_id, answers, timings, errors) for c in clients))
+    answered = time.perf_counter() - started
+    if mode == "write-behind":
+        await submission_queue.stop()  # как shutdown: дописывает всё принятое
+    persisted = time.perf_counter() - started
+    stored = count_submissions(assignment_id) - before
+
+    print(
+        f"{mode:12s} ответы за {answered:6.2f} с, в БД за {persisted:6.2f} с | "
+        f"p50={statistics.median(timings):7.1f} мс p95={percentile(timings, 95):7.1f} мс "
+        f"p99={percentile(timings, 99):7.1f} мс | записано {stored}/{len(clients)}, ошибок {len(errors)}"
+    )
+
+
+async def run(args):
+    answers = valid_answers(args.assignment_id)
+    transport = httpx.ASGITransport(app=app)
+    clients = [httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) for _ in range(args.students)]
+    try:
+        # Вход — до замера и по очереди; у каждого студента своя cookie сессии
+        for i, client in enumerate(clients):
+            await login(client, f"bench-student-{i}@test.com")
+        for mode in args.modes:
+            await run_mode(mode, clients, args.assignment_id, answers)
+    finally:
+        for c in clients:
+            await c.aclose()
+        await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--assignment-id", type=int, default=8)
+    parser.add_argument("--modes", nargs="+", choices=["direct", "write-behind"], default=["direct", "write-behind"])
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# bench/recommender.py
+"""
+Бенчмарк TF-IDF рекомендаций на синтетическом каталоге (без БД).
+
+Запуск из корня репозитория:
+    python -m backend.bench.recommender --courses 50000
+"""
+import argparse
+import random
+import time
+
+from backend.src.ml_recommender import SimpleRecommender
+
+
+def synthetic_courses(n, vocabulary_size, seed=0):
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(vocabulary_size)]
+    tags = [f"tag{i}" for i in range(vocabulary_size // 20)]
+    for course_id in range(1, n + 1):
+        yield (
+            course_id,
+            " ".join(rng.choices(vocabulary, k=5)),
+            " ".join(rng.choices(vocabulary, k=30)),
+            ",".join(rng.choices(tags, k=3)),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=50_000)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=1_000)
+    parser.add_argument("--history", type=int, default=3, help="курсов в истории пользователя")
+    parser.add_argument("--batch", type=int, default=64)
+    args = parser.parse_args()
+
+    recommender = SimpleRecommender()
+    started = time.perf_counter()
+    recommender.load_rows(synthetic_courses(args.courses, args.vocabulary))
+    recommender.recommend_for_user([1])  # строит матрицу
+    print(f"Индекс: {args.courses} курсов, {len(recommender.vocabulary)} термов, {time.perf_counter() - started:.2f} с")
+
+    rng = random.Random(1)
+    histories = [rng.sample(range(1, args.courses + 1), args.history) for _ in range(args.queries)]
+
+    started = time.perf_counter()
+    for history in histories:
+        recommender.recommend_for_user(history, k=5)
+    per_query = (time.perf_counter() - started) / args.queries * 1000
+    print(f"recommend_for_user: {per_query:.3f} мс/запрос")
+
+    started = time.perf_counter()
+    for i in range(0, args.queries, args.batch):
+        recommender.recommend_for_users(histories[i:i + args.batch], k=5)
+    per_user = (time.perf_counter() - started) / args.queries * 1000
+    print(f"recommend_for_users (батч {args.batch}): {per_user:.3f} мс/пользователь")
+
+    started = time.perf_counter()
+    recommender.upsert_course(args.courses + 1, "new course", "term1 term2 term3", "tag1")
+    recommender.recommend_for_user([args.courses + 1], k=5)
+    print(f"Добавление курса + первый запрос: {(time.perf_counter() - started) * 1000:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
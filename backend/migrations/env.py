@@ -0,0 +1,66 @@
+# migrations/env.py
+"""
+Окружение Alembic. URL и движок — из backend.src.database (DATABASE_URL,
+PRAGMA профиля SQLite), метаданные — из моделей.
+
+SQLite не умеет большинство ALTER TABLE, поэтому миграции идут в batch-режиме
+(Alembic пересоздаёт таблицу с новой схемой).
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from backend.src.database import engine
+from backend.src.models import Base
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # Таблицы FTS5 (courses_fts и её теневые) создаются миграцией, а не моделями —
+    # autogenerate не должен предлагать их удалить
+    return not (type_ == "table" and name.startswith("courses_fts"))
+
+
+def run_migrations_offline():
+    """SQL-скрипт без подключения: alembic upgrade head --sql."""
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # migrate.upgrade_database передаёт своё соединение; alembic CLI — нет
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+    with engine.connect() as connection:
+        _run(connection)
+
+
+def _run(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=True,
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
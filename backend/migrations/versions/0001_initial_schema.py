@@ -0,0 +1,98 @@
+"""Исходная схема (как её создавал Base.metadata.create_all)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String()),
+        sa.Column("name", sa.String()),
+        sa.Column("role", sa.String()),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "courses",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("tags", sa.String()),
+        sa.Column("content", sa.Text()),
+        sa.Column("author", sa.String()),
+    )
+    op.create_index("ix_courses_id", "courses", ["id"])
+
+    op.create_table(
+        "modules",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id"), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("content", sa.Text()),
+        sa.Column("order", sa.Integer()),
+    )
+    op.create_index("ix_modules_id", "modules", ["id"])
+
+    op.create_table(
+        "assignments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("module_id", sa.Integer(), sa.ForeignKey("modules.id"), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("deadline", sa.DateTime()),
+        sa.Column("test_data", sa.Text()),
+    )
+    op.create_index("ix_assignments_id", "assignments", ["id"])
+
+    op.create_table(
+        "videos",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("module_id", sa.Integer(), sa.ForeignKey("modules.id"), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("video_url", sa.String()),
+        sa.Column("video_type", sa.String()),
+    )
+    op.create_index("ix_videos_id", "videos", ["id"])
+
+    op.create_table(
+        "submissions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("assignment_id", sa.Integer(), sa.ForeignKey("assignments.id"), nullable=False),
+        sa.Column("student_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("file_path", sa.String()),
+        sa.Column("status", sa.String()),
+        sa.Column("feedback", sa.Text()),
+        sa.Column("grade", sa.Integer()),
+        sa.Column("submitted_at", sa.DateTime()),
+        sa.Column("test_answers", sa.Text()),
+    )
+    op.create_index("ix_submissions_id", "submissions", ["id"])
+
+    op.create_table(
+        "enrollments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id"), nullable=False),
+        sa.Column("role", sa.String(), nullable=False),
+    )
+    op.create_index("ix_enrollments_id", "enrollments", ["id"])
+
+
+def downgrade():
+    for table in ("enrollments", "submissions", "videos", "assignments", "modules", "courses", "users"):
+        op.drop_table(table)
@@ -0,0 +1,82 @@
+"""Прогресс студентов, хранилище блобов, поиск FTS5, индексы сабмишенов
+
+Всё это раньше создавал create_all при импорте database.py, поэтому в уже
+работающей БД часть объектов может быть: каждый шаг проверяет, есть ли он.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from backend.src.search import ensure_course_fts, drop_course_fts
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def _columns(inspector, table):
+    return {column["name"] for column in inspector.get_columns(table)}
+
+
+def _indexes(inspector, table):
+    return {index["name"] for index in inspector.get_indexes(table)}
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    tables = set(inspector.get_table_names())
+
+    if "max_upload_bytes" not in _columns(inspector, "assignments"):
+        op.add_column("assignments", sa.Column("max_upload_bytes", sa.Integer()))
+    if "file_name" not in _columns(inspector, "submissions"):
+        op.add_column("submissions", sa.Column("file_name", sa.String()))
+
+    indexes = _indexes(inspector, "submissions")
+    if "ix_submissions_assignment_student" not in indexes:
+        op.create_index("ix_submissions_assignment_student", "submissions", ["assignment_id", "student_id"])
+    if "ix_submissions_status_submitted_at" not in indexes:
+        op.create_index("ix_submissions_status_submitted_at", "submissions", ["status", "submitted_at"])
+
+    if "student_progress" not in tables:
+        op.create_table(
+            "student_progress",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id"), nullable=False),
+            sa.Column("completed", sa.Integer(), nullable=False),
+            sa.Column("total", sa.Integer(), nullable=False),
+            sa.Column("last_activity", sa.DateTime()),
+            sa.UniqueConstraint("user_id", "course_id", name="uq_student_progress_user_course"),
+        )
+        op.create_index("ix_student_progress_id", "student_progress", ["id"])
+
+    if "blobs" not in tables:
+        op.create_table(
+            "blobs",
+            sa.Column("sha256", sa.String(64), primary_key=True),
+            sa.Column("size", sa.Integer(), nullable=False),
+            sa.Column("refcount", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+        )
+
+    # Полнотекстовый индекс каталога (только SQLite; для остальных СУБД поиск через ILIKE)
+    ensure_course_fts(conn)
+
+
+def downgrade():
+    drop_course_fts(op.get_bind())
+    op.drop_table("blobs")
+    op.drop_index("ix_student_progress_id", table_name="student_progress")
+    op.drop_table("student_progress")
+    op.drop_index("ix_submissions_status_submitted_at", table_name="submissions")
+    op.drop_index("ix_submissions_assignment_student", table_name="submissions")
+    with op.batch_alter_table("submissions") as batch:
+        batch.drop_column("file_name")
+    with op.batch_alter_table("assignments") as batch:
+        batch.drop_column("max_upload_bytes")
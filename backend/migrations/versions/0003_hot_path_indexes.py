@@ -0,0 +1,46 @@
+"""Индексы под горячие запросы и уникальность записи на курс
+
+Enrollment(user_id, course_id) — уникальное ограничение (его индекс
+обслуживает проверку записи на курс), Enrollment(course_id),
+Module(course_id, order), Assignment(module_id), Video(module_id).
+Submission(assignment_id, student_id) и Submission(status, submitted_at)
+уже есть с 0002. Проверка планов: python -m backend.src.migrate check-indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Дубли записей на курс (раньше ничего не мешало) — оставляем самую раннюю
+    op.execute(sa.text(
+        """
+        DELETE FROM enrollments WHERE id NOT IN (
+            SELECT MIN(id) FROM enrollments GROUP BY user_id, course_id
+        )
+        """
+    ))
+    with op.batch_alter_table("enrollments") as batch:
+        batch.create_unique_constraint("uq_enrollments_user_course", ["user_id", "course_id"])
+    op.create_index("ix_enrollments_course_id", "enrollments", ["course_id"])
+    op.create_index("ix_modules_course_order", "modules", ["course_id", "order"])
+    op.create_index("ix_assignments_module_id", "assignments", ["module_id"])
+    op.create_index("ix_videos_module_id", "videos", ["module_id"])
+
+
+def downgrade():
+    op.drop_index("ix_videos_module_id", table_name="videos")
+    op.drop_index("ix_assignments_module_id", table_name="assignments")
+    op.drop_index("ix_modules_course_order", table_name="modules")
+    op.drop_index("ix_enrollments_course_id", table_name="enrollments")
+    with op.batch_alter_table("enrollments") as batch:
+        batch.drop_constraint("uq_enrollments_user_course", type_="unique")
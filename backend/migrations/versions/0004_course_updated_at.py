@@ -0,0 +1,30 @@
+"""Время изменения курса (courses.updated_at)
+
+Индекс рекомендаций в каждом воркере периодически подтягивает курсы,
+изменённые после прошлой синхронизации: WHERE updated_at >= ?. Уже
+существующим курсам ставится время миграции.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("courses", sa.Column("updated_at", sa.DateTime()))
+    op.execute(sa.text("UPDATE courses SET updated_at = CURRENT_TIMESTAMP"))
+    op.create_index("ix_courses_updated_at", "courses", ["updated_at"])
+
+
+def downgrade():
+    op.drop_index("ix_courses_updated_at", table_name="courses")
+    with op.batch_alter_table("courses") as batch:
+        batch.drop_column("updated_at")
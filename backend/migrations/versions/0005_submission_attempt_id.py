@@ -0,0 +1,30 @@
+"""Ключ попытки сабмишена (submissions.attempt_id)
+
+Отложенная запись (write_behind) дописывает каждому сабмишену теста
+уникальный ключ ещё в журнале. Если процесс упал между commit пачки и
+удалением её журнала, повторная досылка находит уже записанные ключи и
+не создаёт дубли. У сабмишенов, записанных в запросе, ключа нет (NULL).
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("submissions", sa.Column("attempt_id", sa.String()))
+    op.create_index("ix_submissions_attempt_id", "submissions", ["attempt_id"], unique=True)
+
+
+def downgrade():
+    op.drop_index("ix_submissions_attempt_id", table_name="submissions")
+    with op.batch_alter_table("submissions") as batch:
+        batch.drop_column("attempt_id")
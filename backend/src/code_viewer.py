@@ -0,0 +1,152 @@
+# src/code_viewer.py
+"""
+Постраничный просмотр файлов сабмишенов.
+
+Файл не читается целиком: для блоба один раз строится индекс начал строк
+(np.ndarray смещений), он сохраняется рядом с кэшами блоба в
+uploads/cache/line_index/<sha256>.v<версия>.npy и держится в LRU процесса.
+Конец строки — \\n, \\r\\n или одиночный \\r (как у highlighter, иначе
+строки подсветки разъедутся со строками файла).
+Нужный диапазон строк читается через mmap, и не больше VIEW_MAX_BYTES
+за запрос — так даже 50-мегабайтный CSV не раздувает память воркера.
+"""
+import hashlib
+import mmap
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .storage import CACHE_DIR, BLOB_DIR
+
+LINE_INDEX_DIR = CACHE_DIR / "line_index"
+# Меняется вместе с правилом разбиения на строки — старые индексы на диске не читаются
+LINE_INDEX_VERSION = 2
+# Сколько строк отдаём за один HTMX-запрос
+VIEW_PAGE_LINES = 200
+# И не больше стольких байт (длинные строки обрезаются)
+VIEW_MAX_BYTES = 256 * 1024
+# Индекс строится кусками, чтобы временный bool-массив не рос с размером файла
+INDEX_CHUNK_BYTES = 8 * 1024 * 1024
+
+
+@dataclass
+class LinePage:
+    lines: List[Tuple[int, str]]  # (номер строки с 1, текст)
+    total_lines: int
+    next_start: Optional[int]  # номер первой строки следующей страницы
+    truncated: bool = False  # какая-то строка обрезана по VIEW_MAX_BYTES
+    html: bool = False  # строки — готовый HTML подсветки (highlighter)
+
+
+def _index_key(path: Path, stat: os.stat_result) -> str:
+    """
+    Блоб уже назван хэшем содержимого, файлы кэша (cache/<вид>/<sha256>.*)
+    неизменяемы и тоже названы по хэшу; для остальных — хэш пути, размера и mtime.
+    """
+    if path.parent.parent.parent == BLOB_DIR or path.parent.parent == CACHE_DIR:
+        return path.name
+    return hashlib.sha256(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+
+
+def build_line_index(path: Path) -> np.ndarray:
+    """Смещения начал строк (после \\n и после \\r, за которым не \\n). Пустой файл — ноль строк."""
+    size = path.stat().st_size
+    if size == 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = [np.zeros(1, dtype=np.int64)]
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = np.frombuffer(mm, dtype=np.uint8)
+        for offset in range(0, size, INDEX_CHUNK_BYTES):
+            chunk = data[offset:offset + INDEX_CHUNK_BYTES]
+            # Следующий байт за каждым байтом куска (за последним в файле — не \n)
+            following = data[offset + 1:offset + 1 + len(chunk)]
+            if len(following) < len(chunk):
+                following = np.append(following, np.uint8(0))
+            ends = (chunk == 10) | ((chunk == 13) & (following != 10))
+            starts.append(np.flatnonzero(ends).astype(np.int64) + offset + 1)
+        del data, chunk, following  # иначе mmap не закроется (на него ссылаются буферы)
+    starts = np.concatenate(starts)
+    # Перевод строки в самом конце не начинает новую строку
+    return starts[:-1] if starts[-1] == size else starts
+
+
+class LineIndexCache:
+    """LRU индексов строк в памяти + копия на диске (np.load с mmap)."""
+
+    def __init__(self, maxsize: int = 256, directory: Path = LINE_INDEX_DIR):
+        self.maxsize = maxsize
+        self.directory = directory
+        self._data: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    def get(self, path: Path) -> np.ndarray:
+        key = _index_key(path, path.stat())
+        index = self._data.get(key)
+        if index is not None:
+            self._data.move_to_end(key)
+            return index
+
+        stored = self.directory / f"{key}.v{LINE_INDEX_VERSION}.npy"
+        if stored.exists():
+            index = np.load(stored, mmap_mode="r")
+        else:
+            index = build_line_index(path)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = stored.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, index)
+            os.replace(tmp, stored)
+
+        self._data[key] = index
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return index
+
+
+line_index_cache = LineIndexCache()
+
+
+def read_lines(path: Path, start: int = 1, count: int = VIEW_PAGE_LINES, max_bytes: int = VIEW_MAX_BYTES) -> LinePage:
+    """
+    Строки [start, start + count) файла (нумерация с 1), не больше max_bytes.
+
+    Блокирующая функция — из async-роутов вызывать через asyncio.to_thread.
+    """
+    starts = line_index_cache.get(path)
+    total = len(starts)
+    start = max(1, start)
+    if start > total:
+        return LinePage(lines=[], total_lines=total, next_start=None)
+
+    size = path.stat().st_size
+    first = start - 1
+    last = min(first + count, total)  # не включая
+    begin = int(starts[first])
+    # Урезаем страницу по байтам, но хотя бы одну строку отдаём (обрезанной)
+    byte_limit = begin + max_bytes
+    if (int(starts[last]) if last < total else size) > byte_limit:
+        last = max(first + 1, int(np.searchsorted(starts, byte_limit, side="right")) - 1)
+    end = min(int(starts[last]) if last < total else size, byte_limit)
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        chunk = mm[begin:end]
+
+    lines = []
+    truncated = False
+    for number in range(first, last):
+        line_begin = int(starts[number]) - begin
+        line_end = (int(starts[number + 1]) if number + 1 < total else size) - begin
+        text = chunk[line_begin:min(line_end, len(chunk))].rstrip(b"\r\n").decode("utf-8", "replace")
+        if line_end > len(chunk):
+            text += " …"
+            truncated = True
+        lines.append((number + 1, text))
+    return LinePage(
+        lines=lines,
+        total_lines=total,
+        next_start=last + 1 if last < total else None,
+        truncated=truncated,
+    )
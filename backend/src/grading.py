@@ -0,0 +1,195 @@
+# src/grading.py
+"""
+Проверка тестов numpy-операциями.
+
+Ответы студентов кодируются в две матрицы (сабмишен × вопрос):
+- choices (int64) — индекс варианта (single) или битовая маска (multi), -1 — нет ответа;
+- numbers (float64) — число для numeric-вопросов, NaN — нет ответа.
+Проверка всей матрицы — несколько векторных сравнений с ключом
+CompiledQuiz, без цикла по вопросам. Одна и та же функция проверяет
+и один сабмишен, и все сабмишены задания разом (regrade_assignment —
+когда преподаватель исправил ключ ответов).
+
+Перепроверка пишет оценки одним executemany, мимо событий ORM, поэтому
+сама сбрасывает рекомендации затронутых студентов (они зависят от оценок).
+Прогресс не трогает: он считает сабмишены по статусу, а меняется только grade.
+
+Перепроверить задание:
+    python -m backend.src.grading regrade <assignment_id>
+"""
+import argparse
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, List, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.orm import Session
+
+from .metrics import QUIZ_GRADED, QUIZ_GRADING_SECONDS
+from .models import Assignment, Submission
+from .quiz import CompiledQuiz, SINGLE, MULTI, NUMERIC, compile_quiz
+from .recommendation_cache import recommendation_cache
+
+
+class AnswerError(ValueError):
+    """Ответы не подходят к тесту (не то число ответов, нет такого варианта, не число)."""
+
+
+@dataclass
+class GradeResult:
+    correct: np.ndarray  # правильных ответов на сабмишен
+    percent: np.ndarray  # оценка 0–100 на сабмишен
+    total: int
+
+
+@dataclass
+class RegradeResult:
+    submissions: int  # перепроверено сабмишенов
+    students: List[int]  # чьи оценки могли измениться
+
+
+def normalize_answers(quiz: CompiledQuiz, raw: Sequence[Any]) -> List[Any]:
+    """
+    Приводит ответы из формы/JSON к виду для хранения в Submission.test_answers:
+    int (single), отсортированный список int (multi), float (numeric), None — нет ответа.
+    """
+    if len(raw) != len(quiz):
+        raise AnswerError("Количество переданных ответов не совпадает с количеством вопросов")
+    answers = []
+    for question, value in zip(quiz.questions, raw):
+        if value is None or value == "" or value == []:
+            answers.append(None)
+            continue
+        try:
+            if question.kind == NUMERIC:
+                number = float(str(value).replace(",", "."))
+                if not np.isfinite(number):
+                    raise ValueError(value)
+                answers.append(number)
+            elif question.kind == MULTI:
+                values = value if isinstance(value, (list, tuple)) else [value]
+                answers.append(sorted({int(v) for v in values}))
+            else:
+                answers.append(int(value))
+        except (TypeError, ValueError):
+            raise AnswerError(f"Некорректный ответ на вопрос «{question.question}»")
+        chosen = answers[-1] if question.kind == MULTI else [answers[-1]] if question.kind == SINGLE else []
+        if any(not 0 <= i < len(question.options) for i in chosen):
+            raise AnswerError(f"Нет такого варианта в вопросе «{question.question}»")
+    return answers
+
+
+def encode_answers(quiz: CompiledQuiz, rows: Sequence[Sequence[Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Нормализованные ответы (списки из normalize_answers) → матрицы choices, numbers."""
+    n_rows, n_questions = len(rows), len(quiz)
+    choices = np.full((n_rows, n_questions), -1, dtype=np.int64)
+    numbers = np.full((n_rows, n_questions), np.nan, dtype=np.float64)
+    kinds = quiz.kinds.tolist()
+    for r, answers in enumerate(rows):
+        for q, value in enumerate(answers[:n_questions]):
+            if value is None:
+                continue
+            if kinds[q] == NUMERIC:
+                numbers[r, q] = value
+            elif kinds[q] == MULTI:
+                choices[r, q] = sum(1 << i for i in value)
+            else:
+                choices[r, q] = value
+    return choices, numbers
+
+
+def grade(quiz: CompiledQuiz, choices: np.ndarray, numbers: np.ndarray) -> GradeResult:
+    """Проверка матрицы ответов. Multi засчитывается только при точном совпадении набора."""
+    started = time.perf_counter()
+    exact = choices == quiz.correct
+    with np.errstate(invalid="ignore"):
+        close = np.abs(numbers - quiz.values) <= quiz.tolerance  # NaN → False
+    ok = np.where(quiz.kinds == NUMERIC, close, exact)
+    correct = ok.sum(axis=1)
+    QUIZ_GRADED.inc(len(correct))
+    QUIZ_GRADING_SECONDS.observe(time.perf_counter() - started)
+    return GradeResult(correct=correct, percent=correct * (100.0 / len(quiz)), total=len(quiz))
+
+
+def grade_one(quiz: CompiledQuiz, answers: List[Any]) -> Tuple[int, float]:
+    """(правильных, процент) для одного сабмишена с нормализованными ответами."""
+    result = grade(quiz, *encode_answers(quiz, [answers]))
+    return int(result.correct[0]), float(result.percent[0])
+
+
+def feedback_text(correct: int, total: int) -> str:
+    return f"Тест пройден. Правильных ответов: {correct}/{total}."
+
+
+def regrade_assignment(conn, assignment_id: int) -> RegradeResult:
+    """
+    Перепроверяет все сабмишены теста по текущему ключу одним проходом.
+
+    conn — Connection или Session (в т.ч. AsyncSession.run_sync); коммит —
+    на вызывающей стороне. Рекомендации студентов сессия сбросит после commit;
+    с Connection — вызывающий, по RegradeResult.students (как main()).
+    """
+    test_data = conn.execute(
+        select(Assignment.test_data).where(Assignment.id == assignment_id)
+    ).scalar()
+    if not test_data:
+        return RegradeResult(0, [])
+    quiz = compile_quiz(test_data)
+    rows = conn.execute(
+        select(Submission.id, Submission.student_id, Submission.test_answers).where(
+            Submission.assignment_id == assignment_id,
+            Submission.test_answers.is_not(None),
+        )
+    ).all()
+    if not rows:
+        return RegradeResult(0, [])
+
+    ids = [row.id for row in rows]
+    result = grade(quiz, *encode_answers(quiz, [_stored_answers(quiz, row.test_answers) for row in rows]))
+    params = [
+        {"submission_id": submission_id, "grade": grade_value, "feedback": feedback_text(correct, result.total)}
+        # grade — Integer: проценты округляем так же, как submit_test
+        for submission_id, grade_value, correct in zip(ids, np.rint(result.percent).astype(int).tolist(), result.correct.tolist())
+    ]
+    # Один executemany вместо UPDATE на строку
+    submissions = Submission.__table__
+    conn.execute(
+        update(submissions)
+        .where(submissions.c.id == bindparam("submission_id"))
+        .values(grade=bindparam("grade"), feedback=bindparam("feedback")),
+        params,
+    )
+
+    # Событий ORM не было — рекомендации сбрасываем сами
+    students = sorted({row.student_id for row in rows})
+    if isinstance(conn, Session):
+        conn.info.setdefault("stale_recommendations", set()).update(students)
+    return RegradeResult(len(params), students)
+
+
+def _stored_answers(quiz: CompiledQuiz, test_answers: str) -> List[Any]:
+    """Ответы из Submission.test_answers; битые или не подходящие к тесту — пустые."""
+    try:
+        return normalize_answers(quiz, json.loads(test_answers))
+    except (json.JSONDecodeError, TypeError, AnswerError):
+        return [None] * len(quiz)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка тестов")
+    parser.add_argument("command", choices=["regrade"])
+    parser.add_argument("assignment_id", type=int)
+    args = parser.parse_args()
+
+    from .database import engine
+    with engine.begin() as conn:
+        result = regrade_assignment(conn, args.assignment_id)
+    # После commit: воркеры не должны успеть закэшировать старые оценки
+    recommendation_cache.invalidate(*result.students)
+    print(f"✅ Перепроверено сабмишенов: {result.submissions}, студентов: {len(result.students)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# src/highlighter.py
+"""
+Кэш подсветки синтаксиса для файлов сабмишенов.
+
+Подсветка делается один раз на содержимое (sha256 блоба) в фоновом
+процессе, сразу после загрузки файла. Результат — построчный HTML
+(строка файла = строка кэша, теги не переходят через перевод строки)
+в uploads/cache/highlight/<sha256>.v<версия>.html, поэтому его можно
+листать тем же code_viewer.read_lines, что и исходный файл. Концы строк
+\\r\\n и одиночный \\r приводятся к \\n — так же делит строки индекс code_viewer.
+
+Ограничения: файлы больше HIGHLIGHT_MAX_BYTES не подсвечиваются, а общий
+размер кэша держится в пределах HIGHLIGHT_CACHE_MAX_BYTES (LRU по mtime,
+который обновляется при чтении).
+"""
+import asyncio
+import html
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Set
+
+from pygments.lexers import get_lexer_for_filename
+from pygments.token import STANDARD_TYPES
+from pygments.util import ClassNotFound
+
+from .storage import CACHE_DIR, BLOB_DIR
+from .code_viewer import VIEW_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+HIGHLIGHT_DIR = CACHE_DIR / "highlight"
+# Меняется вместе с форматом файлов подсветки — старые просто вытеснятся по LRU
+HIGHLIGHT_VERSION = 2
+# Больше — не подсвечиваем (показываем как есть)
+HIGHLIGHT_MAX_BYTES = 1024 * 1024
+# Байт HTML за один запрос страницы (разметка в несколько раз длиннее исходника)
+HIGHLIGHT_VIEW_MAX_BYTES = 4 * VIEW_MAX_BYTES
+# Предел всего кэша подсветки на диске
+HIGHLIGHT_CACHE_MAX_BYTES = int(os.environ.get("HIGHLIGHT_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# Не fork: воркер многопоточный (to_thread, пул БД), а форк копирует чужие
+# захваченные блокировки — дочерний процесс может зависнуть навсегда
+_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def _css_class(ttype) -> str:
+    # Как у pygments.HtmlFormatter: ищем ближайший тип с коротким именем класса
+    while ttype not in STANDARD_TYPES:
+        ttype = ttype.parent
+    return STANDARD_TYPES[ttype]
+
+
+@lru_cache(maxsize=1024)
+def has_lexer(filename: str) -> bool:
+    try:
+        get_lexer_for_filename(filename)
+    except ClassNotFound:
+        return False
+    return True
+
+
+def render_lines(text: str, filename: str) -> Optional[str]:
+    """
+    Построчный HTML: каждая строка исходника — одна строка результата.
+
+    None, если для типа файла нет лексера.
+    """
+    try:
+        lexer = get_lexer_for_filename(filename, stripnl=False, ensurenl=True)
+    except ClassNotFound:
+        return None
+
+    lines, current = [], []
+    for ttype, value in lexer.get_tokens(text):
+        css = _css_class(ttype)
+        parts = value.split("\n")
+        for i, part in enumerate(parts):
+            if i:
+                lines.append("".join(current))
+                current = []
+            if part:
+                escaped = html.escape(part, quote=False)
+                current.append(f'<span class="{css}">{escaped}</span>' if css else escaped)
+    if current:
+        lines.append("".join(current))
+    return "\n".join(lines) + "\n"
+
+
+def normalize_newlines(text: str) -> str:
+    """\\r\\n и одиночный \\r → \\n: строки как в индексе code_viewer.build_line_index."""
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def highlight_file(source: str, destination: str, filename: str) -> bool:
+    """Подсвечивает source в destination (атомарно). Выполняется в отдельном процессе."""
+    with open(source, "rb") as f:
+        text = normalize_newlines(f.read().decode("utf-8", "replace"))
+    rendered = render_lines(text, filename)
+    if rendered is None:
+        return False
+    tmp = f"{destination}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(rendered)
+    os.replace(tmp, destination)
+    return True
+
+
+class HighlightCache:
+    """Файлы подсветки на диске + фоновая очередь на их построение."""
+
+    def __init__(self, directory: Path = HIGHLIGHT_DIR, max_bytes: int = HIGHLIGHT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: Set[str] = set()
+
+    def path_for(self, sha256: str) -> Path:
+        return self.directory / f"{sha256}.v{HIGHLIGHT_VERSION}.html"
+
+    def lookup(self, sha256: str) -> Optional[Path]:
+        """
+        Готовая подсветка или None. Обновляет mtime — для LRU-вытеснения.
+
+        evict может удалить файл и после lookup: FileNotFoundError при чтении —
+        тот же промах.
+        """
+        path = self.path_for(sha256)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def schedule(self, source: Path, filename: str) -> None:
+        """Ставит подсветку блоба в фон (повторные вызовы для того же хэша игнорируются)."""
+        if source.parent.parent.parent != BLOB_DIR:
+            return
+        sha256 = source.name
+        if sha256 in self._pending or not has_lexer(filename) or self.path_for(sha256).exists():
+            return
+        try:
+            if source.stat().st_size > HIGHLIGHT_MAX_BYTES:
+                return
+        except FileNotFoundError:
+            return
+        if self._executor is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=_MP_CONTEXT)
+        self._pending.add(sha256)
+        future = asyncio.get_running_loop().run_in_executor(
+            self._executor, highlight_file, str(source), str(self.path_for(sha256)), filename
+        )
+        future.add_done_callback(lambda f: self._done(sha256, f))
+
+    def _done(self, sha256: str, future) -> None:
+        self._pending.discard(sha256)
+        if future.exception() is not None:
+            logger.error("Не удалось подсветить %s: %s", sha256, future.exception())
+            return
+        if future.result():
+            # Обход каталога — не в цикле событий
+            asyncio.get_running_loop().run_in_executor(None, self.evict)
+
+    def evict(self) -> None:
+        """Удаляет давно не читанные файлы, пока кэш больше max_bytes."""
+        entries = []
+        for path in self.directory.glob("*.html"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+highlight_cache = HighlightCache()
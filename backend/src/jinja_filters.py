@@ -1,10 +1,19 @@
 # src/jinja_filters.py
 import json
 
+from .quiz import quiz_cache, QuizFormatError
+
 def from_json(value):
     """Парсит JSON-строку в Python-объект."""
     try:
         return json.loads(value)
     except (json.JSONDecodeError, TypeError):
         # Возвращаем пустой словарь или список, если парсинг не удался
-        return {}
\ No newline at end of file
+        return {}
+
+def quiz(assignment):
+    """Скомпилированный тест задания (из кэша, без повторного json.loads) или None."""
+    try:
+        return quiz_cache.for_assignment(assignment)
+    except QuizFormatError:
+        return None
@@ -1,71 +1,159 @@
 # src/main.py
-from fastapi import FastAPI, Request, Form, File, UploadFile, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse
+from fastapi import FastAPI, Request, Form, File, UploadFile, HTTPException, Depends
+from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
-from .database import SessionLocal
+from .database import engine, get_db, get_read_db, dispose_engines, AsyncSessionLocal
 from .models import User, Course, Assignment, Submission, Enrollment, Module, Video
-from sqlalchemy.orm import joinedload 
-from .ml_recommender import SimpleRecommender
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from .ml_recommender import recommendations_for_user, recommender
+from .ml_cf import CF_MODEL_DIR
+from .recommendation_cache import recommendation_cache
 import os
-import shutil
+import asyncio
+import logging
 from pathlib import Path
 from datetime import datetime, timedelta
 from fastapi import FastAPI, Request
-from .jinja_filters import from_json
+from .jinja_filters import from_json, quiz
+from .quiz import quiz_cache, QuizFormatError
+from .grading import AnswerError, normalize_answers, grade_one, feedback_text
+from .user_cache import CachedUser, user_cache
+from .services import (
+    get_student_submission,
+    course_module_stats,
+    pending_submissions_page,
+    pending_submissions_count,
+    InvalidCursor,
+)
+from .progress import record_submission, read_progress, read_overall_progress
+from .search import search_courses
+from .sql_stats import SQLStatsMiddleware
+from .metrics import registry, MetricsMiddleware, instrument_templates
+from .template_cache import setup_template_caches, precompile_templates, Fragment
+from .write_behind import submission_queue, WRITE_BEHIND_ENABLED
+from .code_viewer import read_lines
+from .highlighter import highlight_cache, HIGHLIGHT_VIEW_MAX_BYTES
+from .storage import (
+    DEFAULT_MAX_UPLOAD_BYTES,
+    UPLOAD_ROOT,
+    UploadError,
+    UploadTooLarge,
+    receive_upload,
+    discard_upload,
+    store_blob,
+    add_blob_ref,
+    safe_filename,
+)
 import json
 
 
 
+logger = logging.getLogger(__name__)
+
 # Инициализация
 app = FastAPI()
 
 app.add_middleware(SessionMiddleware, secret_key=os.urandom(24))
+# Число SQL-запросов и время в БД на запрос: Server-Timing и лог (sql_stats)
+app.add_middleware(SQLStatsMiddleware)
+# Гистограммы времени по роутам для /metrics — снаружи всех, замеряет весь запрос
+app.add_middleware(MetricsMiddleware)
 
 templates = Jinja2Templates(directory="frontend/templates")
+instrument_templates(templates.env)  # время рендера каждого шаблона — в /metrics
+# Байткод шаблонов на диске и тег {% cache %} для фрагментов (template_cache)
+setup_template_caches(templates.env)
 templates.env.filters['from_json'] = from_json # <-- Регистрируем фильтр
+templates.env.filters['quiz'] = quiz
+
 
+# Размер страницы очереди проверки у преподавателя
+QUEUE_PAGE_SIZE = 50
+# Сколько курсов показывать в результатах поиска
+SEARCH_RESULTS_LIMIT = 20
 
 # Папки
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+UPLOAD_DIR = UPLOAD_ROOT
+UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+# Недокачанные файлы — рядом с uploads, чтобы перенос был атомарным (та же ФС)
+UPLOAD_TMP_DIR = UPLOAD_DIR / ".tmp"
+
+# Item-item модель рекомендаций (если обучена): mmap, каждый воркер открывает тот же файл
+recommender.load_cf(CF_MODEL_DIR)
+
+@app.on_event("startup")
+async def start_background_workers():
+    await registry.start()
+    # Компилируем шаблоны до первого запроса (из байткода на диске — быстро)
+    count = precompile_templates(templates.env)
+    logger.info("Загружено шаблонов: %d", count)
+    # Индекс рекомендаций строится в потоке до первого запроса, дальше обновляется в фоне
+    await recommender.start(engine)
+    if WRITE_BEHIND_ENABLED:
+        await submission_queue.start()
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    # Сначала дописываем принятые сабмишены тестов
+    await submission_queue.stop()
+    await recommender.stop()
+    highlight_cache.shutdown()
+    await dispose_engines()
+    await registry.stop()
 
 # Раздаём статику и загрузки
 app.mount("/static", StaticFiles(directory="frontend/static"), name="static")
 app.mount("/uploads", StaticFiles(directory="frontend/uploads"), name="uploads")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def get_current_user(request: Request):
+async def _load_current_user(request: Request, db: AsyncSession):
     user_id = request.session.get("user_id")
-    print(f"DEBUG: Session user_id = {user_id}") # <-- ВРЕМЕННЫЙ ЛОГ
     if not user_id:
-        print("DEBUG: No user_id in session") # <-- ВРЕМЕННЫЙ ЛОГ
         return None
-    # Используем сессию SQLAlchemy
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.id == user_id).first()
-        print(f"DEBUG: User found from DB: {user}, Role: {user.role if user else 'N/A'}") # <-- ВРЕМЕННЫЙ ЛОГ
-    finally:
-        db.close()
+    # Сначала кэш процесса — в большинстве запросов в БД не ходим
+    user = user_cache.get(user_id)
+    if user is None:
+        db_user = await db.scalar(select(User).where(User.id == user_id))
+        if db_user is None:
+            return None
+        user = CachedUser.from_model(db_user)
+        user_cache.set(user)
+    return user
+
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_db)):
+    """Текущий пользователь для пишущих роутов — через ту же сессию get_db, что и у роута."""
+    return await _load_current_user(request, db)
+
+async def get_current_user_read(request: Request, db: AsyncSession = Depends(get_read_db)):
+    """
+    Текущий пользователь для читающих роутов (get_read_db): FastAPI кэширует
+    зависимость на запрос, поэтому роут и поиск пользователя делят одну сессию.
+
+    Реплика может ещё не знать пользователя, только что созданного /register
+    (в том числе другим воркером), — тогда ищем его в основной БД.
+    """
+    user = await _load_current_user(request, db)
+    if user is None and request.session.get("user_id"):
+        async with AsyncSessionLocal() as primary:
+            user = await _load_current_user(request, primary)
     return user
 
 # === Роуты ===
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Метрики в формате Prometheus — сумма по всем воркерам (см. metrics.py)."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     return templates.TemplateResponse("home.html", {"request": request})
 
 @app.get("/auth", response_class=HTMLResponse)
-async def register_page(request: Request):
-    user = get_current_user(request)
+async def register_page(request: Request, user: CachedUser = Depends(get_current_user_read)):
     if user:
         return RedirectResponse(f"/{user.role}/dashboard", status_code=303)
     return templates.TemplateResponse("register.html", {"request": request})
@@ -97,14 +185,17 @@ async def set_role(request: Request, role: str = Form(...)):
     """
 
 @app.post("/register", response_class=HTMLResponse)
-async def register(request: Request, email: str = Form(...), role: str = Form(...)):
-    db = SessionLocal()
-    user = db.query(User).filter(User.email == email).first()
+async def register(
+    request: Request,
+    email: str = Form(...),
+    role: str = Form(...),
+    db: AsyncSession = Depends(get_db)
+):
+    user = await db.scalar(select(User).where(User.email == email))
     
     if user:
         # 🔥 Проверяем: совпадает ли роль?
         if user.role != role:
-            db.close()
             return f"""
             <!-- Modal для ошибки -->
             <div class="modal fade show" id="errorModal" tabindex="-1" style="display: block; background: rgba(0,0,0,0.4);">
@@ -177,39 +268,54 @@ async def register(request: Request, email: str = Form(...), role: str = Form(..
         name = email.split("@")[0].title()
         user = User(email=email, name=name, role=role)
         db.add(user)
-        db.commit()
-        db.refresh(user)
-    
+        await db.commit()
+
+    # Перезаписываем запись в кэше — старый снимок (если был) сбрасывается
+    user_cache.set(CachedUser.from_model(user))
+
     # Сохраняем в сессии
     request.session["user_id"] = user.id
     request.session["user_name"] = user.name
     request.session["user_role"] = user.role
-    db.close()
     
     return RedirectResponse(f"/{user.role}/dashboard", status_code=303)
 
 
 # --- Студент ---
 @app.get("/student/dashboard", response_class=HTMLResponse)
-async def student_dashboard(request: Request, q: str = None):
-    user = get_current_user(request)
+async def student_dashboard(
+    request: Request,
+    q: str = None,
+    db: AsyncSession = Depends(get_read_db),
+    user: CachedUser = Depends(get_current_user_read)
+):
     if not user or user.role != "student":
         return RedirectResponse("/", status_code=303)
 
-    # Фильтрация
-    if q:
-        q = q.strip().lower()
-        courses = [c for c in FAKE_COURSES if q in c["title"].lower() or q in c["description"].lower()]
+    # Поиск по каталогу (FTS5) или, без запроса, курсы студента
+    if q and q.strip():
+        courses = await search_courses(db, q, limit=SEARCH_RESULTS_LIMIT)
     else:
-        courses = FAKE_COURSES
+        courses = (await db.scalars(
+            select(Course)
+            .join(Enrollment, Enrollment.course_id == Course.id)
+            .where(Enrollment.user_id == user.id)
+            .order_by(Course.title)
+        )).all()
+
+    # HTMX-поиск обновляет только список курсов, а не всю страницу
+    if request.headers.get("HX-Target") == "course-list-container":
+        return templates.TemplateResponse(
+            "student/course_list.html",
+            {"request": request, "courses": courses}
+        )
 
-    progress = 3
-    total = 5
-    recommendations = [
-        {"title": "FastAPI + HTMX", "reason": "Вы начали — углубитесь!"},
-    ]
+    # Суммарный прогресс по всем курсам — из student_progress
+    overall = await read_overall_progress(db, user.id)
+    progress = overall["progress"]
+    total = overall["total"]
+    recommendations = await recommendations_for_user(db, user.id)
 
-    # ✅ ВСЕГДА ВОЗВРАЩАЕМ ПОЛНУЮ СТРАНИЦУ
     return templates.TemplateResponse(
         "student/dashboard.html",
         {
@@ -223,24 +329,24 @@ async def student_dashboard(request: Request, q: str = None):
     
 
 @app.get("/student/courses", response_class=HTMLResponse)
-async def student_courses(request: Request):
-    user = get_current_user(request)
+async def student_courses(
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    user: CachedUser = Depends(get_current_user_read)
+):
     if not user or user.role != "student":
         return RedirectResponse("/", status_code=303)
 
-    db = SessionLocal()
-    try:
-        # Найти ID курсов, на которые записан студент
-        enrolled_course_ids = db.query(Enrollment.course_id).filter(Enrollment.user_id == user.id).all()
-        enrolled_course_ids = [e[0] for e in enrolled_course_ids] # список ID
+    # Найти ID курсов, на которые записан студент
+    enrolled_course_ids = (await db.scalars(
+        select(Enrollment.course_id).where(Enrollment.user_id == user.id)
+    )).all() # список ID
 
-        # Получить курсы, на которые записан студент
-        enrolled_courses = db.query(Course).filter(Course.id.in_(enrolled_course_ids)).all()
+    # Получить курсы, на которые записан студент
+    enrolled_courses = (await db.scalars(select(Course).where(Course.id.in_(enrolled_course_ids)))).all()
 
-        # Получить все остальные курсы (для поиска/просмотра)
-        other_courses = db.query(Course).filter(~Course.id.in_(enrolled_course_ids)).all()
-    finally:
-        db.close()
+    # Получить все остальные курсы (для поиска/просмотра)
+    other_courses = (await db.scalars(select(Course).where(~Course.id.in_(enrolled_course_ids)))).all()
 
     return templates.TemplateResponse(
         "student/courses.html",
@@ -253,70 +359,41 @@ async def student_courses(request: Request):
     )
 
 @app.get("/student/course/{course_id}", response_class=HTMLResponse)
-async def student_course_detail(request: Request, course_id: int):
-    user = get_current_user(request)
+async def student_course_detail(
+    request: Request,
+    course_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    user: CachedUser = Depends(get_current_user_read)
+):
     if not user or user.role != "student":
         return RedirectResponse("/", status_code=303)
 
-    db = SessionLocal()
-    try:
-        # Проверяем, записан ли студент на курс
-        enrollment = db.query(Enrollment).filter(
-            Enrollment.user_id == user.id,
-            Enrollment.course_id == course_id
-        ).first()
-        if not enrollment:
-            return RedirectResponse("/", status_code=303)
-
-        # Получаем курс
-        course = db.query(Course).filter(Course.id == course_id).first()
-        if not course:
-            return templates.TemplateResponse(
-                "error.html",
-                {"request": request, "message": "Курс не найден"},
-                status_code=404
-            )
-
-        # Получаем *все* модули курса, чтобы посчитать прогресс и статистику
-        # Загружаем связанные assignment и video, чтобы избежать DetachedInstanceError
-        modules = db.query(Module).filter(Module.course_id == course_id).options(
-            joinedload(Module.assignment),
-            joinedload(Module.video)
-        ).order_by(Module.order).all()
-
-        # Подсчёт прогресса: сколько заданий (модулей типа "assignment") проверено
-        total_assignment_modules = len([m for m in modules if m.type == "assignment"])
-        completed_submissions = 0
-        for mod in modules:
-            if mod.type == "assignment" and mod.assignment:
-                # Найдём сабмишен *этого* студента для этого задания
-                student_submission = next((s for s in mod.assignment.submissions if s.student_id == user.id), None)
-                if student_submission and student_submission.status == "reviewed":
-                    completed_submissions += 1
-
-        progress = completed_submissions
-        total = total_assignment_modules
-
-        # Рассчитываем статистику: количество видео, заданий, текстов через БД
-        stats = {"videos": 0, "assignments": 0, "texts": 0}
-        for mod in modules:
-            if mod.type == "video":
-                stats["videos"] += 1
-            elif mod.type == "assignment":
-                stats["assignments"] += 1
-            elif mod.type == "text":
-                stats["texts"] += 1
-
-        # Найдём *первый* модуль, чтобы можно было сразу перейти к нему
-        first_module = modules[0] if modules else None
-
-    finally:
-        db.close()
-
-    # Найти рекомендации (если были)
-    recommendations = [
-        {"title": "Продвинутый курс по безопасности", "reason": "Рекомендуется после завершения"},
-    ]
+    # Курс — только если студент на него записан (проверка записи в том же запросе)
+    course = await db.scalar(
+        select(Course)
+        .join(Enrollment, and_(Enrollment.course_id == Course.id, Enrollment.user_id == user.id))
+        .where(Course.id == course_id)
+    )
+    if not course:
+        return RedirectResponse("/", status_code=303)
+
+    # Прогресс — готовая строка student_progress
+    summary = await read_progress(db, user.id, course_id)
+    progress = summary["progress"]
+    total = summary["total"]
+
+    # Статистика и первый модуль нужны только сводке курса — она общая для
+    # всех студентов и кэшируется по версии курса (updated_at)
+    course_summary = Fragment("course-summary", course.id, course.updated_at)
+    stats = first_module = None
+    if not course_summary.cached:
+        stats = await course_module_stats(db, course_id)
+        first_module = await db.scalar(
+            select(Module).where(Module.course_id == course_id).order_by(Module.order).limit(1)
+        )
+
+    # Рекомендации по курсам студента (TF-IDF)
+    recommendations = await recommendations_for_user(db, user.id)
 
     return templates.TemplateResponse(
         "student/course_detail.html", # <-- Главный шаблон (только сводка)
@@ -328,71 +405,79 @@ async def student_course_detail(request: Request, course_id: int):
             "total": total,
             "stats": stats,
             "first_module": first_module, # Передаём первый модуль
+            "course_summary": course_summary,
+            "recommendations": recommendations,
         }
     )
 
 @app.get("/student/course/{course_id}/module/{module_id}", response_class=HTMLResponse)
-async def student_module_detail(request: Request, course_id: int, module_id: int):
-    user = get_current_user(request)
+async def student_module_detail(
+    request: Request,
+    course_id: int,
+    module_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    user: CachedUser = Depends(get_current_user_read)
+):
     if not user or user.role != "student":
         return RedirectResponse("/", status_code=303)
 
-    db = SessionLocal()
-    try:
-        # Проверяем, записан ли студент на курс
-        enrollment = db.query(Enrollment).filter(
-            Enrollment.user_id == user.id,
-            Enrollment.course_id == course_id
-        ).first()
-        if not enrollment:
-            return RedirectResponse("/student/courses", status_code=303)
-
-        # Получаем *все* модули курса, отсортированные по order, чтобы найти prev/next
-        # Загружаем связанные assignment и video
-        all_modules = db.query(Module).filter(
+    # Текущий модуль вместе с курсом, заданием и видео (ленивой загрузки в async нет)
+    # и запись студента на курс — одним запросом.
+    # Сабмишены здесь НЕ грузим — нужен только сабмишен текущего студента
+    row = (await db.execute(
+        select(Module, Enrollment.id).outerjoin(
+            Enrollment, and_(Enrollment.course_id == Module.course_id, Enrollment.user_id == user.id)
+        ).where(
+            Module.id == module_id,
             Module.course_id == course_id
         ).options(
-            joinedload(Module.assignment).joinedload(Assignment.submissions),
+            joinedload(Module.course),
+            joinedload(Module.assignment),
             joinedload(Module.video)
-        ).order_by(Module.order).all()
-
-        # Найдём текущий модуль в списке
-        current_module_index = -1
-        current_module = None
-        for i, mod in enumerate(all_modules):
-            if mod.id == module_id:
-                current_module = mod
-                current_module_index = i
-                break
-
-        if not current_module:
-            return templates.TemplateResponse(
-                "error.html",
-                {"request": request, "message": "Модуль не найден"},
-                status_code=404
-            )
-
-        # Получаем курс
-        course = current_module.course # Так как модуль уже загружен с курсом
-
-        # Определим предыдущий и следующий модули
-        prev_module = all_modules[current_module_index - 1] if current_module_index > 0 else None
-        next_module = all_modules[current_module_index + 1] if current_module_index < len(all_modules) - 1 else None
-
-        # Если модуль — задание, получаем сабмишен
-        assignment = None
-        submission = None
-        if current_module.type == "assignment":
-            assignment = current_module.assignment # Уже загружен через joinedload
-            if assignment:
-                # Найдём сабмишен *этого* студента для этого задания
-                submission = next((s for s in assignment.submissions if s.student_id == user.id), None)
-
-        # Если модуль — видео, получаем данные видео
-        video = current_module.video if current_module.type == "video" else None # Уже загружен через joinedload
-
-    finally:
-        db.close()
+        )
+    )).first()
+    if row is None:
+        # Модуля нет — 404 только записанным на курс (редкий путь, отдельный запрос)
+        enrolled = await db.scalar(
+            select(Enrollment.id).where(Enrollment.user_id == user.id, Enrollment.course_id == course_id)
+        )
+        if not enrolled:
+            return RedirectResponse("/student/courses", status_code=303)
+        return templates.TemplateResponse(
+            "error.html",
+            {"request": request, "message": "Модуль не найден"},
+            status_code=404
+        )
+    current_module, enrollment_id = row
+    if enrollment_id is None:
+        return RedirectResponse("/student/courses", status_code=303)
+
+    # Получаем курс
+    course = current_module.course # Так как модуль уже загружен с курсом
+
+    # Навигация по модулям общая для всех студентов и кэшируется по версии
+    # курса; список модулей (только id и названия) читаем, лишь когда её нет в кэше
+    module_nav = Fragment("module-nav", course.id, current_module.id, course.updated_at)
+    prev_module = next_module = None
+    if not module_nav.cached:
+        all_modules = (await db.execute(
+            select(Module.id, Module.title).where(Module.course_id == course_id).order_by(Module.order)
+        )).all()
+        index = next(i for i, mod in enumerate(all_modules) if mod.id == current_module.id)
+        prev_module = all_modules[index - 1] if index > 0 else None
+        next_module = all_modules[index + 1] if index < len(all_modules) - 1 else None
+
+    # Если модуль — задание, получаем сабмишен
+    assignment = None
+    submission = None
+    if current_module.type == "assignment":
+        assignment = current_module.assignment # Уже загружен через joinedload
+        if assignment:
+            # Сабмишен *этого* студента — отдельным запросом с фильтром в SQL
+            submission = await get_student_submission(db, assignment.id, user.id)
+
+    # Если модуль — видео, получаем данные видео
+    video = current_module.video if current_module.type == "video" else None # Уже загружен через joinedload
 
     return templates.TemplateResponse(
         "student/module_base.html", # <-- Используем обновлённый шаблон
@@ -403,6 +488,7 @@ async def student_module_detail(request: Request, course_id: int, module_id: int
             "module": current_module,
             "prev_module": prev_module,
             "next_module": next_module,
+            "module_nav": module_nav,
             "assignment": assignment,
             "submission": submission,
             "video": video,
@@ -413,48 +499,119 @@ async def student_module_detail(request: Request, course_id: int, module_id: int
     
 # --- Преподаватель ---
 @app.get("/teacher/dashboard", response_class=HTMLResponse)
-async def teacher_dashboard(request: Request):
-    user = get_current_user(request)
+async def teacher_dashboard(
+    request: Request,
+    course_id: str = "",
+    assignment_id: str = "",
+    order: str = "oldest",
+    db: AsyncSession = Depends(get_read_db),
+    user: CachedUser = Depends(get_current_user_read)
+):
     if not user or user.role != "teacher":
         return RedirectResponse("/", status_code=303)
 
-    db = SessionLocal()
-    pending = (
-        db.query(Submission)
-        .filter(Submission.status == "pending")
-        .join(Assignment)
-        .join(User, User.id == Submission.student_id)
-        .all()
-    )
-    db.close()
+    filters = _queue_filters(course_id, assignment_id, order)
+    # Первая страница очереди; остальные подгружаются HTMX при прокрутке
+    submissions, next_cursor = await pending_submissions_page(db, limit=QUEUE_PAGE_SIZE, **filters)
+    pending_count = await pending_submissions_count(db, filters["course_id"], filters["assignment_id"])
+
+    # Данные для фильтров
+    courses = (await db.execute(select(Course.id, Course.title).order_by(Course.title))).all()
+    assignments = []
+    if filters["course_id"] is not None:
+        assignments = (await db.execute(
+            select(Assignment.id, Assignment.title)
+            .join(Module, Module.id == Assignment.module_id)
+            .where(Module.course_id == filters["course_id"])
+            .order_by(Module.order)
+        )).all()
 
     return templates.TemplateResponse(
         "teacher/dashboard.html",
-        {"request": request, "submissions": pending}
+        {
+            "request": request,
+            "submissions": submissions,
+            "next_cursor": next_cursor,
+            "pending_count": pending_count,
+            "courses": courses,
+            "assignments": assignments,
+            "course_id": filters["course_id"],
+            "assignment_id": filters["assignment_id"],
+            "order": order,
+        }
     )
 
+@app.get("/teacher/queue", response_class=HTMLResponse)
+async def teacher_queue_page(
+    request: Request,
+    cursor: str,
+    course_id: str = "",
+    assignment_id: str = "",
+    order: str = "oldest",
+    db: AsyncSession = Depends(get_read_db),
+    user: CachedUser = Depends(get_current_user_read)
+):
+    """HTMX-фрагмент: следующая страница очереди проверки (infinite scroll)."""
+    if not user or user.role != "teacher":
+        return HTMLResponse(content="<div class='alert alert-danger'>Ошибка аутентификации</div>", status_code=403)
+
+    filters = _queue_filters(course_id, assignment_id, order)
+    try:
+        submissions, next_cursor = await pending_submissions_page(
+            db, limit=QUEUE_PAGE_SIZE, cursor=cursor, **filters
+        )
+    except InvalidCursor:
+        return HTMLResponse(content="<div class='alert alert-danger'>Некорректный курсор страницы</div>", status_code=400)
+    return templates.TemplateResponse(
+        "teacher/queue_page.html",
+        {
+            "request": request,
+            "submissions": submissions,
+            "next_cursor": next_cursor,
+            "course_id": filters["course_id"],
+            "assignment_id": filters["assignment_id"],
+            "order": order,
+        }
+    )
+
+def _queue_filters(course_id: str, assignment_id: str, order: str) -> dict:
+    # Пустое значение из <select> означает «все»
+    return {
+        "course_id": int(course_id) if course_id.isdigit() else None,
+        "assignment_id": int(assignment_id) if assignment_id.isdigit() else None,
+        "oldest_first": order != "newest",
+    }
+
+@app.get("/teacher/recommendation-cache")
+async def recommendation_cache_stats(user: CachedUser = Depends(get_current_user_read)):
+    """Счётчики кэша рекомендаций этого воркера (hit rate — для подбора размера)."""
+    if not user or user.role != "teacher":
+        raise HTTPException(403)
+    return recommendation_cache.stats()
+
 @app.get("/teacher/review/{submission_id}", response_class=HTMLResponse)
-async def review_page(request: Request, submission_id: int):
-    user = get_current_user(request)
+async def review_page(
+    request: Request,
+    submission_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    user: CachedUser = Depends(get_current_user_read)
+):
     if not user or user.role != "teacher":
         return RedirectResponse("/", status_code=303)
 
-    db = SessionLocal()
-    submission = (
-        db.query(Submission)
-        .filter(Submission.id == submission_id)
-        .join(Assignment)
-        .join(User, User.id == Submission.student_id)
-        .first()
+    submission = await db.scalar(
+        select(Submission)
+        .where(Submission.id == submission_id)
+        .options(joinedload(Submission.assignment), joinedload(Submission.student))
     )
-    db.close()
 
     if not submission:
         return HTMLResponse("<div class='alert alert-danger'>Работа не найдена</div>")
 
+    code_page = await submission_code_page(submission)
     return templates.TemplateResponse(
         "teacher/review.html",
-        {"request": request, "submission": submission}
+        {"request": request, "submission": submission, "code_page": code_page}
     )
 
 @app.post("/teacher/review/{submission_id}", response_class=HTMLResponse)
@@ -462,18 +619,21 @@ async def submit_review(
     request: Request,
     submission_id: int,
     grade: int = Form(...),
-    feedback: str = Form("")
+    feedback: str = Form(""),
+    db: AsyncSession = Depends(get_db)
 ):
-    db = SessionLocal()
-    submission = db.query(Submission).filter(Submission.id == submission_id).first()
+    submission = await db.scalar(select(Submission).where(Submission.id == submission_id))
     if not submission:
         raise HTTPException(404)
 
+    was_reviewed = submission.status == "reviewed"
     submission.grade = grade
     submission.feedback = feedback
     submission.status = "reviewed"
-    db.commit()
-    db.close()
+    await db.flush()
+    # Повторная проверка уже проверенной работы прогресс не увеличивает
+    await record_submission(db, submission.student_id, submission.assignment_id, newly_reviewed=not was_reviewed)
+    await db.commit()
 
     return """
     <div class="alert alert-success alert-dismissible fade show d-flex align-items-center" role="alert">
@@ -486,6 +646,78 @@ async def submit_review(
     </div>
     """
 
+@app.get("/submission/{submission_id}/file")
+async def download_submission_file(
+    submission_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    user: CachedUser = Depends(get_current_user_read)
+):
+    """Файл сабмишена под исходным именем (на диске блоб лежит под хэшем)."""
+    if not user:
+        return RedirectResponse("/", status_code=303)
+    submission = await db.scalar(select(Submission).where(Submission.id == submission_id))
+    if not submission or not submission.file_path:
+        raise HTTPException(404)
+    if user.role != "teacher" and submission.student_id != user.id:
+        raise HTTPException(403)
+    if not Path(submission.file_path).exists():
+        raise HTTPException(404)
+    return FileResponse(
+        submission.file_path,
+        filename=submission.file_name or Path(submission.file_path).name,
+        content_disposition_type="inline",
+    )
+
+async def submission_code_page(submission: Submission, start: int = 1):
+    """
+    Страница строк файла сабмишена или None, если файла нет (тест, файл удалён).
+
+    Если для содержимого уже есть подсветка — отдаём её строки, иначе
+    исходные строки и ставим подсветку в фон.
+    """
+    if not submission.file_path or not Path(submission.file_path).is_file():
+        return None
+    path = Path(submission.file_path)
+    highlighted = highlight_cache.lookup(path.name)
+    code_page = None
+    if highlighted is not None:
+        try:
+            code_page = await asyncio.to_thread(read_lines, highlighted, start, max_bytes=HIGHLIGHT_VIEW_MAX_BYTES)
+        except FileNotFoundError:
+            # Вытеснен между lookup и чтением — как промах
+            pass
+    if code_page is None:
+        highlight_cache.schedule(path, submission.file_name or path.name)
+    # Обрезанная строка HTML сломала бы разметку — такую страницу показываем без подсветки
+    elif not code_page.truncated:
+        code_page.html = True
+        return code_page
+    return await asyncio.to_thread(read_lines, path, start)
+
+@app.get("/submission/{submission_id}/lines", response_class=HTMLResponse)
+async def submission_lines(
+    request: Request,
+    submission_id: int,
+    start: int = 1,
+    db: AsyncSession = Depends(get_read_db),
+    user: CachedUser = Depends(get_current_user_read)
+):
+    """HTMX-фрагмент: следующие строки файла (подгружаются при прокрутке)."""
+    if not user:
+        return HTMLResponse(content="<div class='alert alert-danger'>Ошибка аутентификации</div>", status_code=403)
+    submission = await db.scalar(select(Submission).where(Submission.id == submission_id))
+    if not submission:
+        raise HTTPException(404)
+    if user.role != "teacher" and submission.student_id != user.id:
+        raise HTTPException(403)
+    code_page = await submission_code_page(submission, start)
+    if code_page is None:
+        raise HTTPException(404)
+    return templates.TemplateResponse(
+        "code_lines.html",
+        {"request": request, "submission": submission, "code_page": code_page}
+    )
+
 # --- Вспомогательные ---
 @app.get("/logout", response_class=HTMLResponse)
 async def logout(request: Request):
@@ -496,45 +728,29 @@ async def logout(request: Request):
 
     
 @app.get("/student/assignment/{assignment_id}", response_class=HTMLResponse)
-async def view_assignment(request: Request, assignment_id: int):
-    user = get_current_user(request)
+async def view_assignment(
+    request: Request,
+    assignment_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    user: CachedUser = Depends(get_current_user_read)
+):
     if not user:
         return RedirectResponse("/", status_code=303)
 
-    db = SessionLocal()
-    try:
-        # --- НАХОДИМ ЗАДАНИЕ ---
-        assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
-        if not assignment:
-            return templates.TemplateResponse(
-                "error.html",
-                {"request": request, "message": "Задание не найдено"},
-                status_code=404
-            )
-
-        # --- НАХОДИМ САБМИШЕН (для *этого* студента и *этого* задания) ---
-        submission = db.query(Submission).filter(
-            Submission.assignment_id == assignment_id,
-            Submission.student_id == user.id
-        ).first()
-
-        # --- ОБОГАЩАЕМ САБМИШЕН ДАННЫМИ КОДА И КОММЕНТАРИЯМИ (если есть) ---
-        if submission and submission.file_path:
-            try:
-                with open(submission.file_path, "r", encoding="utf-8") as f:
-                    code_content = f.read()
-                submission.code_content = code_content
-                submission.code_lines = code_content.splitlines()
-
-                # Подготавливаем словарь {line_number: comment_data} (пока пусто, добавим позже)
-                submission.code_comments_by_line = {}
-            except FileNotFoundError:
-                submission.code_content = "Файл с кодом не найден."
-                submission.code_lines = ["Файл с кодом не найден."]
-                submission.code_comments_by_line = {}
-
-    finally:
-        db.close()
+    # --- НАХОДИМ ЗАДАНИЕ ---
+    assignment = await db.scalar(select(Assignment).where(Assignment.id == assignment_id))
+    if not assignment:
+        return templates.TemplateResponse(
+            "error.html",
+            {"request": request, "message": "Задание не найдено"},
+            status_code=404
+        )
+
+    # --- НАХОДИМ САБМИШЕН (для *этого* студента и *этого* задания) ---
+    submission = await get_student_submission(db, assignment_id, user.id)
+
+    # --- ПЕРВАЯ СТРАНИЦА КОДА (остальные догружаются через /submission/{id}/lines) ---
+    code_page = await submission_code_page(submission) if submission else None
 
     return templates.TemplateResponse(
         "student/module_assignment.html",
@@ -543,44 +759,50 @@ async def view_assignment(request: Request, assignment_id: int):
             "user": user,
             "assignment": assignment,
             "submission": submission,
+            "code_page": code_page,
         }
     )
     
     
 @app.post("/student/submit-test/{assignment_id}", response_class=HTMLResponse)
-async def submit_test(request: Request, assignment_id: int, answers: dict = None):
-    user = get_current_user(request)
+async def submit_test(
+    request: Request,
+    assignment_id: int,
+    db: AsyncSession = Depends(get_db),
+    user: CachedUser = Depends(get_current_user)
+):
+    """Ответы — JSON {"answers": [...]} или поля формы answers[0], answers[1], ... (HTMX)."""
     if not user or user.role != "student":
         return HTMLResponse(content="<div class='alert alert-danger'>Ошибка аутентификации</div>", status_code=403)
 
-    db = SessionLocal()
     try:
         # Проверяем, что задание (тест) существует
-        assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
+        assignment = await db.scalar(select(Assignment).where(Assignment.id == assignment_id))
         if not assignment or not assignment.test_data:
             return HTMLResponse(content="<div class='alert alert-danger'>Тест не найден или не содержит данных</div>", status_code=404)
 
-        # Загружаем тестовые данные
-        test_data = json.loads(assignment.test_data)
-
-        # Проверяем, что пришли ответы
-        if not answers or 'answers' not in answers:
-             return HTMLResponse(content="<div class='alert alert-danger'>Не переданы ответы на тест</div>", status_code=400)
+        # Скомпилированный тест из кэша — JSON разбирается один раз на версию
+        compiled = quiz_cache.for_assignment(assignment)
 
-        submitted_answers = answers['answers'] # Ожидаем, что это список индексов ответов [0, 2, ...]
-
-        # Проверяем количество вопросов
-        if len(submitted_answers) != len(test_data['questions']):
-            return HTMLResponse(content="<div class='alert alert-danger'>Количество переданных ответов не совпадает с количеством вопросов</div>", status_code=400)
+        # Проверяем, что пришли ответы и что они подходят к тесту
+        try:
+            raw_answers = await read_test_answers(request, len(compiled))
+            if not raw_answers:
+                return HTMLResponse(content="<div class='alert alert-danger'>Не переданы ответы на тест</div>", status_code=400)
+            submitted_answers = normalize_answers(compiled, raw_answers)
+        except AnswerError as e:
+            return HTMLResponse(content=f"<div class='alert alert-danger'>{e}</div>", status_code=400)
 
         # Подсчёт баллов
-        correct_count = 0
-        total_questions = len(test_data['questions'])
-        for i, question in enumerate(test_data['questions']):
-            if submitted_answers[i] == question['correct_answer']:
-                correct_count += 1
+        total_questions = len(compiled)
+        correct_count, grade_percentage = grade_one(compiled, submitted_answers)
 
-        grade_percentage = (correct_count / total_questions) * 100
+        feedback = feedback_text(correct_count, total_questions)
+        if submission_queue.running:
+            # Запись в БД — фоновой пачкой (write_behind), студент получает результат сразу
+            await db.rollback()
+            submission_queue.submit(assignment_id, user.id, round(grade_percentage), feedback, json.dumps(submitted_answers))
+            return quiz_result_html(correct_count, total_questions, grade_percentage)
 
         # Создаём сабмишен в БД (для теста file_path будет None)
         submission = Submission(
@@ -588,24 +810,27 @@ async def submit_test(request: Request, assignment_id: int, answers: dict = None
             student_id=user.id,
             file_path=None, # Для теста
             status="reviewed", # Для теста сразу "проверен"
-            feedback=f"Тест пройден. Правильных ответов: {correct_count}/{total_questions}.",
-            grade=grade_percentage,
+            feedback=feedback,
+            grade=round(grade_percentage),  # колонка Integer
             test_answers=json.dumps(submitted_answers) # Сохраняем ответы студента
         )
         db.add(submission)
-        db.commit()
-        db.refresh(submission)
+        await db.flush()
+        await record_submission(db, user.id, assignment_id, newly_reviewed=True)
+        await db.commit()
 
-    except json.JSONDecodeError:
-        db.rollback()
+    except QuizFormatError:
+        await db.rollback()
         return HTMLResponse(content="<div class='alert alert-danger'>Ошибка при разборе данных теста</div>", status_code=500)
-    except Exception as e:
-        db.rollback()
-        # Лучше логировать ошибку: logger.error(f"Error submitting test: {e}")
-        return HTMLResponse(content=f"<div class='alert alert-danger'>Ошибка при сохранении: {str(e)}</div>", status_code=500)
-    finally:
-        db.close()
+    except Exception:
+        await db.rollback()
+        # Текст исключения — в лог, не клиенту: в нём бывают SQL и пути на сервере
+        logger.exception("Ошибка при сохранении ответов на тест %s", assignment_id)
+        return HTMLResponse(content="<div class='alert alert-danger'>Не удалось сохранить ответы, попробуйте ещё раз</div>", status_code=500)
+
+    return quiz_result_html(correct_count, total_questions, grade_percentage)
 
+def quiz_result_html(correct_count: int, total_questions: int, grade_percentage: float) -> str:
     # Возвращаем HTML-ответ для HTMX
     return f"""
     <div class="alert alert-success alert-dismissible fade show d-flex align-items-center" role="alert">
@@ -622,69 +847,90 @@ async def submit_test(request: Request, assignment_id: int, answers: dict = None
     </script>
     """
 
+async def read_test_answers(request: Request, n_questions: int):
+    """Сырые ответы из JSON или формы; None — ответов нет. AnswerError — тело не того вида."""
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            body = await request.json()
+        except ValueError:
+            raise AnswerError("Некорректный JSON в теле запроса") from None
+        answers = body.get("answers") if isinstance(body, dict) else None
+        if answers is not None and not isinstance(answers, list):
+            raise AnswerError("Ответы должны быть списком")
+        return answers
+    form = await request.form()
+    answers = []
+    for i in range(n_questions):
+        # multi-вопрос — несколько чекбоксов с одним именем
+        values = form.getlist(f"answers[{i}]")
+        answers.append(values if len(values) > 1 else values[0] if values else None)
+    return answers if any(a is not None for a in answers) else None
+
 # --- СТАРЫЙ РОУТ ДЛЯ ОТПРАВКИ ФАЙЛА ---
 @app.post("/student/submit/{assignment_id}", response_class=HTMLResponse)
 async def submit_assignment(
     request: Request,
     assignment_id: int,
-    file: UploadFile = File(...)
+    db: AsyncSession = Depends(get_db),
+    user: CachedUser = Depends(get_current_user)
 ):
-    user = get_current_user(request)
+    """
+    Загрузка файла решения.
+
+    Тело запроса читается потоком (storage.receive_upload), поэтому в
+    параметрах нет UploadFile: FastAPI не буферизует файл заранее.
+    """
     if not user or user.role != "student":
         return HTMLResponse(content="<div class='alert alert-danger'>Ошибка аутентификации</div>", status_code=403)
 
-    db = SessionLocal()
-    try:
-        # Проверяем, что задание существует
-        assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
-        if not assignment:
-            return HTMLResponse(content="<div class='alert alert-danger'>Задание не найдено</div>", status_code=404)
+    # Проверяем, что задание существует
+    assignment = await db.scalar(select(Assignment).where(Assignment.id == assignment_id))
+    if not assignment:
+        return HTMLResponse(content="<div class='alert alert-danger'>Задание не найдено</div>", status_code=404)
 
-        # Проверяем, что задание НЕ тест (т.е. test_data == None или пустой)
-        # Используем `or` для проверки None или пустой строки
-        if assignment.test_data:
-            return HTMLResponse(content="<div class='alert alert-danger'>Задание предназначено для теста, а не для файла</div>", status_code=400)
+    # Проверяем, что задание НЕ тест (т.е. test_data == None или пустой)
+    if assignment.test_data:
+        return HTMLResponse(content="<div class='alert alert-danger'>Задание предназначено для теста, а не для файла</div>", status_code=400)
 
-        # Создаём директорию uploads, если её нет
-        UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    max_bytes = assignment.max_upload_bytes or DEFAULT_MAX_UPLOAD_BYTES
+    # Отпускаем соединение с БД на время загрузки — она может идти долго
+    await db.rollback()
 
-        # Сохраняем файл
-        safe_filename = f"{user.id}_{assignment_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}"
-        filepath = UPLOAD_DIR / safe_filename
-        print(f"DEBUG: Attempting to save file to {filepath}") # <-- ВРЕМЕННЫЙ ЛОГ
+    try:
+        upload = await receive_upload(request, UPLOAD_TMP_DIR, max_bytes)
+    except UploadTooLarge as e:
+        return HTMLResponse(content=f"<div class='alert alert-danger'>{e}</div>", status_code=413)
+    except UploadError as e:
+        return HTMLResponse(content=f"<div class='alert alert-danger'>{e}</div>", status_code=400)
 
-        with open(filepath, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-        print(f"DEBUG: File saved successfully to {filepath}") # <-- ВРЕМЕННЫЙ ЛОГ
+    try:
+        # Одинаковое содержимое хранится один раз (uploads/blobs/ab/cd/<sha256>)
+        blob, _ = await store_blob(upload)
 
         # Создаём сабмишен в БД
         submission = Submission(
             assignment_id=assignment_id,
             student_id=user.id,
-            file_path=str(filepath),
+            file_path=str(blob),
+            file_name=safe_filename(upload.filename),
             status="pending",
             feedback="",
             grade=0
         )
         db.add(submission)
-        db.commit()
-        # db.refresh(submission) # <-- УБРАН
-
-    except FileNotFoundError:
-        db.rollback()
-        print("ERROR: FileNotFoundError during file save") # <-- ВРЕМЕННЫЙ ЛОГ
-        return HTMLResponse(content="<div class='alert alert-danger'>Ошибка при сохранении файла на сервере (FileNotFoundError)</div>", status_code=500)
-    except OSError as e_os: # <-- Ловим более общую ошибку при работе с файлами
-        db.rollback()
-        print(f"ERROR: OSError during file save: {e_os}") # <-- ВРЕМЕННЫЙ ЛОГ
-        return HTMLResponse(content=f"<div class='alert alert-danger'>Ошибка при сохранении файла на сервере (OSError): {str(e_os)}</div>", status_code=500)
-    except Exception as e:
-        print(f"ERROR: General exception in submit_assignment: {e}") # <-- ВРЕМЕННЫЙ ЛОГ
-        db.rollback()
-        # Лучше логировать ошибку: logger.error(f"Error submitting assignment: {e}")
-        return HTMLResponse(content=f"<div class='alert alert-danger'>Ошибка при сохранении: {str(e)}</div>", status_code=500)
-    finally:
-        db.close()
+        await add_blob_ref(db, upload.sha256, upload.size)
+        await db.flush()
+        await record_submission(db, user.id, assignment_id, newly_reviewed=False)
+        await db.commit()
+        # Подсветка — в фоне, к открытию работы преподавателем она уже готова
+        highlight_cache.schedule(blob, submission.file_name)
+
+    except Exception:
+        await db.rollback()
+        await discard_upload(upload)
+        # Текст исключения — в лог, не клиенту: в нём бывают SQL и пути на сервере
+        logger.exception("Ошибка при сохранении сабмишена задания %s", assignment_id)
+        return HTMLResponse(content="<div class='alert alert-danger'>Не удалось сохранить работу, попробуйте ещё раз</div>", status_code=500)
 
     # Возвращаем HTML-ответ для HTMX
     return """
@@ -704,168 +950,6 @@ async def submit_assignment(
 
 
 # Временные данные — замени на БД позже
-# --- ГЛОБАЛЬНЫЕ ФЕЙКОВЫЕ ДАННЫЕ ---
-FAKE_COURSES = [
-    {
-        "id": 1,
-        "title": "Python для анализа данных",
-        "description": "Изучите Python и основные библиотеки для анализа данных: NumPy, Pandas, Matplotlib, Seaborn.",
-        "tags": ["python", "data", "pandas", "numpy", "matplotlib", "seaborn"],
-        "author": "Преподаватель К.",
-        "teacher_name": "Борис Петров",
-        "teacher_email": "boris@psb.edu",
-        "teacher_telegram": "https://t.me/psb_coal_course",
-        "modules": [ # 15 модулей, как запланировано
-            {
-                "id": 1,
-                "title": "Введение в Python и Jupyter",
-                "type": "text",
-                "content": "<h3>Установка Python</h3><p>Установите Python, pip, Jupyter Notebook...</p><h3>Основы синтаксиса</h3><p>Переменные, типы данных, циклы, функции...</p>"
-            },
-            {
-                "id": 2,
-                "title": "Библиотека NumPy",
-                "type": "text",
-                "content": "<h3>Создание массивов</h3><p>np.array, np.zeros, np.ones...</p><h3>Операции</h3><p>Индексация, срезы, математика...</p>"
-            },
-            {
-                "id": 3,
-                "title": "Практика: NumPy",
-                "type": "assignment",
-                "content": "<h3>Задание 1: NumPy</h3><p>Создайте массив, выполните математические операции, найдите мин/макс, срезайте данные.</p>",
-                "assignment_id": 1
-            },
-            {
-                "id": 4,
-                "title": "Библиотека Pandas",
-                "type": "text",
-                "content": "<h3>DataFrame и Series</h3><p>Создание, индексация (loc, iloc)...</p><h3>Чтение CSV</h3><p>pd.read_csv...</p>"
-            },
-            {
-                "id": 5,
-                "title": "Практика: Pandas #1",
-                "type": "assignment",
-                "content": "<h3>Задание 2: Pandas</h3><p>Загрузите CSV, выведите первые 5 строк, отфильтруйте по условию, посчитайте статистику.</p>",
-                "assignment_id": 2
-            },
-            {
-                "id": 6,
-                "title": "Визуализация с Matplotlib/Seaborn",
-                "type": "text",
-                "content": "<h3>Matplotlib</h3><p>plot, scatter, hist...</p><h3>Seaborn</h3><p>Введение в статистическую визуализацию...</p>"
-            },
-            {
-                "id": 7,
-                "title": "Практика: Визуализация",
-                "type": "assignment",
-                "content": "<h3>Задание 3: Визуализация</h3><p>Постройте 2-3 разных графика по данным из предыдущего задания.</p>",
-                "assignment_id": 3
-            },
-            {
-                "id": 8,
-                "title": "Очистка данных",
-                "type": "text",
-                "content": "<h3>Обработка NaN</h3><p>dropna, fillna...</p><h3>Удаление дубликатов</h3><p>drop_duplicates...</p>"
-            },
-            {
-                "id": 9,
-                "title": "Практика: Очистка данных",
-                "type": "assignment",
-                "content": "<h3>Задание 4: Очистка</h3><p>Возьмите 'грязный' датасет, примените методы очистки.</p>",
-                "assignment_id": 4
-            },
-            {
-                "id": 10,
-                "title": "Группировка и агрегация",
-                "type": "text",
-                "content": "<h3>groupby</h3><p>Использование...</p><h3>agg</h3><p>Функции агрегации...</p>"
-            },
-            {
-                "id": 11,
-                "title": "Практика: Группировка",
-                "type": "assignment",
-                "content": "<h3>Задание 5: Группировка</h3><p>Сгруппируйте данные по категории, посчитайте агрегаты.</p>",
-                "assignment_id": 5
-            },
-            {
-                "id": 12,
-                "title": "Объединение данных (merge/join)",
-                "type": "text",
-                "content": "<h3>pd.merge</h3><p>Соединение таблиц...</p><h3>pd.concat</h3><p>Объединение по осям...</p>"
-            },
-            {
-                "id": 13,
-                "title": "Практика: Объединение",
-                "type": "assignment",
-                "content": "<h3>Задание 6: Объединение</h3><p>Объедините 2 CSV-файла по ключу.</p>",
-                "assignment_id": 6
-            },
-            {
-                "id": 14,
-                "title": "Введение в анализ",
-                "type": "text",
-                "content": "<h3>Пример анализа</h3><p>Анализ реального датасета...</p><h3>Формулировка гипотез</h3><p>Как задавать вопросы данным...</p>"
-            },
-            {
-                "id": 15,
-                "title": "Финальный проект",
-                "type": "assignment",
-                "content": "<h3>Финальный проект</h3><p>Полный цикл анализа: загрузка, очистка, визуализация, выводы.</p>",
-                "assignment_id": 7
-            }
-        ]
-    },
-    {"id": 2, "title": "React для чайников", "description": "С нуля до хакатона за 2 часа"},
-    {"id": 3, "title": "FastAPI + HTMX", "description": "Создай веб-сервис без боли"},
-    {"id": 4, "title": "ML для угольной промышленности", "description": "Предсказание рисков с нейросетями"},
-    {"id": 5, "title": "Безопасность в горных выработках", "description": "Методы предотвращения обвалов и взрывов"},
-    {"id": 6, "title": "Python для анализа данных", "description": "Pandas, NumPy, визуализация"},
-    {"id": 7, "title": "Основы вентиляции шахт", "description": "Контроль газа и температуры под землёй"},
-    {"id": 8, "title": "Docker для разработчиков", "description": "Контейнеризация от новичка до профи"},
-    {"id": 9, "title": "Механика горных пород", "description": "Изучение прочности и деформации массивов"},
-    {"id": 10, "title": "SQL и реляционные БД", "description": "От SELECT до сложных JOIN'ов"},
-    {"id": 11, "title": "Автоматизация добычи угля", "description": "Роботы, дроны и умные системы"},
-    {"id": 12, "title": "Git и управление версиями", "description": "Работа в команде без конфликтов"},
-    {"id": 13, "title": "Теплообмен в угольных пластах", "description": "Физические модели самовозгорания"},
-    {"id": 14, "title": "TypeScript в реальных проектах", "description": "Типизация, интерфейсы, продакшен"},
-    {"id": 15, "title": "Геоинформационные системы (ГИС)", "description": "Картография для горной промышленности"},
-    {"id": 16, "title": "REST API: design и best practices", "description": "Как проектировать API, которым приятно пользоваться"},
-    {"id": 17, "title": "Экология добычи полезных ископаемых", "description": "Снижение ущерба окружающей среде"},
-    {"id": 18, "title": "PostgreSQL для бэкенд-разработки", "description": "Индексы, транзакции, оптимизация"},
-    {"id": 19, "title": "Сенсорные сети для мониторинга шахт", "description": "IoT в условиях высокой опасности"},
-    {"id": 20, "title": "Алгоритмы и структуры данных", "description": "База для всех олимпиад и собесов"},
-    {"id": 21, "title": "Метановый контроль на шахтах", "description": "Детекция и предотвращение взрывов"},
-    {"id": 22, "title": "Тестирование на Python (pytest)", "description": "Unit, integration, mocking"},
-    {"id": 23, "title": "Гидрогеология угольных месторождений", "description": "Влияние воды на устойчивость пластов"},
-    {"id": 24, "title": "Frontend Performance Optimization", "description": "Как ускорить сайт до 90+ в Lighthouse"},
-    {"id": 25, "title": "Экономика горного производства", "description": "Рентабельность, затраты, ROI"},
-    {"id": 26, "title": "Аутентификация и авторизация", "description": "JWT, OAuth2, сессии, безопасность"},
-    {"id": 27, "title": "Моделирование рисков в добыче", "description": "Monte Carlo, сценарный анализ"},
-    {"id": 28, "title": "Linux для бэкенд-разработчика", "description": "Команды, процессы, сети, bash"},
-    {"id": 29, "title": "Транспорт угля: логистика и автоматизация", "description": "От забоя до порта"},
-    {"id": 30, "title": "Асинхронный Python (async/await)", "description": "FastAPI, aiohttp, производительность"},
-    {"id": 31, "title": "История угольной промышленности", "description": "От паровых машин до умных шахт"},
-    {"id": 32, "title": "CSS Grid и Flexbox", "description": "Макеты без бутстрапа"},
-    {"id": 33, "title": "Оценка запасов угля", "description": "Геологоразведка и подсчёт ресурсов"},
-    {"id": 34, "title": "WebSocket и реалтайм", "description": "Чаты, уведомления, дашборды"},
-    {"id": 35, "title": "Правила техники безопасности на шахтах", "description": "ГОСТы, инструктажи, экипировка"},
-    {"id": 36, "title": "Запуск MVP за выходные", "description": "HTMX, FastAPI, SQLite — без боли"},
-    {"id": 37, "title": "Геомеханика массивов горных пород", "description": "Прогноз устойчивости выработок"},
-    {"id": 38, "title": "React Query и управление состоянием", "description": "Забудь про Redux"},
-    {"id": 39, "title": "Переработка угля: коксование и газификация", "description": "От сырья до химии"},
-    {"id": 40, "title": "Миграции и Alembic", "description": "Управление схемой БД в FastAPI"},
-    {"id": 41, "title": "Энергосбережение в горной промышленности", "description": "Снижение затрат на вентиляцию и подъём"},
-    {"id": 42, "title": "Deploy FastAPI на сервер", "description": "Nginx, Gunicorn, systemd, HTTPS"},
-    {"id": 43, "title": "Подземная геофизика", "description": "Сейсморазведка и каротаж"},
-    {"id": 44, "title": "Jinja2 и серверный рендеринг", "description": "SEO-friendly интерфейсы без JS"},
-    {"id": 45, "title": "Углеродный след добычи", "description": "Углеродный аудит и компенсации"},
-    {"id": 46, "title": "CI/CD для веб-проектов", "description": "GitHub Actions, тесты, деплой"},
-    {"id": 47, "title": "Открытые данные о добыче", "description": "Росстат, US Energy, API"},
-    {"id": 48, "title": "Оптимизация запросов к БД", "description": "EXPLAIN, индексы, N+1 проблема"},
-    {"id": 49, "title": "Цифровой двойник шахты", "description": "BIM, 3D-модели, IoT-интеграция"},
-    {"id": 50, "title": "Как выиграть хакатон по горной тематике", "description": "Идеи, командная работа, презентация"},
-]
-
 FAKE_VIDEOS = [
     {
         "id": 1,
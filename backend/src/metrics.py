@@ -0,0 +1,279 @@
+# src/metrics.py
+"""
+Метрики приложения в текстовом формате Prometheus (GET /metrics).
+
+Счётчики и гистограммы живут в памяти процесса: observe() — это bisect по
+границам корзин и пара сложений в словаре, без блокировок (наблюдения
+приходят из потока event loop; в редкой гонке с потоком теряется одно
+наблюдение, а не корректность приложения).
+
+Несколько воркеров uvicorn: каждый раз в FLUSH_INTERVAL секунд воркер
+атомарно (tmp + rename) пишет снимок своих значений в
+METRICS_DIR/<pid>.json, а /metrics складывает свои живые значения со
+снимками остальных воркеров. Снимки завершившихся воркеров остаются —
+счётчики не «откатываются» при перезапуске воркера; воркер с тем же pid
+продолжает с его значений. Каталог очищают при деплое (новый контейнер).
+"""
+import asyncio
+import bisect
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = Path(os.environ.get("METRICS_DIR", "spool/metrics"))
+FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 1.0))
+
+# Секунды: от быстрых SQL до медленных загрузок
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Байты: 1 КБ … 64 МБ, шаг ×4
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(9))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def dump(self) -> dict:
+        return {json.dumps(labels): value for labels, value in self.values.items()}
+
+    def load(self, samples: dict) -> None:
+        for key, value in samples.items():
+            labels = tuple(json.loads(key))
+            self.values[labels] = self.values.get(labels, 0.0) + value
+
+    def render(self, samples: dict) -> list:
+        return [f"{self.name}{_labels(self.labelnames, json.loads(key))} {_number(value)}" for key, value in samples.items()]
+
+    @staticmethod
+    def merge(a, b):
+        return a + b
+
+
+class Histogram:
+    """Корзины хранятся не накопленными: [по корзинам..., +Inf, сумма]; le считается при выводе."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def dump(self) -> dict:
+        return {json.dumps(labels): list(state) for labels, state in self.values.items()}
+
+    def load(self, samples: dict) -> None:
+        for key, state in samples.items():
+            labels = tuple(json.loads(key))
+            current = self.values.get(labels)
+            self.values[labels] = self.merge(current, state) if current else list(state)
+
+    def render(self, samples: dict) -> list:
+        lines = []
+        for key, state in samples.items():
+            labels = json.loads(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + [le])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(state[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+    @staticmethod
+    def merge(a, b):
+        return [x + y for x, y in zip(a, b)]
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for v in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class Registry:
+    def __init__(self, metrics_dir: Path = METRICS_DIR, flush_interval: float = FLUSH_INTERVAL):
+        self.metrics_dir = metrics_dir
+        self.flush_interval = flush_interval
+        self.metrics: Dict[str, object] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> dict:
+        return {name: metric.dump() for name, metric in self.metrics.items()}
+
+    @property
+    def _own_path(self) -> Path:
+        return self.metrics_dir / f"{os.getpid()}.json"
+
+    def write_snapshot(self) -> None:
+        self.metrics_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self._own_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.snapshot()), encoding="utf-8")
+        os.replace(tmp, self._own_path)
+
+    def _other_snapshots(self):
+        if not self.metrics_dir.is_dir():
+            return
+        for path in self.metrics_dir.glob("*.json"):
+            if path == self._own_path:
+                continue
+            try:
+                yield json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                # Файл удалили при очистке каталога — пропускаем
+                continue
+
+    def render(self) -> str:
+        """Текст для /metrics: значения этого процесса + снимки остальных воркеров."""
+        merged = self.snapshot()
+        for snapshot in self._other_snapshots():
+            for name, samples in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                target = merged.setdefault(name, {})
+                for key, value in samples.items():
+                    target[key] = metric.merge(target[key], value) if key in target else value
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render(merged.get(name, {})))
+        return "\n".join(lines) + "\n"
+
+    async def start(self) -> None:
+        """Продолжает со снимка прежнего процесса с этим pid и запускает запись снимков."""
+        if self._task is not None:
+            return
+        if self._own_path.exists():
+            try:
+                snapshot = json.loads(self._own_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                snapshot = {}
+            for name, samples in snapshot.items():
+                if name in self.metrics:
+                    self.metrics[name].load(samples)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.write_snapshot()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.write_snapshot()
+            except OSError:
+                logger.exception("Не удалось записать снимок метрик в %s", self.metrics_dir)
+
+
+registry = Registry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса", ["method", "route", "status"]
+)
+TEMPLATE_RENDER_SECONDS = registry.histogram(
+    "template_render_seconds", "Время рендера шаблона Jinja2", ["template"]
+)
+DB_POOL_CHECKOUT_WAIT_SECONDS = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Ожидание свободного соединения в пуле БД", ["pool"]
+)
+UPLOAD_BYTES = registry.histogram(
+    "upload_size_bytes", "Размер принятых файлов решений", buckets=SIZE_BUCKETS
+)
+UPLOAD_SECONDS = registry.histogram(
+    "upload_duration_seconds", "Время приёма файла решения", ["outcome"]
+)
+QUIZ_GRADED = registry.counter(
+    "quiz_submissions_graded_total", "Проверено сабмишенов тестов"
+)
+QUIZ_GRADING_SECONDS = registry.histogram(
+    "quiz_grading_seconds", "Время проверки пачки ответов (один сабмишен или перепроверка задания)"
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: гистограмма времени запроса по методу, шаблону пути и статусу."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Шаблон пути, а не сам путь: иначе по метке на каждый id. Без роута (404) — одна метка
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, scope["method"], route, str(status))
+
+
+def instrument_templates(env) -> None:
+    """Замер рендера шаблонов окружения Jinja2 (вызывать до загрузки первого шаблона)."""
+    base = env.template_class
+
+    class TimedTemplate(base):
+        def render(self, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return super().render(*args, **kwargs)
+            finally:
+                TEMPLATE_RENDER_SECONDS.observe(time.perf_counter() - started, self.name or "<string>")
+
+    env.template_class = TimedTemplate
@@ -0,0 +1,125 @@
+# src/migrate.py
+"""
+Схема БД: миграции Alembic (backend/migrations) и проверка индексов.
+
+Обновить схему (новая БД создаётся с нуля; БД, созданная до миграций
+через create_all, сначала помечается базовой ревизией):
+    python -m backend.src.migrate upgrade
+
+Проверить, что горячие запросы идут по индексам (EXPLAIN), — код
+возврата 1, если какой-то запрос сканирует таблицу или сортирует сам:
+    python -m backend.src.migrate check-indexes
+Та же проверка на БД, созданной миграциями, — в тестах (tests/test_indexes.py).
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect, select, text
+
+from .models import Enrollment, Module, Assignment, Video, Submission, StudentProgress
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+# Ревизия схемы, которую создавал create_all до появления миграций
+BASELINE_REVISION = "0001"
+
+# Запросы, на которых держатся страницы студента и преподавателя
+HOT_QUERIES = {
+    "запись на курс": select(Enrollment.id).where(Enrollment.user_id == 1, Enrollment.course_id == 1),
+    "студенты курса": select(Enrollment.user_id).where(Enrollment.course_id == 1),
+    "модули курса": select(Module).where(Module.course_id == 1).order_by(Module.order),
+    "задания модулей": select(Assignment).where(Assignment.module_id.in_([1, 2, 3])),
+    "видео модулей": select(Video).where(Video.module_id.in_([1, 2, 3])),
+    "сабмишен студента": select(Submission).where(Submission.assignment_id == 1, Submission.student_id == 1),
+    "очередь проверки": (
+        select(Submission.id)
+        .where(Submission.status == "pending")
+        .order_by(Submission.submitted_at, Submission.id)
+        .limit(50)
+    ),
+    "прогресс по курсу": select(StudentProgress).where(
+        StudentProgress.user_id == 1, StudentProgress.course_id == 1
+    ),
+}
+
+
+def alembic_config() -> Config:
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def upgrade_database(engine, revision: str = "head") -> None:
+    config = alembic_config()
+    with engine.begin() as conn:
+        config.attributes["connection"] = conn
+        tables = set(inspect(conn).get_table_names())
+        if "alembic_version" not in tables and "users" in tables:
+            # Схему создал create_all: 0001 уже есть, 0002 догонит недостающее
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, revision)
+
+
+def downgrade_database(engine, revision: str) -> None:
+    config = alembic_config()
+    with engine.begin() as conn:
+        config.attributes["connection"] = conn
+        command.downgrade(config, revision)
+
+
+def _bad_plan_lines(conn, statement) -> List[str]:
+    """Строки плана, где таблица читается целиком или результат сортируется отдельно."""
+    sql = str(statement.compile(conn, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        plan = [row.detail for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+        return [line for line in plan if line.startswith("SCAN") or "TEMP B-TREE" in line]
+    # PostgreSQL на маленьких таблицах выбирает Seq Scan и при наличии индекса —
+    # запрещаем его, и если Seq Scan всё равно остался, подходящего индекса нет
+    with conn.begin_nested():
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        conn.execute(text("SET LOCAL enable_sort = off"))
+        plan = [row[0] for row in conn.execute(text(f"EXPLAIN {sql}"))]
+    return [line.strip() for line in plan if "Seq Scan" in line or line.strip().startswith("->  Sort")]
+
+
+def check_indexes(engine) -> Dict[str, List[str]]:
+    """Горячие запросы без индекса: {название: плохие строки плана}."""
+    problems = {}
+    with engine.connect() as conn:
+        for name, statement in HOT_QUERIES.items():
+            bad = _bad_plan_lines(conn, statement)
+            if bad:
+                problems[name] = bad
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Миграции схемы БД")
+    parser.add_argument("command", choices=["upgrade", "downgrade", "check-indexes"])
+    parser.add_argument("revision", nargs="?", help="ревизия (upgrade — по умолчанию head)")
+    args = parser.parse_args()
+
+    from .database import engine
+    if args.command == "upgrade":
+        upgrade_database(engine, args.revision or "head")
+        print("✅ Схема БД обновлена")
+    elif args.command == "downgrade":
+        if not args.revision:
+            parser.error("укажите ревизию, например: downgrade 0002")
+        downgrade_database(engine, args.revision)
+        print(f"✅ Схема БД откачена до {args.revision}")
+    else:
+        problems = check_indexes(engine)
+        for name, lines in problems.items():
+            print(f"❌ {name}: " + "; ".join(lines))
+        if problems:
+            sys.exit(1)
+        print(f"✅ Все горячие запросы ({len(HOT_QUERIES)}) идут по индексам")
+
+
+if __name__ == "__main__":
+    main()
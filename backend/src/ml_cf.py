@@ -0,0 +1,227 @@
+# src/ml_cf.py
+"""
+Item-item коллаборативная фильтрация по записям на курсы и оценкам.
+
+Обучение — офлайн (CLI), результат — компактная матрица соседей:
+для каждого курса top-N похожих курсов и их веса. Матрица сохраняется
+в .npy и открывается через np.load(mmap_mode="r"), так что все воркеры
+uvicorn делят одни и те же страницы файла без копирования.
+
+Каждое обучение пишет три файла в новый каталог versions/<метка>/, а
+симлинк current переключается на него одним rename: воркер открывает
+либо старую модель целиком, либо новую, но не смесь файлов двух обучений.
+
+Обучить модель:
+    python -m backend.src.ml_cf train --out models/cf --neighbors 50
+"""
+import argparse
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import select, func, case, and_
+
+from .models import Enrollment, Submission, Assignment, Module
+
+# Где воркеры ищут обученную модель
+CF_MODEL_DIR = Path(os.environ.get("CF_MODEL_DIR", "models/cf"))
+
+ITEM_IDS_FILE = "item_ids.npy"
+NEIGHBORS_FILE = "neighbors.npy"
+WEIGHTS_FILE = "weights.npy"
+# Симлинк на каталог текущей модели и сколько прежних версий хранить
+CURRENT_LINK = "current"
+VERSIONS_DIR = "versions"
+KEEP_VERSIONS = 3
+
+
+class ItemItemModel:
+    """Обученная модель: item_ids[i] — id курса, neighbors[i] — позиции соседей, weights[i] — их веса."""
+
+    def __init__(self, item_ids: np.ndarray, neighbors: np.ndarray, weights: np.ndarray, version: str = ""):
+        self.item_ids = item_ids
+        self.neighbors = neighbors
+        self.weights = weights
+        # Метка обучения (mtime файла) — по ней кэши отличают старую модель от новой
+        self.version = version
+        self._position = {int(cid): i for i, cid in enumerate(item_ids)}
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["ItemItemModel"]:
+        """Открывает текущую версию модели через mmap (zero-copy). None, если модель ещё не обучена."""
+        directory = Path(directory)
+        try:
+            # Симлинк читается один раз: все три файла — из одной версии, даже если её сейчас сменят
+            version = Path(os.readlink(directory / CURRENT_LINK)).name
+        except OSError:
+            return None
+        path = directory / VERSIONS_DIR / version
+        return cls(
+            np.load(path / ITEM_IDS_FILE, mmap_mode="r"),
+            np.load(path / NEIGHBORS_FILE, mmap_mode="r"),
+            np.load(path / WEIGHTS_FILE, mmap_mode="r"),
+            version=version,
+        )
+
+    def save(self, directory: Path) -> str:
+        """Пишет модель новой версией и переключает на неё current. Возвращает метку версии."""
+        directory = Path(directory)
+        version = str(time.time_ns())
+        path = directory / VERSIONS_DIR / version
+        path.mkdir(parents=True)
+        for name, array in ((ITEM_IDS_FILE, self.item_ids), (NEIGHBORS_FILE, self.neighbors), (WEIGHTS_FILE, self.weights)):
+            with open(path / name, "wb") as f:
+                np.save(f, np.ascontiguousarray(array))
+                f.flush()
+                os.fsync(f.fileno())
+        # Новый симлинк рядом и rename поверх current — атомарная смена версии
+        tmp = directory / (CURRENT_LINK + ".tmp")
+        if tmp.is_symlink():
+            tmp.unlink()
+        os.symlink(Path(VERSIONS_DIR) / version, tmp)
+        os.replace(tmp, directory / CURRENT_LINK)
+        self.version = version
+        _remove_old_versions(directory, keep=version)
+        return version
+
+    def recommend(self, course_ids: List[int], k: int) -> List[Tuple[int, float, int]]:
+        """
+        Top-k курсов по соседям курсов пользователя.
+
+        Возвращает [(course_id, score, id курса пользователя, давший наибольший вклад)].
+        """
+        seen = np.fromiter((self._position[c] for c in course_ids if c in self._position), dtype=np.int64)
+        if len(seen) == 0:
+            return []
+        neighbors = np.asarray(self.neighbors[seen]).ravel()
+        weights = np.asarray(self.weights[seen]).ravel()
+        source = np.repeat(seen, self.neighbors.shape[1])
+        keep = (neighbors >= 0) & ~np.isin(neighbors, seen)
+        neighbors, weights, source = neighbors[keep], weights[keep], source[keep]
+        if len(neighbors) == 0:
+            return []
+
+        items, inverse = np.unique(neighbors, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        # Для каждого кандидата — источник с максимальным вкладом
+        order = np.lexsort((-weights, inverse))
+        first = np.r_[0, np.flatnonzero(np.diff(inverse[order])) + 1]
+        best_source = source[order[first]]
+
+        top = np.argsort(-scores, kind="stable")[:k]
+        return [
+            (int(self.item_ids[items[i]]), float(scores[i]), int(self.item_ids[best_source[i]]))
+            for i in top
+        ]
+
+
+def _remove_old_versions(directory: Path, keep: str) -> None:
+    """
+    Удаляет версии старше KEEP_VERSIONS последних. Воркер, который ещё держит
+    mmap удалённых файлов, продолжает их читать: данные живут до munmap.
+    """
+    versions = sorted(
+        (p for p in (directory / VERSIONS_DIR).iterdir() if p.is_dir() and p.name.isdigit()),
+        key=lambda p: int(p.name),
+    )
+    for path in versions[:-KEEP_VERSIONS]:
+        if path.name != keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_interactions(engine) -> Tuple[sp.csr_matrix, np.ndarray]:
+    """
+    Матрица пользователь × курс и id курсов её столбцов.
+
+    Вес записи на курс — 1 плюс средняя нормированная оценка студента по курсу
+    (тест: 0–100%, файл: 0–10), так что хорошо пройденные курсы весят больше.
+    """
+    normalized_grade = case(
+        (Assignment.test_data.is_not(None), Submission.grade / 100.0),
+        else_=Submission.grade / 10.0,
+    )
+    grades = (
+        select(
+            Submission.student_id.label("user_id"),
+            Module.course_id.label("course_id"),
+            func.avg(normalized_grade).label("grade"),
+        )
+        .join(Assignment, Assignment.id == Submission.assignment_id)
+        .join(Module, Module.id == Assignment.module_id)
+        .where(Submission.status == "reviewed", Submission.grade.is_not(None))
+        .group_by(Submission.student_id, Module.course_id)
+        .subquery()
+    )
+    query = (
+        select(Enrollment.user_id, Enrollment.course_id, 1.0 + func.coalesce(grades.c.grade, 0.0))
+        .outerjoin(grades, and_(
+            grades.c.user_id == Enrollment.user_id,
+            grades.c.course_id == Enrollment.course_id,
+        ))
+    )
+    with engine.connect() as conn:
+        rows = conn.execute(query).all()
+    if not rows:
+        return sp.csr_matrix((0, 0)), np.empty(0, dtype=np.int64)
+
+    user_ids, course_ids, values = (np.array(column) for column in zip(*rows))
+    users, user_index = np.unique(user_ids, return_inverse=True)
+    items, item_index = np.unique(course_ids, return_inverse=True)
+    matrix = sp.csr_matrix(
+        (values.astype(np.float32), (user_index, item_index)),
+        shape=(len(users), len(items)),
+    )
+    return matrix, items.astype(np.int64)
+
+
+def train(interactions: sp.csr_matrix, item_ids: np.ndarray, n_neighbors: int = 50) -> ItemItemModel:
+    """Косинусная близость курсов по столбцам матрицы взаимодействий, top-N соседей на курс."""
+    n_items = interactions.shape[1]
+    n_neighbors = max(1, min(n_neighbors, n_items - 1)) if n_items > 1 else 1
+    neighbors = np.full((n_items, n_neighbors), -1, dtype=np.int32)
+    weights = np.zeros((n_items, n_neighbors), dtype=np.float32)
+    if n_items == 0:
+        return ItemItemModel(item_ids, neighbors, weights)
+
+    norms = np.sqrt(np.asarray(interactions.multiply(interactions).sum(axis=0)).ravel())
+    norms[norms == 0] = 1
+    normalized = interactions @ sp.diags(1 / norms)
+    similarity = (normalized.T @ normalized).tocsr()  # курс × курс, разреженная
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+
+    for i in range(n_items):
+        start, end = similarity.indptr[i], similarity.indptr[i + 1]
+        cols, vals = similarity.indices[start:end], similarity.data[start:end]
+        if len(cols) > n_neighbors:
+            best = np.argpartition(-vals, n_neighbors - 1)[:n_neighbors]
+            cols, vals = cols[best], vals[best]
+        order = np.argsort(-vals, kind="stable")
+        neighbors[i, :len(cols)] = cols[order]
+        weights[i, :len(cols)] = vals[order]
+    return ItemItemModel(item_ids, neighbors, weights)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-обучение item-item модели рекомендаций")
+    parser.add_argument("command", choices=["train"])
+    parser.add_argument("--out", type=Path, default=CF_MODEL_DIR)
+    parser.add_argument("--neighbors", type=int, default=50)
+    args = parser.parse_args()
+
+    from .database import engine
+    interactions, item_ids = load_interactions(engine)
+    model = train(interactions, item_ids, n_neighbors=args.neighbors)
+    version = model.save(args.out)
+    print(
+        f"✅ Модель {version} сохранена в {args.out}: {interactions.shape[0]} пользователей, "
+        f"{len(item_ids)} курсов, {model.neighbors.shape[1]} соседей на курс"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,71 +1,492 @@
 # src/ml_recommender.py
-from typing import List, Dict
-from .models import User
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Dict, Iterable, Optional
+
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import select, event, func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, object_session
+
+from .database import engine
+from .models import Course, Enrollment
+from .ml_cf import ItemItemModel
+from .recommendation_cache import recommendation_cache
+
+logger = logging.getLogger(__name__)
+
+# Как часто воркер сверяет индекс с БД: курсы меняют и другие воркеры, и скрипты
+REFRESH_SECONDS = float(os.environ.get("RECOMMENDER_REFRESH_SECONDS", 30))
+# Транзакция могла закоммитить курс позже своей метки updated_at — изменённые
+# курсы берутся с таким запасом до прошлой синхронизации
+REFRESH_OVERLAP = timedelta(seconds=60)
+# Сколько рекомендаций хранится в кэше: запросы с меньшим k берут начало списка
+RECOMMENDATIONS_CACHED = 10
+
+TOKEN_RE = re.compile(r"\w{2,}")
+
+# Во сколько раз слово из названия/тега весомее слова из описания
+TITLE_WEIGHT = 2
+TAG_WEIGHT = 3
+
+
+def tokenize_course(title: Optional[str], description: Optional[str], tags: Optional[str]) -> Dict[str, int]:
+    """Частоты термов курса: слова названия, описания и теги (как отдельные термы "tag:...")."""
+    counts: Dict[str, int] = {}
+    for word in TOKEN_RE.findall((title or "").lower()):
+        counts[word] = counts.get(word, 0) + TITLE_WEIGHT
+    for word in TOKEN_RE.findall((description or "").lower()):
+        counts[word] = counts.get(word, 0) + 1
+    for tag in (tags or "").split(","):
+        tag = tag.strip().lower()
+        if tag:
+            counts["tag:" + tag] = counts.get("tag:" + tag, 0) + TAG_WEIGHT
+    return counts
+
+
+@dataclass(frozen=True)
+class CourseIndex:
+    """
+    Готовый индекс курсов. Не меняется после построения: обновление строит
+    новый и подменяет ссылку, запрос берёт ссылку один раз в начале.
+    """
+    course_ids: np.ndarray
+    position: Dict[int, int]
+    matrix: sp.csr_matrix
+    # CSC: при запросе берём только столбцы термов из профиля (как инвертированный индекс)
+    matrix_csc: sp.csc_matrix
+    titles: Dict[int, str]
+    tags: Dict[int, List[str]]
+
+
+EMPTY_INDEX = CourseIndex(
+    np.empty(0, dtype=np.int64), {}, sp.csr_matrix((0, 0)), sp.csc_matrix((0, 0)), {}, {}
+)
+
 
 class SimpleRecommender:
     """
-    Простая, но расширяемая рекомендательная система.
-    
-    Для MVP — правила на основе тегов.
-    Позже можно заменить на:
-    - sklearn (TF-IDF + cosine similarity)
-    - surprise (коллаборативная фильтрация)
-    - нейросеть (PyTorch)
+    Контентная рекомендательная система: TF-IDF по курсам + косинусная близость.
+
+    Матрица курсов (курс × терм) строится из Course.title, description и tags
+    и хранится в scipy.sparse. Профиль пользователя — сумма строк его курсов,
+    рекомендации — top-k курсов по косинусу с профилем.
+
+    Курсы можно добавлять/менять по одному (upsert_course, remove_course):
+    токенизация делается только для изменённого курса, а пересчёт весов
+    IDF и нормировка — векторно при следующем запросе.
+
+    В приложении индекс строится и обновляется вне event loop: start()
+    строит его в потоке при старте воркера, затем фоновая задача раз в
+    REFRESH_SECONDS (и сразу после commit изменённого курса в этом процессе)
+    подтягивает из БД курсы с новым updated_at, токенизирует только их и
+    подменяет готовый CourseIndex. Так изменения из других воркеров доходят
+    до каждого воркера за период обновления.
+
+    Режим "cf" — item-item коллаборативная фильтрация по офлайн-модели
+    (ml_cf.ItemItemModel, подключается через load_cf). Онлайн это только
+    выборка соседей и top-k; если соседей не хватает (новые курсы или
+    пользователи), список добирается контентными рекомендациями.
     """
-    
-    # База знаний: курс → теги
-    COURSE_TAGS = {
-        1: ["ml", "python", "math"],
-        2: ["nlp", "ml", "transformers"],
-        3: ["cv", "ml", "pytorch"],
-        4: ["ds", "sql", "pandas"],
-    }
-    
-    # Описание курсов (в реальном проекте — из БД)
-    COURSES = {
-        1: {"title": "Введение в машинное обучение", "description": "Линейная регрессия, классификация, scikit-learn"},
-        2: {"title": "NLP с нуля", "description": "BERT, токенизация, классификация текста"},
-        3: {"title": "Компьютерное зрение", "description": "CNN, OpenCV, YOLO"},
-        4: {"title": "Анализ данных", "description": "Pandas, визуализация, SQL"},
-    }
-
-    def recommend_for_user(self, completed_course_ids: List[int]) -> List[Dict]:
+
+    def __init__(self, mode: str = "tfidf"):
+        self.mode = mode
+        self.cf: Optional[ItemItemModel] = None
+        self.vocabulary: Dict[str, int] = {}
+        # course_id → (индексы термов, частоты)
+        self._rows: Dict[int, tuple] = {}
+        self._titles: Dict[int, str] = {}
+        self._tags: Dict[int, List[str]] = {}
+        # course_id → updated_at из БД и граница прошлой синхронизации
+        self._updated: Dict[int, Optional[datetime]] = {}
+        self._synced_until: Optional[datetime] = None
+        self._dirty = True
+        self.loaded = False
+        self._index = EMPTY_INDEX
+        # Состояние выше меняется под блокировкой: поток синхронизации, скрипты
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Построение индекса ---
+
+    def load_rows(self, rows: Iterable) -> None:
+        """Индекс по строкам (id, title, description, tags) — для скриптов и бенчмарка."""
+        with self._lock:
+            self._reset()
+            for course_id, title, description, tags in rows:
+                self._upsert(course_id, title, description, tags)
+            self._dirty = True
+            self.loaded = True
+
+    def upsert_course(self, course_id: int, title: str, description: Optional[str], tags: Optional[str]) -> None:
+        with self._lock:
+            self._upsert(course_id, title, description, tags)
+            self._dirty = True
+
+    def remove_course(self, course_id: int) -> None:
+        with self._lock:
+            if self._rows.pop(course_id, None) is not None:
+                self._titles.pop(course_id, None)
+                self._tags.pop(course_id, None)
+                self._updated.pop(course_id, None)
+                self._dirty = True
+
+    def _reset(self) -> None:
+        self.vocabulary.clear()
+        self._rows.clear()
+        self._titles.clear()
+        self._tags.clear()
+        self._updated.clear()
+
+    def _upsert(self, course_id: int, title: str, description: Optional[str], tags: Optional[str]) -> None:
+        counts = tokenize_course(title, description, tags)
+        indices = np.fromiter(
+            (self.vocabulary.setdefault(term, len(self.vocabulary)) for term in counts),
+            dtype=np.int32, count=len(counts),
+        )
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        self._rows[course_id] = (indices, values)
+        self._titles[course_id] = title
+        self._tags[course_id] = [t.strip() for t in (tags or "").split(",") if t.strip()]
+
+    def sync(self, engine) -> bool:
         """
-        Возвращает рекомендации на основе пройденных курсов.
-        
-        Логика:
-        - Если пройден курс 1 (ML) → рекомендуем 2 (NLP) и 3 (CV)
-        - Если ничего не пройдено → курс 1
+        Подтягивает изменения каталога из БД и подменяет индекс; True, если он изменился.
+
+        Синхронный (sync-движок) — вызывается в потоке, запросы тем временем
+        отвечают по прежнему индексу. Изменённые курсы — по updated_at; если
+        после них число курсов не сходится с БД (курс удалили или вставили
+        без updated_at), индекс перечитывается целиком.
         """
-        if not completed_course_ids:
-            return [{
-                "id": 1,
-                "title": self.COURSES[1]["title"],
-                "reason": "Стартовый курс для всех",
-                "tags": self.COURSE_TAGS[1]
-            }]
-
-        # Проверяем: прошёл ли ML?
-        has_ml = any(cid in [1] for cid in completed_course_ids)
-        if has_ml:
-            return [
-                {
-                    "id": 2,
-                    "title": self.COURSES[2]["title"],
-                    "reason": "Вы освоили ML — пора в NLP!",
-                    "tags": self.COURSE_TAGS[2]
-                },
-                {
-                    "id": 3,
-                    "title": self.COURSES[3]["title"],
-                    "reason": "Компьютерное зрение — логичное продолжение ML",
-                    "tags": self.COURSE_TAGS[3]
-                }
-            ]
-
-        return [{
-            "id": 4,
-            "title": self.COURSES[4]["title"],
-            "reason": "Попробуйте анализ данных — это весело!",
-            "tags": self.COURSE_TAGS[4]
-        }]
\ No newline at end of file
+        columns = (Course.id, Course.title, Course.description, Course.tags, Course.updated_at)
+        with self._lock, engine.connect() as conn:
+            total = conn.execute(select(func.count(Course.id))).scalar_one()
+            if self.loaded and self._synced_until is not None:
+                changed = [
+                    row for row in conn.execute(
+                        select(*columns).where(Course.updated_at >= self._synced_until - REFRESH_OVERLAP)
+                    )
+                    if self._updated.get(row.id) != row.updated_at
+                ]
+                if not changed and total == len(self._rows):
+                    return False
+                added = sum(1 for row in changed if row.id not in self._rows)
+                if len(self._rows) + added == total:
+                    self._apply(changed)
+                    return True
+            rows = conn.execute(select(*columns).order_by(Course.id)).all()
+            self._reset()
+            self._apply(rows)
+            self.loaded = True
+            return True
+
+    def _apply(self, rows) -> None:
+        """Токенизирует строки (id, title, description, tags, updated_at) и подменяет индекс."""
+        for course_id, title, description, tags, updated_at in rows:
+            self._upsert(course_id, title, description, tags)
+            self._updated[course_id] = updated_at
+        stamps = [updated_at for updated_at in self._updated.values() if updated_at is not None]
+        self._synced_until = max(stamps, default=None)
+        self._index = self._build()
+        self._dirty = False
+
+    def load_cf(self, directory) -> bool:
+        """Подключает обученную item-item модель (mmap, без копирования). False, если её нет."""
+        self.cf = ItemItemModel.load(directory)
+        return self.cf is not None
+
+    @property
+    def version(self) -> str:
+        """Какая модель сейчас отвечает — ключ для кэша рекомендаций."""
+        return f"cf:{self.cf.version}" if self._use_cf() else "tfidf"
+
+    def _current(self) -> CourseIndex:
+        """Текущий индекс; после load_rows/upsert_course (скрипты, бенчмарк) он строится здесь."""
+        if self._dirty:
+            with self._lock:
+                if self._dirty:
+                    self._index = self._build()
+                    self._dirty = False
+        return self._index
+
+    def _build(self) -> CourseIndex:
+        course_ids = np.fromiter(self._rows.keys(), dtype=np.int64, count=len(self._rows))
+        lengths = np.fromiter((len(r[0]) for r in self._rows.values()), dtype=np.int64, count=len(self._rows))
+        indptr = np.zeros(len(course_ids) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        if len(course_ids):
+            indices = np.concatenate([r[0] for r in self._rows.values()])
+            data = np.concatenate([r[1] for r in self._rows.values()])
+        else:
+            indices = np.empty(0, dtype=np.int32)
+            data = np.empty(0, dtype=np.float32)
+        n_terms = len(self.vocabulary)
+        tf = sp.csr_matrix((data, indices, indptr), shape=(len(course_ids), n_terms))
+
+        # IDF со сглаживанием (как в sklearn): log((1 + n) / (1 + df)) + 1
+        df = np.bincount(indices, minlength=n_terms)
+        idf = (np.log((1 + len(course_ids)) / (1 + df)) + 1).astype(np.float32)
+        tfidf = tf.multiply(idf).tocsr()
+        # L2-нормировка строк — тогда скалярное произведение = косинус
+        norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        tfidf = sp.diags(1 / norms).dot(tfidf).tocsr().astype(np.float32)
+
+        return CourseIndex(
+            course_ids=course_ids,
+            position={int(cid): i for i, cid in enumerate(course_ids)},
+            matrix=tfidf,
+            matrix_csc=tfidf.tocsc(),
+            titles=dict(self._titles),
+            tags=dict(self._tags),
+        )
+
+    # --- Обновление в приложении ---
+
+    async def start(self, engine) -> None:
+        """Строит индекс в потоке (до первого запроса) и запускает фоновую синхронизацию с БД."""
+        if self._task is not None:
+            return
+        await asyncio.to_thread(self.sync, engine)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(engine))
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._wakeup = None
+
+    def notify(self) -> None:
+        """Курсы изменились в этом процессе — синхронизироваться сейчас, не дожидаясь периода."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self, engine) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), REFRESH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                if await asyncio.to_thread(self.sync, engine):
+                    # Готовые списки ссылаются на прежний каталог
+                    recommendation_cache.clear()
+            except SQLAlchemyError:
+                logger.exception("Не удалось обновить индекс рекомендаций")
+
+    # --- Рекомендации ---
+
+    def recommend_for_users(self, users_course_ids: List[List[int]], k: int = 3) -> List[List[Dict]]:
+        """
+        Рекомендации сразу для нескольких пользователей.
+
+        users_course_ids — для каждого пользователя список курсов, на которые
+        он записан или которые прошёл. Близость для всего батча считается
+        одним умножением разреженных матриц (курс × пользователь).
+        """
+        index = self._current()
+        n_courses = len(index.course_ids)
+        if n_courses == 0:
+            return [[] for _ in users_course_ids]
+
+        if self._use_cf():
+            # Онлайн-часть CF — выборка соседей, матричное умножение не нужно
+            return [self.recommend_for_user(course_ids, k=k) for course_ids in users_course_ids]
+
+        seen_by_user = [_positions(index, course_ids) for course_ids in users_course_ids]
+        # Профили: строка на пользователя, 1 в столбцах его курсов
+        rows = np.repeat(np.arange(len(seen_by_user)), [len(seen) for seen in seen_by_user])
+        cols = np.concatenate(seen_by_user) if seen_by_user else np.empty(0, dtype=np.int64)
+        selection = sp.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(seen_by_user), n_courses),
+        )
+        profiles = (selection @ index.matrix).tocsc()  # пользователь × терм
+        terms = np.flatnonzero(np.diff(profiles.indptr))  # непустые столбцы
+        # Затрагиваем только постинги термов, встречающихся в профилях
+        scores = np.asarray((index.matrix_csc[:, terms] @ profiles[:, terms].T).todense())
+
+        return [
+            self._rank(index, np.array(scores[:, user_index]).ravel(), seen, k)
+            for user_index, seen in enumerate(seen_by_user)
+        ]
+
+    def recommend_for_user(self, course_ids: List[int], k: int = 3) -> List[Dict]:
+        """
+        Возвращает рекомендации на основе курсов пользователя.
+
+        - Есть курсы → top-k похожих курсов (без уже пройденных/записанных)
+        - Нет курсов → стартовые курсы каталога
+
+        Для одного пользователя scipy-операции не нужны: профиль и скоры
+        собираются прямо из массивов CSR/CSC несколькими вызовами numpy.
+        """
+        index = self._current()
+        if len(index.course_ids) == 0:
+            return []
+        seen = _positions(index, course_ids)
+        if len(seen) == 0:
+            return self._cold_start(index, k)
+        if self._use_cf():
+            return self._recommend_cf(index, course_ids, seen, k)
+        return self._recommend_tfidf(index, seen, k)
+
+    def _recommend_tfidf(self, index: CourseIndex, seen: np.ndarray, k: int) -> List[Dict]:
+        matrix, matrix_csc = index.matrix, index.matrix_csc
+        # Профиль = сумма строк курсов пользователя (терм → вес)
+        idx = _gather(matrix.indptr, seen)
+        terms, inverse = np.unique(matrix.indices[idx], return_inverse=True)
+        weights = np.bincount(inverse, weights=matrix.data[idx])
+        # Скоры: проходим постинги только этих термов (как по инвертированному индексу)
+        lengths = matrix_csc.indptr[terms + 1] - matrix_csc.indptr[terms]
+        idx = _gather(matrix_csc.indptr, terms)
+        scores = np.bincount(
+            matrix_csc.indices[idx],
+            weights=matrix_csc.data[idx] * np.repeat(weights, lengths),
+            minlength=len(index.course_ids),
+        )
+        return self._rank(index, scores, seen, k)
+
+    def _use_cf(self) -> bool:
+        return self.mode == "cf" and self.cf is not None
+
+    def _recommend_cf(self, index: CourseIndex, course_ids: List[int], seen: np.ndarray, k: int) -> List[Dict]:
+        result = [
+            self._recommendation(index, index.position[course_id], f"Его выбирают вместе с «{index.titles[source]}»")
+            for course_id, _, source in self.cf.recommend(course_ids, k)
+            # Модель могла быть обучена до удаления курса
+            if course_id in index.position and source in index.titles
+        ]
+        if len(result) < k:
+            # Новые курсы/мало данных — добираем контентными рекомендациями
+            taken = {r["id"] for r in result}
+            extra = self._recommend_tfidf(index, seen, k + len(taken))
+            result += [r for r in extra if r["id"] not in taken][:k - len(result)]
+        return result
+
+    def _rank(self, index: CourseIndex, scores: np.ndarray, seen: np.ndarray, k: int) -> List[Dict]:
+        if len(seen) == 0:
+            return self._cold_start(index, k)
+        scores[seen] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = candidates[np.argsort(-scores[candidates], kind="stable")]
+        closest = self._closest(index, top, seen)
+        return [
+            self._recommendation(index, pos, f"Похож на «{index.titles[int(index.course_ids[near])]}»")
+            for pos, near in zip(top, closest)
+        ]
+
+    def _closest(self, index: CourseIndex, top: np.ndarray, seen: np.ndarray) -> np.ndarray:
+        """Для каждой рекомендации — самый похожий курс пользователя (для текста «почему»)."""
+        matrix = index.matrix
+        idx = _gather(matrix.indptr, top)
+        segment = np.repeat(np.arange(len(top)), matrix.indptr[top + 1] - matrix.indptr[top])
+        similarity = np.zeros((len(seen), len(top)))
+        dense = np.zeros(matrix.shape[1], dtype=np.float32)
+        for i, pos in enumerate(seen):
+            start, end = matrix.indptr[pos], matrix.indptr[pos + 1]
+            dense[matrix.indices[start:end]] = matrix.data[start:end]
+            similarity[i] = np.bincount(
+                segment, weights=dense[matrix.indices[idx]] * matrix.data[idx], minlength=len(top)
+            )
+            dense[matrix.indices[start:end]] = 0
+        return seen[np.argmax(similarity, axis=0)]
+
+    def _cold_start(self, index: CourseIndex, k: int) -> List[Dict]:
+        return [
+            self._recommendation(index, pos, "Стартовый курс для всех")
+            for pos in range(min(k, len(index.course_ids)))
+        ]
+
+    def _recommendation(self, index: CourseIndex, pos: int, reason: str) -> Dict:
+        course_id = int(index.course_ids[pos])
+        return {
+            "id": course_id,
+            "title": index.titles[course_id],
+            "reason": reason,
+            "tags": index.tags[course_id],
+        }
+
+
+def _positions(index: CourseIndex, course_ids: List[int]) -> np.ndarray:
+    return np.fromiter(
+        (index.position[c] for c in course_ids if c in index.position), dtype=np.int64
+    )
+
+
+def _gather(indptr: np.ndarray, selected: np.ndarray) -> np.ndarray:
+    """Индексы элементов строк (CSR) или столбцов (CSC) selected — одним массивом."""
+    starts = indptr[selected]
+    lengths = indptr[selected + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+recommender = SimpleRecommender(mode=os.environ.get("RECOMMENDER_MODE", "tfidf"))
+
+
+async def recommendations_for_user(db, user_id: int, k: int = 3) -> List[Dict]:
+    """
+    Рекомендации для пользователя по его записям на курсы.
+
+    Сначала смотрим в recommendation_cache: при попадании нет ни запроса
+    записей на курсы, ни пересчёта. В кэше — RECOMMENDATIONS_CACHED лучших,
+    запрос с большим k считается без кэша. Индекс курсов строит
+    recommender.start() при старте приложения; без него (скрипты) — здесь,
+    тоже в потоке.
+    """
+    cacheable = k <= RECOMMENDATIONS_CACHED
+    if cacheable:
+        cached = await recommendation_cache.get(user_id, recommender.version)
+        if cached is not None:
+            return cached[:k]
+    if not recommender.loaded:
+        await asyncio.to_thread(recommender.sync, engine)
+    # До чтения записей: инвалидация после этого момента делает результат устаревшим
+    computed_at = time.time()
+    course_ids = (await db.scalars(
+        select(Enrollment.course_id).where(Enrollment.user_id == user_id)
+    )).all()
+    if not cacheable:
+        return recommender.recommend_for_user(list(course_ids), k=k)
+    items = recommender.recommend_for_user(list(course_ids), k=RECOMMENDATIONS_CACHED)
+    await recommendation_cache.set(user_id, recommender.version, items, computed_at)
+    return items[:k]
+
+
+# Курс изменён через ORM в этом процессе — синхронизируем индекс сразу после commit
+@event.listens_for(Course, "after_insert")
+@event.listens_for(Course, "after_update")
+@event.listens_for(Course, "after_delete")
+def _course_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info["courses_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _sync_after_commit(session):
+    if session.info.pop("courses_changed", False):
+        recommender.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session):
+    session.info.pop("courses_changed", None)
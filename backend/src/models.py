@@ -1,5 +1,5 @@
 # src/models.py
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import event, update, create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -29,12 +29,18 @@ class Course(Base):
     # Новое поле: контент курса (опционально, если весь контент в модулях)
     content = Column(Text, nullable=True)
     author = Column(String) # Поле для автора
+    # Время последнего изменения: по нему воркеры подтягивают изменённые курсы в индекс рекомендаций
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Связь: один курс → много модулей
     modules = relationship("Module", back_populates="course", order_by="Module.order")
     # Связь: один курс → много записей на курс
     enrollments = relationship("Enrollment", back_populates="course")
 
+    __table_args__ = (
+        Index("ix_courses_updated_at", "updated_at"),
+    )
+
 
 class Module(Base):
     __tablename__ = "modules"
@@ -52,6 +58,22 @@ class Module(Base):
     # Связь: модуль → видео (если type == "video")
     video = relationship("Video", back_populates="module", uselist=False, cascade="all, delete-orphan")
 
+    # Модули курса по порядку: WHERE course_id = ? ORDER BY "order"
+    __table_args__ = (
+        Index("ix_modules_course_order", "course_id", "order"),
+    )
+
+
+@event.listens_for(Module, "after_insert")
+@event.listens_for(Module, "after_update")
+@event.listens_for(Module, "after_delete")
+def _touch_course(mapper, connection, target):
+    # courses.updated_at — версия сводки курса и навигации по модулям в кэше
+    # фрагментов (template_cache); изменения модулей через Core обновляют её сами
+    connection.execute(
+        update(Course.__table__).where(Course.__table__.c.id == target.course_id).values(updated_at=datetime.utcnow())
+    )
+
 
 class Assignment(Base):
     __tablename__ = "assignments"
@@ -63,12 +85,18 @@ class Assignment(Base):
     deadline = Column(DateTime, nullable=True)
     # Поле для данных теста (вопросы, варианты, правильные ответы) - JSON
     test_data = Column(Text, nullable=True) # JSON-строка
+    # Максимальный размер файла решения в байтах (None — лимит по умолчанию)
+    max_upload_bytes = Column(Integer, nullable=True)
 
     # Связь: задание → модуль
     module = relationship("Module", back_populates="assignment")
     # Связь: задание → много сабмишенов
     submissions = relationship("Submission", back_populates="assignment")
 
+    __table_args__ = (
+        Index("ix_assignments_module_id", "module_id"),
+    )
+
 
 class Video(Base):
     __tablename__ = "videos"
@@ -84,24 +112,40 @@ class Video(Base):
     # Связь: видео -> модуль
     module = relationship("Module", back_populates="video")
 
+    __table_args__ = (
+        Index("ix_videos_module_id", "module_id"),
+    )
+
 
 class Submission(Base):
     __tablename__ = "submissions"
     id = Column(Integer, primary_key=True, index=True)
     assignment_id = Column(Integer, ForeignKey("assignments.id"), nullable=False)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    file_path = Column(String, nullable=True) # Может быть NULL для тестов
+    file_path = Column(String, nullable=True) # Может быть NULL для тестов; путь к блобу в uploads/blobs
+    file_name = Column(String, nullable=True) # Исходное имя файла (блоб хранится без имени)
     status = Column(String, default="pending")  # pending → reviewed (для теста: submitted -> reviewed/graded)
     feedback = Column(Text, nullable=True)
     grade = Column(Integer, nullable=True) # Оценка за тест (например, 0-100%)
     submitted_at = Column(DateTime, default=datetime.utcnow)
     # Поле для ответов студента на тест (JSON)
     test_answers = Column(Text, nullable=True) # JSON-строка
+    # Ключ попытки из журнала write_behind — повторная досылка не создаёт дублей
+    attempt_id = Column(String, nullable=True)
 
     # Связи:
     student = relationship("User", back_populates="submissions")
     assignment = relationship("Assignment", back_populates="submissions")
 
+    # Составные индексы под горячие запросы
+    __table_args__ = (
+        Index("ix_submissions_assignment_student", "assignment_id", "student_id"),
+        # Очередь проверки: WHERE status = 'pending' ORDER BY submitted_at, id;
+        # он же — индекс по status
+        Index("ix_submissions_status_submitted_at", "status", "submitted_at"),
+        Index("ix_submissions_attempt_id", "attempt_id", unique=True),
+    )
+
 
 class Enrollment(Base):
     __tablename__ = "enrollments"
@@ -112,4 +156,35 @@ class Enrollment(Base):
 
     # Связи:
     student = relationship("User", back_populates="enrollments")
-    course = relationship("Course", back_populates="enrollments")
\ No newline at end of file
+    course = relationship("Course", back_populates="enrollments")
+
+    __table_args__ = (
+        # Одна запись на (пользователь, курс); индекс ограничения — под WHERE user_id = ? AND course_id = ?
+        UniqueConstraint("user_id", "course_id", name="uq_enrollments_user_course"),
+        # Студенты курса (дашборд преподавателя)
+        Index("ix_enrollments_course_id", "course_id"),
+    )
+
+
+class StudentProgress(Base):
+    """Материализованный прогресс студента по курсу — обновляется при сабмишенах."""
+    __tablename__ = "student_progress"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
+    completed = Column(Integer, nullable=False, default=0) # Сколько заданий проверено
+    total = Column(Integer, nullable=False, default=0) # Сколько заданий было в курсе при последнем событии (страницы считают по modules)
+    last_activity = Column(DateTime, nullable=True) # Время последнего сабмишена
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "course_id", name="uq_student_progress_user_course"),
+    )
+
+
+class Blob(Base):
+    """Файл в content-addressed хранилище: один блоб на содержимое, refcount — число сабмишенов."""
+    __tablename__ = "blobs"
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    refcount = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,286 @@
+# src/progress.py
+"""
+Материализованный прогресс студентов (таблица student_progress).
+
+Строка обновляется в той же транзакции, что и сабмишен (submit_test,
+submit_assignment, submit_review, пачка write_behind), а страницы читают
+её по ключу (user_id, course_id) вместо пересчёта по всем сабмишенам.
+
+Число заданий курса (total) меняется без сабмишенов — когда в курс
+добавляют или удаляют модули, — поэтому при чтении оно считается по
+modules (индекс ix_modules_course_order), а колонка total — лишь снимок
+на момент последнего события.
+
+Пересобрать таблицу по истории:
+    python -m backend.src.progress rebuild
+"""
+import argparse
+from collections import Counter
+from datetime import datetime
+from typing import Mapping, Tuple
+
+from sqlalchemy import select, update, delete, insert, func, distinct, bindparam, case, and_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import StudentProgress, Submission, Module, Assignment, Enrollment
+from .services import course_progress
+
+
+async def course_id_for_assignment(db: AsyncSession, assignment_id: int):
+    return await db.scalar(
+        select(Module.course_id)
+        .join(Assignment, Assignment.module_id == Module.id)
+        .where(Assignment.id == assignment_id)
+    )
+
+
+def _upsert(dialect_name: str):
+    return postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+
+
+async def _insert_progress(db: AsyncSession, student_id: int, course_id: int, now: datetime) -> bool:
+    """
+    Первая строка прогресса по курсу — по истории (сабмишен уже во flush).
+    False — строку успел вставить параллельный запрос (uq_student_progress_user_course).
+    """
+    summary = await course_progress(db, student_id, course_id)
+    insert = _upsert(db.get_bind().dialect.name)
+    result = await db.execute(
+        insert(StudentProgress)
+        .values(
+            user_id=student_id,
+            course_id=course_id,
+            completed=summary["progress"],
+            total=summary["total"],
+            last_activity=now,
+        )
+        .on_conflict_do_nothing(index_elements=[StudentProgress.user_id, StudentProgress.course_id])
+    )
+    return result.rowcount > 0
+
+
+async def record_submission(db: AsyncSession, student_id: int, assignment_id: int, newly_reviewed: bool) -> None:
+    """
+    Учитывает событие сабмишена в student_progress.
+
+    Вызывать после db.flush() сабмишена и до commit — тогда строка прогресса
+    и сабмишен попадают в одну транзакцию. newly_reviewed=True, если сабмишен
+    только что получил статус "reviewed" (тест или проверка преподавателем).
+
+    Строка меняется одним UPDATE (completed = completed + 1), без чтения:
+    два первых сабмишена по курсу одновременно не упрутся в уникальный ключ.
+    """
+    course_id = await course_id_for_assignment(db, assignment_id)
+    if course_id is None:
+        return
+    now = datetime.utcnow()
+
+    values = {"last_activity": now}
+    if newly_reviewed:
+        # Задание засчитывается один раз: проверяем, что это первый проверенный сабмишен
+        reviewed_count = await db.scalar(
+            select(func.count()).select_from(Submission).where(
+                Submission.assignment_id == assignment_id,
+                Submission.student_id == student_id,
+                Submission.status == "reviewed",
+            )
+        )
+        if reviewed_count == 1:
+            values["completed"] = StudentProgress.completed + 1
+    increment = update(StudentProgress).where(
+        StudentProgress.user_id == student_id,
+        StudentProgress.course_id == course_id,
+    ).values(**values)
+
+    if (await db.execute(increment)).rowcount:
+        return
+    # Строки ещё нет. Если её вставил параллельный запрос, наш сабмишен он
+    # мог не видеть — тогда всё-таки прибавляем
+    if not await _insert_progress(db, student_id, course_id, now):
+        await db.execute(increment)
+
+
+async def record_submissions_batch(db: AsyncSession, attempts: Mapping[Tuple[int, int], int]) -> None:
+    """
+    record_submission для пачки проверенных сабмишенов (write_behind) —
+    несколько запросов на всю пачку вместо нескольких на сабмишен.
+
+    attempts: (student_id, assignment_id) → сколько сабмишенов в пачке; вызывать после flush.
+    """
+    if not attempts:
+        return
+    student_ids = {student_id for student_id, _ in attempts}
+    assignment_ids = {assignment_id for _, assignment_id in attempts}
+    now = datetime.utcnow()
+
+    courses = dict((await db.execute(
+        select(Assignment.id, Module.course_id)
+        .join(Module, Assignment.module_id == Module.id)
+        .where(Assignment.id.in_(assignment_ids))
+    )).all())
+    reviewed = {
+        (row.student_id, row.assignment_id): row.count
+        for row in await db.execute(
+            select(Submission.student_id, Submission.assignment_id, func.count().label("count"))
+            .where(
+                Submission.student_id.in_(student_ids),
+                Submission.assignment_id.in_(assignment_ids),
+                Submission.status == "reviewed",
+            )
+            .group_by(Submission.student_id, Submission.assignment_id)
+        )
+    }
+    existing = set((await db.execute(
+        select(StudentProgress.user_id, StudentProgress.course_id).where(
+            StudentProgress.user_id.in_(student_ids),
+            StudentProgress.course_id.in_(set(courses.values())),
+        )
+    )).all())
+
+    completed = Counter()  # (student_id, course_id) → сколько заданий засчитано впервые
+    for (student_id, assignment_id), count in attempts.items():
+        course_id = courses.get(assignment_id)
+        if course_id is None:
+            continue
+        # Все проверенные сабмишены задания — из этой пачки
+        completed[(student_id, course_id)] += reviewed.get((student_id, assignment_id), 0) == count
+
+    for key in set(completed) - existing:
+        # Вставленная по истории строка уже учитывает пачку; если строку успел
+        # вставить параллельный запрос — прибавляем к ней, как к существующей
+        if await _insert_progress(db, *key, now):
+            del completed[key]
+    if completed:
+        progress = StudentProgress.__table__
+        await db.execute(
+            update(progress)
+            # Имена параметров не совпадают с колонками — иначе попали бы в SET
+            .where(progress.c.user_id == bindparam("row_user"), progress.c.course_id == bindparam("row_course"))
+            .values(completed=progress.c.completed + bindparam("delta"), last_activity=now),
+            [
+                {"row_user": student_id, "row_course": course_id, "delta": delta}
+                for (student_id, course_id), delta in completed.items()
+            ],
+        )
+
+
+def _assignments_total(course_id):
+    """Число заданий курса — подзапрос (course_id — значение или колонка внешнего запроса)."""
+    return (
+        select(func.count(Module.id))
+        .where(Module.course_id == course_id, Module.type == "assignment")
+        .scalar_subquery()
+    )
+
+
+async def read_progress(db: AsyncSession, user_id: int, course_id: int) -> dict:
+    """Прогресс по курсу: строка по ключу и число заданий курса — одним запросом."""
+    row = (await db.execute(
+        select(StudentProgress.completed, _assignments_total(course_id)).where(
+            StudentProgress.user_id == user_id,
+            StudentProgress.course_id == course_id,
+        )
+    )).first()
+    if row is None:
+        # Строки ещё нет (не было событий и rebuild) — считаем на лету
+        summary = await course_progress(db, user_id, course_id)
+        return {"progress": summary["progress"], "total": summary["total"]}
+    return {"progress": row[0], "total": row[1]}
+
+
+async def read_overall_progress(db: AsyncSession, user_id: int) -> dict:
+    """
+    Суммарный прогресс студента по всем курсам (для дашборда).
+
+    Идём от записей на курс: курс без строки прогресса (ещё не было
+    сабмишенов) даёт 0 из числа его заданий.
+    """
+    per_course = (
+        select(
+            func.coalesce(StudentProgress.completed, 0).label("completed"),
+            _assignments_total(Enrollment.course_id).label("total"),
+        )
+        .select_from(Enrollment)
+        .outerjoin(StudentProgress, and_(
+            StudentProgress.user_id == Enrollment.user_id,
+            StudentProgress.course_id == Enrollment.course_id,
+        ))
+        .where(Enrollment.user_id == user_id, Enrollment.role == "student")
+        .subquery()
+    )
+    row = (await db.execute(
+        select(
+            func.coalesce(func.sum(per_course.c.completed), 0),
+            func.coalesce(func.sum(per_course.c.total), 0),
+        )
+    )).first()
+    return {"progress": row[0], "total": row[1]}
+
+
+def rebuild(engine) -> int:
+    """Пересобирает student_progress по истории сабмишенов. Возвращает число строк."""
+    with engine.begin() as conn:
+        return rebuild_rows(conn)
+
+
+def rebuild_rows(conn) -> int:
+    """rebuild внутри транзакции вызывающего (conn — Connection)."""
+    # Агрегаты считаются одним проходом по сабмишенам и модулям и соединяются
+    # с записями на курс: коррелированные подзапросы на каждую запись
+    # (по статусу сабмишена) на сотнях тысяч строк работали квадратично
+    totals = (
+        select(Module.course_id, func.count(Module.id).label("total"))
+        .where(Module.type == "assignment")
+        .group_by(Module.course_id)
+        .subquery()
+    )
+    activity = (
+        select(
+            Submission.student_id,
+            Module.course_id,
+            func.count(distinct(case((Submission.status == "reviewed", Module.id)))).label("completed"),
+            func.max(Submission.submitted_at).label("last_activity"),
+        )
+        .join(Assignment, Submission.assignment_id == Assignment.id)
+        .join(Module, Assignment.module_id == Module.id)
+        .group_by(Submission.student_id, Module.course_id)
+        .subquery()
+    )
+
+    source = (
+        select(
+            Enrollment.user_id,
+            Enrollment.course_id,
+            func.coalesce(func.max(activity.c.completed), 0),
+            func.coalesce(func.max(totals.c.total), 0),
+            func.max(activity.c.last_activity),
+        )
+        .outerjoin(totals, totals.c.course_id == Enrollment.course_id)
+        .outerjoin(
+            activity,
+            (activity.c.student_id == Enrollment.user_id) & (activity.c.course_id == Enrollment.course_id),
+        )
+        .where(Enrollment.role == "student")
+        .group_by(Enrollment.user_id, Enrollment.course_id)
+    )
+    conn.execute(delete(StudentProgress))
+    conn.execute(insert(StudentProgress).from_select(
+        ["user_id", "course_id", "completed", "total", "last_activity"], source
+    ))
+    return conn.scalar(select(func.count()).select_from(StudentProgress))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обслуживание таблицы student_progress")
+    parser.add_argument("command", choices=["rebuild"])
+    args = parser.parse_args()
+
+    from .database import engine
+    if args.command == "rebuild":
+        count = rebuild(engine)
+        print(f"✅ student_progress пересобрана: {count} строк")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# src/quiz.py
+"""
+Скомпилированные тесты (Assignment.test_data).
+
+test_data хранится JSON-строкой; разбирать её на каждый сабмишен и каждый
+рендер формы дорого, когда тест одновременно пишут сотни студентов.
+Здесь JSON разбирается один раз в CompiledQuiz: кортеж вопросов и
+numpy-массивы ключа ответов (по элементу на вопрос). Кэш — по id задания и хэшу
+test_data, так что изменённый тест не отдаётся из кэша даже в другом
+воркере; в своём воркере запись сбрасывается событием ORM.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+from sqlalchemy import event
+
+from .models import Assignment
+
+
+class QuizFormatError(ValueError):
+    """test_data не разбирается или в нём нет вопросов."""
+
+
+# Типы вопросов (Question.kind, CompiledQuiz.kinds)
+SINGLE = 0   # один вариант: "correct_answer": 1
+MULTI = 1    # несколько вариантов: "correct_answers": [0, 2] → битовая маска 0b101
+NUMERIC = 2  # число с допуском: "correct_value": 3.14, "tolerance": 0.01
+
+KIND_NAMES = {"single": SINGLE, "multi": MULTI, "numeric": NUMERIC}
+
+
+@dataclass(frozen=True)
+class Question:
+    question: str
+    options: Tuple[str, ...]
+    kind: int = SINGLE
+
+    @property
+    def type(self) -> str:
+        return next(name for name, kind in KIND_NAMES.items() if kind == self.kind)
+
+
+@dataclass(frozen=True)
+class CompiledQuiz:
+    """
+    Ключ ответов — параллельные массивы (только чтение):
+    kinds — тип вопроса, correct — индекс (single) или битовая маска (multi),
+    values/tolerance — правильное число и допуск (numeric).
+    """
+    version: str
+    questions: Tuple[Question, ...]
+    kinds: np.ndarray
+    correct: np.ndarray
+    values: np.ndarray
+    tolerance: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+
+def _compile_question(raw: dict):
+    """Вопрос и его элементы ключа: (Question, correct, value, tolerance)."""
+    kind = KIND_NAMES[raw.get("type", "single")]
+    options = tuple(str(o) for o in raw.get("options", ()))
+    question = Question(question=str(raw["question"]), options=options, kind=kind)
+    if kind == NUMERIC:
+        return question, -1, float(raw["correct_value"]), float(raw.get("tolerance", 0.0))
+    if kind == MULTI:
+        indices = [int(i) for i in raw["correct_answers"]]
+        if len(options) > 62 or any(not 0 <= i < len(options) for i in indices):
+            raise ValueError("варианты multi-вопроса не помещаются в маску")
+        return question, sum(1 << i for i in set(indices)), np.nan, 0.0
+    return question, int(raw["correct_answer"]), np.nan, 0.0
+
+
+def quiz_version(test_data: str) -> str:
+    return hashlib.blake2b(test_data.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def compile_quiz(test_data: str) -> CompiledQuiz:
+    try:
+        compiled = [_compile_question(q) for q in json.loads(test_data)["questions"]]
+    except (json.JSONDecodeError, TypeError, KeyError, ValueError) as e:
+        raise QuizFormatError(f"Некорректные данные теста: {e}") from e
+    if not compiled:
+        raise QuizFormatError("В тесте нет вопросов")
+
+    questions, correct, values, tolerance = zip(*compiled)
+    arrays = {
+        "kinds": np.array([q.kind for q in questions], dtype=np.int8),
+        "correct": np.array(correct, dtype=np.int64),
+        "values": np.array(values, dtype=np.float64),
+        "tolerance": np.array(tolerance, dtype=np.float64),
+    }
+    for array in arrays.values():
+        array.setflags(write=False)
+    return CompiledQuiz(version=quiz_version(test_data), questions=tuple(questions), **arrays)
+
+
+class QuizCache:
+    """LRU скомпилированных тестов: assignment_id → CompiledQuiz (с проверкой версии)."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[int, CompiledQuiz]" = OrderedDict()
+
+    def get(self, assignment_id: int, test_data: Optional[str]) -> Optional[CompiledQuiz]:
+        if not test_data:
+            return None
+        version = quiz_version(test_data)
+        quiz = self._data.get(assignment_id)
+        if quiz is not None and quiz.version == version:
+            self._data.move_to_end(assignment_id)
+            return quiz
+        quiz = compile_quiz(test_data)
+        self._data[assignment_id] = quiz
+        self._data.move_to_end(assignment_id)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return quiz
+
+    def for_assignment(self, assignment) -> Optional[CompiledQuiz]:
+        return self.get(assignment.id, assignment.test_data)
+
+    def invalidate(self, assignment_id: int) -> None:
+        self._data.pop(assignment_id, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+quiz_cache = QuizCache()
+
+
+@event.listens_for(Assignment, "after_update")
+@event.listens_for(Assignment, "after_delete")
+def _assignment_changed(mapper, connection, target):
+    quiz_cache.invalidate(target.id)
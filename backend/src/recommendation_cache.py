@@ -0,0 +1,322 @@
+# src/recommendation_cache.py
+"""
+Кэш рекомендаций на пользователя.
+
+Входные данные рекомендаций студента меняются только когда он записывается
+на курс или получает оценку, поэтому готовый список хранится до такого
+события:
+- первый уровень — LRU + TTL в памяти процесса (как user_cache);
+- второй (опционально) — таблица в отдельном SQLite-файле, общая для всех
+  воркеров: путь задаётся RECOMMENDATION_CACHE_DB.
+
+Инвалидация — по событиям ORM: вставка/удаление Enrollment и сабмишен
+со статусом "reviewed". Записи сбрасываются после commit, чтобы другой
+запрос не успел закэшировать данные незавершённой транзакции.
+
+Событие видит только воркер, в котором был commit. Поэтому со вторым
+уровнем инвалидация ещё и пишется в нём в журнал с порядковым номером.
+Каждый воркер не чаще раза в RECOMMENDATION_CACHE_POLL_SECONDS дочитывает
+журнал после последнего увиденного номера и выбрасывает из первого уровня
+записи, посчитанные до инвалидации; попадание в первый уровень между
+опросами обходится без обращения к диску. Без второго уровня записи
+первого живут RECOMMENDATION_CACHE_LOCAL_TTL секунд — столько другие
+воркеры могут показывать прежний список. Обращения к SQLite идут в пуле
+потоков (asyncio.to_thread), не блокируя event loop.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from .models import Enrollment, Submission
+
+logger = logging.getLogger(__name__)
+
+# Срок записи со вторым уровнем и без него (тогда о чужой инвалидации воркер не узнает)
+CACHE_TTL = float(os.environ.get("RECOMMENDATION_CACHE_TTL", 3600))
+LOCAL_TTL = float(os.environ.get("RECOMMENDATION_CACHE_LOCAL_TTL", 60))
+# Как часто воркер дочитывает журнал инвалидаций второго уровня (и как долго
+# может отдавать из первого уровня список, сброшенный другим воркером)
+POLL_INTERVAL = float(os.environ.get("RECOMMENDATION_CACHE_POLL_SECONDS", 1))
+# user_id метки «сброшен весь кэш»
+ALL_USERS = 0
+
+
+class SQLiteTier:
+    """
+    Второй уровень кэша: (user_id, version) → JSON со списком рекомендаций,
+    метки инвалидации (user_id → время; ALL_USERS — сброс всего кэша) и
+    журнал тех же инвалидаций по порядку (seq) — его опрашивают воркеры.
+
+    Методы синхронные: RecommendationCache вызывает их в пуле потоков.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS recommendations (
+                user_id INTEGER PRIMARY KEY,
+                version TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS invalidations (
+                user_id INTEGER PRIMARY KEY,
+                stamp REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS invalidation_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                stamp REAL NOT NULL
+            )
+            """
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, user_id: int, version: str, max_age: float) -> Optional[Tuple[List[Dict], float]]:
+        """(список, время расчёта) или None; посчитанное до инвалидации — промах."""
+        row = self._connect().execute(
+            """
+            SELECT payload, created_at FROM recommendations AS r
+            WHERE user_id = ? AND version = ? AND created_at > ?
+              AND NOT EXISTS (
+                  SELECT 1 FROM invalidations AS i
+                  WHERE i.user_id IN (r.user_id, ?) AND i.stamp >= r.created_at
+              )
+            """,
+            (user_id, version, time.time() - max_age, ALL_USERS),
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def set(self, user_id: int, version: str, items: List[Dict], computed_at: float) -> None:
+        self._connect().execute(
+            "INSERT OR REPLACE INTO recommendations (user_id, version, payload, created_at) VALUES (?, ?, ?, ?)",
+            (user_id, version, json.dumps(items, ensure_ascii=False), computed_at),
+        )
+
+    def last_seq(self) -> int:
+        return self._connect().execute("SELECT coalesce(max(seq), 0) FROM invalidation_log").fetchone()[0]
+
+    def invalidations_after(self, seq: int) -> List[Tuple[int, int, float]]:
+        """Записи журнала (seq, user_id, время) после seq."""
+        return self._connect().execute(
+            "SELECT seq, user_id, stamp FROM invalidation_log WHERE seq > ? ORDER BY seq", (seq,)
+        ).fetchall()
+
+    def invalidate(self, user_ids, stamp: float) -> None:
+        conn = self._connect()
+        conn.executemany(
+            "DELETE FROM recommendations WHERE user_id = ?", [(user_id,) for user_id in user_ids]
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO invalidations (user_id, stamp) VALUES (?, ?)",
+            [(user_id, stamp) for user_id in user_ids],
+        )
+        self._log(conn, [(user_id, stamp) for user_id in user_ids])
+
+    def clear(self, stamp: float) -> None:
+        conn = self._connect()
+        conn.execute("DELETE FROM recommendations")
+        # Метки отдельных пользователей старше общей больше ничего не решают
+        conn.execute("DELETE FROM invalidations")
+        conn.execute("INSERT INTO invalidations (user_id, stamp) VALUES (?, ?)", (ALL_USERS, stamp))
+        self._log(conn, [(ALL_USERS, stamp)])
+
+    def _log(self, conn: sqlite3.Connection, rows) -> None:
+        conn.executemany("INSERT INTO invalidation_log (user_id, stamp) VALUES (?, ?)", rows)
+        # Записи первого уровня старше CACHE_TTL истекли сами — их инвалидации не нужны
+        conn.execute("DELETE FROM invalidation_log WHERE stamp < ?", (rows[-1][1] - CACHE_TTL,))
+
+
+class RecommendationCache:
+    """
+    LRU + TTL рекомендаций по user_id с необязательным вторым уровнем.
+
+    version — версия модели (режим, файл CF-модели): записи другой версии
+    считаются промахом. computed_at — time.time() до чтения данных, по
+    которым считался список (сверяется с метками инвалидации).
+    stats() — счётчики попаданий для подбора maxsize.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10_000,
+        ttl: Optional[float] = None,
+        tier2: Optional[SQLiteTier] = None,
+        poll_interval: float = POLL_INTERVAL,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl if ttl is not None else (CACHE_TTL if tier2 is not None else LOCAL_TTL)
+        self.tier2 = tier2
+        self.poll_interval = poll_interval
+        # Последняя учтённая запись журнала инвалидаций и время следующего опроса
+        self._seen_seq = tier2.last_seq() if tier2 is not None else 0
+        self._next_poll = 0.0
+        # user_id → (истекает, версия, список, время расчёта)
+        self._data: "OrderedDict[int, tuple[float, str, List[Dict], float]]" = OrderedDict()
+        self.hits = 0
+        self.tier2_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    async def get(self, user_id: int, version: str) -> Optional[List[Dict]]:
+        if self.tier2 is not None and time.monotonic() >= self._next_poll:
+            await self._poll()
+        entry = self._data.get(user_id)
+        if entry is not None:
+            expires_at, entry_version, items, _computed_at = entry
+            if expires_at >= time.monotonic() and entry_version == version:
+                self._data.move_to_end(user_id)
+                self.hits += 1
+                return items
+            del self._data[user_id]
+
+        if self.tier2 is not None:
+            found = await asyncio.to_thread(self.tier2.get, user_id, version, self.ttl)
+            if found is not None:
+                items, computed_at = found
+                self.tier2_hits += 1
+                self._store(user_id, version, items, computed_at)
+                return items
+
+        self.misses += 1
+        return None
+
+    async def _poll(self) -> None:
+        """Применяет к первому уровню инвалидации других воркеров из журнала второго."""
+        # Сдвигаем срок до await: параллельные get не опрашивают журнал ещё раз
+        self._next_poll = time.monotonic() + self.poll_interval
+        try:
+            rows = await asyncio.to_thread(self.tier2.invalidations_after, self._seen_seq)
+        except sqlite3.Error:
+            logger.exception("Не удалось прочитать журнал инвалидаций кэша рекомендаций")
+            return
+        for seq, user_id, stamp in rows:
+            self._seen_seq = max(self._seen_seq, seq)
+            # Посчитанное после инвалидации остаётся
+            stale = self._data if user_id == ALL_USERS else [user_id]
+            for key in [key for key in stale if key in self._data and self._data[key][3] <= stamp]:
+                del self._data[key]
+
+    async def set(self, user_id: int, version: str, items: List[Dict], computed_at: float) -> None:
+        self._store(user_id, version, items, computed_at)
+        if self.tier2 is not None:
+            await asyncio.to_thread(self.tier2.set, user_id, version, items, computed_at)
+
+    def _store(self, user_id: int, version: str, items: List[Dict], computed_at: float) -> None:
+        self._data[user_id] = (time.monotonic() + self.ttl, version, items, computed_at)
+        self._data.move_to_end(user_id)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *user_ids: int) -> None:
+        """Синхронный — зовётся из событий ORM; запись во второй уровень уходит в поток."""
+        for user_id in user_ids:
+            self._data.pop(user_id, None)
+        self.invalidations += len(user_ids)
+        if self.tier2 is not None and user_ids:
+            self._write_tier2(self.tier2.invalidate, user_ids, time.time())
+
+    def clear(self) -> None:
+        """Сброс всего кэша — когда меняется сам каталог курсов."""
+        self._data.clear()
+        if self.tier2 is not None:
+            self._write_tier2(self.tier2.clear, time.time())
+
+    def _write_tier2(self, method, *args) -> None:
+        # В event loop — в пуле потоков, не дожидаясь; в скриптах (loop нет) — сразу
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            method(*args)
+            return
+        loop.run_in_executor(None, method, *args).add_done_callback(_log_tier2_error)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.tier2_hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "tier2_hits": self.tier2_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.tier2_hits) / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _log_tier2_error(future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Не удалось записать инвалидацию во второй уровень кэша рекомендаций", exc_info=future.exception())
+
+
+_tier2_path = os.environ.get("RECOMMENDATION_CACHE_DB")
+recommendation_cache = RecommendationCache(tier2=SQLiteTier(_tier2_path) if _tier2_path else None)
+
+
+# --- Инвалидация по событиям ---
+
+def _mark_stale(target, user_id: Optional[int]) -> None:
+    session = object_session(target)
+    if session is not None and user_id is not None:
+        session.info.setdefault("stale_recommendations", set()).add(user_id)
+
+
+@event.listens_for(Enrollment, "after_insert")
+@event.listens_for(Enrollment, "after_update")
+@event.listens_for(Enrollment, "after_delete")
+def _enrollment_changed(mapper, connection, target):
+    _mark_stale(target, target.user_id)
+
+
+@event.listens_for(Submission, "after_insert")
+@event.listens_for(Submission, "after_update")
+def _submission_changed(mapper, connection, target):
+    # Рекомендации зависят только от оценок: сабмишены «на проверке» не трогаем
+    if target.status == "reviewed":
+        _mark_stale(target, target.student_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    stale = session.info.pop("stale_recommendations", None)
+    if stale:
+        recommendation_cache.invalidate(*stale)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session):
+    session.info.pop("stale_recommendations", None)
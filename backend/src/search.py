@@ -0,0 +1,134 @@
+# src/search.py
+"""
+Поиск по каталогу курсов.
+
+Для SQLite — полнотекстовый индекс FTS5 (courses_fts) поверх таблицы courses.
+Индекс external-content: хранит только токены, а триггеры держат его в
+синхронизации с INSERT/UPDATE/DELETE в courses. Для других СУБД — ILIKE
+по тем же колонкам.
+"""
+import re
+from typing import List
+
+from sqlalchemy import select, and_, or_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Course
+
+# Веса bm25 для колонок: title, description, tags, author
+RANK_WEIGHTS = (10.0, 2.0, 5.0, 1.0)
+
+FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE courses_fts USING fts5(
+        title, description, tags, author,
+        content='courses', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER courses_fts_ai AFTER INSERT ON courses BEGIN
+        INSERT INTO courses_fts(rowid, title, description, tags, author)
+        VALUES (new.id, new.title, new.description, new.tags, new.author);
+    END
+    """,
+    """
+    CREATE TRIGGER courses_fts_ad AFTER DELETE ON courses BEGIN
+        INSERT INTO courses_fts(courses_fts, rowid, title, description, tags, author)
+        VALUES ('delete', old.id, old.title, old.description, old.tags, old.author);
+    END
+    """,
+    """
+    CREATE TRIGGER courses_fts_au AFTER UPDATE ON courses BEGIN
+        INSERT INTO courses_fts(courses_fts, rowid, title, description, tags, author)
+        VALUES ('delete', old.id, old.title, old.description, old.tags, old.author);
+        INSERT INTO courses_fts(rowid, title, description, tags, author)
+        VALUES (new.id, new.title, new.description, new.tags, new.author);
+    END
+    """,
+]
+
+
+def ensure_course_fts(conn) -> None:
+    """
+    Создаёт courses_fts и триггеры, если их ещё нет, и индексирует уже существующие курсы.
+
+    conn — Connection внутри транзакции (миграция Alembic).
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'courses_fts'")
+    ).first()
+    if exists:
+        return
+    for ddl in FTS_DDL:
+        conn.execute(text(ddl))
+    conn.execute(text("INSERT INTO courses_fts(courses_fts) VALUES ('rebuild')"))
+
+
+def drop_course_fts(conn) -> None:
+    if conn.dialect.name != "sqlite":
+        return
+    for trigger in ("courses_fts_ai", "courses_fts_ad", "courses_fts_au"):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    conn.execute(text("DROP TABLE IF EXISTS courses_fts"))
+
+
+def fts_query(q: str) -> str:
+    """
+    Превращает пользовательский ввод в безопасный MATCH-запрос FTS5.
+
+    Каждое слово — префиксный терм в кавычках ("pyth"*), так что операторы
+    FTS5 и спецсимволы из ввода не интерпретируются.
+    """
+    words = re.findall(r"\w+", q.lower())
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def like_pattern(word: str) -> str:
+    """%word% для LIKE/ILIKE: %, _ и \\ из ввода — обычные символы (ESCAPE '\\')."""
+    escaped = word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+async def search_courses(db: AsyncSession, q: str, limit: int = 20) -> List[Course]:
+    """Курсы по запросу, от наиболее релевантных к менее релевантным."""
+    if db.get_bind().dialect.name != "sqlite":
+        return await search_courses_like(db, q, limit)
+
+    match = fts_query(q)
+    if not match:
+        return []
+    weights = ", ".join(str(w) for w in RANK_WEIGHTS)
+    # Top-k считается внутри FTS-подзапроса (сортировка с LIMIT держит только
+    # k лучших), с courses соединяются только эти k строк
+    stmt = text(f"""
+        SELECT courses.* FROM (
+            SELECT rowid, bm25(courses_fts, {weights}) AS score FROM courses_fts
+            WHERE courses_fts MATCH :match
+            ORDER BY score
+            LIMIT :limit
+        ) AS top
+        JOIN courses ON courses.id = top.rowid
+        ORDER BY top.score
+    """).bindparams(match=match, limit=limit)
+    return (await db.scalars(select(Course).from_statement(stmt))).all()
+
+
+async def search_courses_like(db: AsyncSession, q: str, limit: int = 20) -> List[Course]:
+    """
+    Поиск без FTS (PostgreSQL и др.): каждое слово запроса должно найтись
+    хотя бы в одной из колонок индекса FTS — title, description, tags, author.
+    """
+    words = q.split()
+    if not words:
+        return []
+    columns = (Course.title, Course.description, Course.tags, Course.author)
+    conditions = [
+        or_(*(column.ilike(like_pattern(word), escape="\\") for column in columns))
+        for word in words
+    ]
+    return (await db.scalars(
+        select(Course).where(and_(*conditions)).order_by(Course.title).limit(limit)
+    )).all()
@@ -1,41 +1,145 @@
-# seed_data.py
-from sqlalchemy.orm import sessionmaker
-from .database import engine, Base
-from .models import User, Course, Module, Assignment, Video, Submission, Enrollment
+# src/seed_data.py
+"""
+Наполнение БД: демо-курс и синтетические данные для нагрузочных тестов.
+
+Демо-данные (студент student@test.com, преподаватель teacher@test.com,
+курс «Python для анализа данных» и каталог для поиска):
+    python -m backend.src.seed_data demo
+
+Синтетика в масштабе — студенты, курсы, модули, записи и сабмишены с
+правдоподобным распределением (популярность курсов по Ципфу, студенты
+проходят курс по порядку и бросают на разных этапах):
+    python -m backend.src.seed_data synthetic --students 10000 --courses 200
+
+Строки вставляются пачками (insert() с executemany) в одной транзакции
+вместе с пересборкой прогресса: упавшее наполнение не оставляет БД
+наполовину заполненной. Обе команды идемпотентны: если данные уже есть,
+ничего не делают, поэтому demo можно запускать при каждом старте контейнера.
+Схема БД перед наполнением обновляется миграциями.
+"""
+import argparse
 import datetime
+import hashlib
+import json
 import os
-import json # <-- Новый импорт
-
-# Создаём сессию
-Session = sessionmaker(bind=engine)
-db = Session()
-
-# Удаляем старую БД (если есть)
-if os.path.exists("../db.sqlite"):
-    os.remove("../db.sqlite")
-
-# Создаём все таблицы
-Base.metadata.create_all(bind=engine)
-
-# --- Создаём пользователей ---
-student = User(email="student@test.com", name="Алиса", role="student")
-teacher = User(email="teacher@test.com", name="Борис", role="teacher")
-db.add_all([student, teacher])
-db.commit() # Чтобы получить ID
-
-# --- Создаём курс ---
-course = Course(
-    title="Python для анализа данных",
-    description="Изучите Python и основные библиотеки для анализа данных: NumPy, Pandas, Matplotlib, Seaborn.",
-    tags="python,data,pandas,numpy,matplotlib,seaborn",
-    author="Преподаватель К.",
-    content="" # Не используем, т.к. контент в модулях
-)
-db.add(course)
-db.commit() # Чтобы получить ID
-
-# --- Создаём модули ---
-modules_data = [
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import insert, select, update, func
+
+from .grading import encode_answers, grade, feedback_text
+from .models import User, Course, Module, Assignment, Video, Submission, Enrollment, Blob
+from .progress import rebuild_rows as rebuild_progress
+from .quiz import compile_quiz
+from .storage import blob_path
+
+DEMO_STUDENT_EMAIL = "student@test.com"
+DEMO_TEACHER_EMAIL = "teacher@test.com"
+# Синтетические пользователи: load-student-<n>@load.test, load-teacher-<n>@load.test
+SYNTHETIC_DOMAIN = "load.test"
+# Строк в одном executemany (и в памяти за раз)
+INSERT_BATCH = 20_000
+
+
+def insert_rows(conn, model, rows: Sequence[dict]) -> None:
+    """Вставка пачками через executemany (у всех строк — одинаковый набор ключей)."""
+    for i in range(0, len(rows), INSERT_BATCH):
+        conn.execute(insert(model), rows[i:i + INSERT_BATCH])
+
+
+def insert_returning_ids(conn, model, rows: Sequence[dict]) -> List[int]:
+    """Вставка пачкой с RETURNING id — id в порядке rows (для связанных таблиц)."""
+    ids = []
+    for i in range(0, len(rows), INSERT_BATCH):
+        stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+        ids.extend(conn.execute(stmt, rows[i:i + INSERT_BATCH]).scalars().all())
+    return ids
+
+
+def write_blob(content: bytes) -> Tuple[str, str, int]:
+    """Кладёт содержимое в хранилище блобов. Возвращает (file_path, sha256, size)."""
+    sha256 = hashlib.sha256(content).hexdigest()
+    path = blob_path(sha256)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{sha256}.{os.getpid()}.tmp")
+        tmp.write_bytes(content)
+        os.replace(tmp, path)
+    return str(path), sha256, len(content)
+
+
+def merge_blob_refs(conn, refs: dict) -> None:
+    """
+    Счётчики ссылок на блобы. refs: sha256 → (size, число новых сабмишенов);
+    блоб с тем же содержимым уже может быть в blobs.
+    """
+    existing = dict(conn.execute(select(Blob.sha256, Blob.refcount).where(Blob.sha256.in_(list(refs)))).all())
+    for sha256, refcount in existing.items():
+        _, count = refs.pop(sha256)
+        conn.execute(update(Blob).where(Blob.sha256 == sha256).values(refcount=refcount + count))
+    insert_rows(conn, Blob, [
+        {"sha256": sha256, "size": size, "refcount": count, "created_at": datetime.datetime.utcnow()}
+        for sha256, (size, count) in refs.items()
+    ])
+
+
+# --- Демо-данные ---
+
+# Каталог: остальные курсы (без модулей) — для поиска на дашборде
+CATALOG = [
+    ("React для чайников", "С нуля до хакатона за 2 часа"),
+    ("FastAPI + HTMX", "Создай веб-сервис без боли"),
+    ("ML для угольной промышленности", "Предсказание рисков с нейросетями"),
+    ("Безопасность в горных выработках", "Методы предотвращения обвалов и взрывов"),
+    ("Python для анализа данных", "Pandas, NumPy, визуализация"),
+    ("Основы вентиляции шахт", "Контроль газа и температуры под землёй"),
+    ("Docker для разработчиков", "Контейнеризация от новичка до профи"),
+    ("Механика горных пород", "Изучение прочности и деформации массивов"),
+    ("SQL и реляционные БД", "От SELECT до сложных JOIN'ов"),
+    ("Автоматизация добычи угля", "Роботы, дроны и умные системы"),
+    ("Git и управление версиями", "Работа в команде без конфликтов"),
+    ("Теплообмен в угольных пластах", "Физические модели самовозгорания"),
+    ("TypeScript в реальных проектах", "Типизация, интерфейсы, продакшен"),
+    ("Геоинформационные системы (ГИС)", "Картография для горной промышленности"),
+    ("REST API: design и best practices", "Как проектировать API, которым приятно пользоваться"),
+    ("Экология добычи полезных ископаемых", "Снижение ущерба окружающей среде"),
+    ("PostgreSQL для бэкенд-разработки", "Индексы, транзакции, оптимизация"),
+    ("Сенсорные сети для мониторинга шахт", "IoT в условиях высокой опасности"),
+    ("Алгоритмы и структуры данных", "База для всех олимпиад и собесов"),
+    ("Метановый контроль на шахтах", "Детекция и предотвращение взрывов"),
+    ("Тестирование на Python (pytest)", "Unit, integration, mocking"),
+    ("Гидрогеология угольных месторождений", "Влияние воды на устойчивость пластов"),
+    ("Frontend Performance Optimization", "Как ускорить сайт до 90+ в Lighthouse"),
+    ("Экономика горного производства", "Рентабельность, затраты, ROI"),
+    ("Аутентификация и авторизация", "JWT, OAuth2, сессии, безопасность"),
+    ("Моделирование рисков в добыче", "Monte Carlo, сценарный анализ"),
+    ("Linux для бэкенд-разработчика", "Команды, процессы, сети, bash"),
+    ("Транспорт угля: логистика и автоматизация", "От забоя до порта"),
+    ("Асинхронный Python (async/await)", "FastAPI, aiohttp, производительность"),
+    ("История угольной промышленности", "От паровых машин до умных шахт"),
+    ("CSS Grid и Flexbox", "Макеты без бутстрапа"),
+    ("Оценка запасов угля", "Геологоразведка и подсчёт ресурсов"),
+    ("WebSocket и реалтайм", "Чаты, уведомления, дашборды"),
+    ("Правила техники безопасности на шахтах", "ГОСТы, инструктажи, экипировка"),
+    ("Запуск MVP за выходные", "HTMX, FastAPI, SQLite — без боли"),
+    ("Геомеханика массивов горных пород", "Прогноз устойчивости выработок"),
+    ("React Query и управление состоянием", "Забудь про Redux"),
+    ("Переработка угля: коксование и газификация", "От сырья до химии"),
+    ("Миграции и Alembic", "Управление схемой БД в FastAPI"),
+    ("Энергосбережение в горной промышленности", "Снижение затрат на вентиляцию и подъём"),
+    ("Deploy FastAPI на сервер", "Nginx, Gunicorn, systemd, HTTPS"),
+    ("Подземная геофизика", "Сейсморазведка и каротаж"),
+    ("Jinja2 и серверный рендеринг", "SEO-friendly интерфейсы без JS"),
+    ("Углеродный след добычи", "Углеродный аудит и компенсации"),
+    ("CI/CD для веб-проектов", "GitHub Actions, тесты, деплой"),
+    ("Открытые данные о добыче", "Росстат, US Energy, API"),
+    ("Оптимизация запросов к БД", "EXPLAIN, индексы, N+1 проблема"),
+    ("Цифровой двойник шахты", "BIM, 3D-модели, IoT-интеграция"),
+    ("Как выиграть хакатон по горной тематике", "Идеи, командная работа, презентация"),
+]
+
+DEMO_MODULES = [
     {"title": "Введение в Python и Jupyter", "type": "text", "content": "<h3>Установка Python</h3><p>Установите Python, pip, Jupyter Notebook...</p><h3>Основы синтаксиса</h3><p>Переменные, типы данных, циклы, функции...</p>"},
     {"title": "Библиотека NumPy", "type": "text", "content": "<h3>Создание массивов</h3><p>np.array, np.zeros, np.ones...</p><h3>Операции</h3><p>Индексация, срезы, математика...</p>"},
     {"title": "Практика: NumPy", "type": "assignment", "content": "<h3>Задание 1: NumPy</h3><p>Создайте массив, выполните математические операции, найдите мин/макс, срезайте данные.</p>"},
@@ -60,104 +164,50 @@ modules_data = [
     {"title": "Тест: Библиотека NumPy", "type": "assignment", "content": ""}, # content не используется для assignment с тестом
 ]
 
-modules = []
-for i, data in enumerate(modules_data):
-    module = Module(
-        course_id=course.id,
-        title=data["title"],
-        type=data["type"],
-        content=data.get("content"),
-        order=i+1
-    )
-    modules.append(module)
-
-db.add_all(modules)
-db.commit() # Чтобы получить ID модулей
-
-# --- Создаём задания (связанные с модулями типа "assignment") ---
-assignments_data = [
-    {"module_id": modules[2].id, "title": "ДЗ 1: NumPy", "description": "Создайте массив, выполните операции.", "deadline": datetime.datetime.now() + datetime.timedelta(days=7), "test_data": None},
-    {"module_id": modules[4].id, "title": "ДЗ 2: Pandas #1", "description": "Загрузите CSV, отфильтруйте.", "deadline": datetime.datetime.now() + datetime.timedelta(days=14), "test_data": None},
-    {"module_id": modules[6].id, "title": "ДЗ 3: Визуализация", "description": "Постройте графики.", "deadline": datetime.datetime.now() + datetime.timedelta(days=21), "test_data": None},
-    {"module_id": modules[8].id, "title": "ДЗ 4: Очистка данных", "description": "Обработайте NaN, удалите дубликаты.", "deadline": datetime.datetime.now() + datetime.timedelta(days=28), "test_data": None},
-    {"module_id": modules[10].id, "title": "ДЗ 5: Группировка", "description": "Сгруппируйте, посчитайте агрегаты.", "deadline": datetime.datetime.now() + datetime.timedelta(days=35), "test_data": None},
-    {"module_id": modules[12].id, "title": "ДЗ 6: Объединение", "description": "Соедините таблицы.", "deadline": datetime.datetime.now() + datetime.timedelta(days=42), "test_data": None},
-    {"module_id": modules[14].id, "title": "Финальный проект", "description": "Полный цикл анализа.", "deadline": datetime.datetime.now() + datetime.timedelta(days=50), "test_data": None},
-    # ТЕСТЫ
-    {"module_id": modules[18].id, "title": "Тест: Основы Python", "description": "Пройдите тест по основам Python.", "deadline": datetime.datetime.now() + datetime.timedelta(days=5), "test_data": json.dumps({
-        "questions": [
-            {
-                "question": "Какой тип данных используется для хранения целых чисел в Python?",
-                "options": ["float", "int", "str", "bool"],
-                "correct_answer": 1 # Индекс правильного ответа (0-based)
-            },
-            {
-                "question": "Какой оператор используется для определения функции в Python?",
-                "options": ["define", "function", "def", "func"],
-                "correct_answer": 2
-            }
-        ]
-    })},
-    {"module_id": modules[19].id, "title": "Тест: Библиотека NumPy", "description": "Пройдите тест по библиотеке NumPy.", "deadline": datetime.datetime.now() + datetime.timedelta(days=6), "test_data": json.dumps({
-        "questions": [
-            {
-                "question": "Какой тип данных NumPy используется для хранения массивов?",
-                "options": ["list", "tuple", "ndarray", "dict"],
-                "correct_answer": 2
-            },
-            {
-                "question": "Какая функция NumPy используется для создания массива, заполненного нулями?",
-                "options": ["np.one", "np.empty", "np.zeros", "np.full"],
-                "correct_answer": 2
-            }
-        ]
-    })},
+# (индекс модуля, название, описание, дедлайн через дней, вопросы теста или None)
+DEMO_ASSIGNMENTS = [
+    (2, "ДЗ 1: NumPy", "Создайте массив, выполните операции.", 7, None),
+    (4, "ДЗ 2: Pandas #1", "Загрузите CSV, отфильтруйте.", 14, None),
+    (6, "ДЗ 3: Визуализация", "Постройте графики.", 21, None),
+    (8, "ДЗ 4: Очистка данных", "Обработайте NaN, удалите дубликаты.", 28, None),
+    (10, "ДЗ 5: Группировка", "Сгруппируйте, посчитайте агрегаты.", 35, None),
+    (12, "ДЗ 6: Объединение", "Соедините таблицы.", 42, None),
+    (14, "Финальный проект", "Полный цикл анализа.", 50, None),
+    (18, "Тест: Основы Python", "Пройдите тест по основам Python.", 5, [
+        {
+            "question": "Какой тип данных используется для хранения целых чисел в Python?",
+            "options": ["float", "int", "str", "bool"],
+            "correct_answer": 1 # Индекс правильного ответа (0-based)
+        },
+        {
+            "question": "Какой оператор используется для определения функции в Python?",
+            "options": ["define", "function", "def", "func"],
+            "correct_answer": 2
+        },
+    ]),
+    (19, "Тест: Библиотека NumPy", "Пройдите тест по библиотеке NumPy.", 6, [
+        {
+            "question": "Какой тип данных NumPy используется для хранения массивов?",
+            "options": ["list", "tuple", "ndarray", "dict"],
+            "correct_answer": 2
+        },
+        {
+            "question": "Какая функция NumPy используется для создания массива, заполненного нулями?",
+            "options": ["np.one", "np.empty", "np.zeros", "np.full"],
+            "correct_answer": 2
+        },
+    ]),
 ]
 
-assignments = []
-for data in assignments_data: # <-- ИСПРАВЛЕНО: было assignments_
-    assignment = Assignment(
-        module_id=data["module_id"],
-        title=data["title"],
-        description=data["description"],
-        deadline=data["deadline"],
-        test_data=data["test_data"] # <-- Добавляем test_data
-    )
-    assignments.append(assignment)
-
-db.add_all(assignments)
-db.commit()
-
-# --- Создаём видео (связанные с модулями типа "video") ---
-# Примеры ссылок из RuTube (вставь реальные ID)
-videos_data = [
-    {"module_id": modules[15].id, "title": "Видео: Введение в Python", "description": "Установка, Jupyter, основы синтаксиса.", "video_type": "rutube", "video_url": "https://rutube.ru/play/embed/VIDEO_ID_1"}, # ЗАМЕНИТЬ НА РЕАЛЬНЫЙ ID
-    {"module_id": modules[16].id, "title": "Видео: NumPy", "description": "Создание массивов, операции.", "video_type": "rutube", "video_url": "https://rutube.ru/play/embed/VIDEO_ID_2"}, # ЗАМЕНИТЬ НА РЕАЛЬНЫЙ ID
-    {"module_id": modules[17].id, "title": "Видео: Pandas", "description": "DataFrame, Series, чтение CSV.", "video_type": "rutube", "video_url": "https://rutube.ru/play/embed/VIDEO_ID_3"}, # ЗАМЕНИТЬ НА РЕАЛЬНЫЙ ID
+# (индекс модуля, название, описание, ссылка) — примеры ссылок из RuTube (вставь реальные ID)
+DEMO_VIDEOS = [
+    (15, "Видео: Введение в Python", "Установка, Jupyter, основы синтаксиса.", "https://rutube.ru/play/embed/VIDEO_ID_1"), # ЗАМЕНИТЬ НА РЕАЛЬНЫЙ ID
+    (16, "Видео: NumPy", "Создание массивов, операции.", "https://rutube.ru/play/embed/VIDEO_ID_2"), # ЗАМЕНИТЬ НА РЕАЛЬНЫЙ ID
+    (17, "Видео: Pandas", "DataFrame, Series, чтение CSV.", "https://rutube.ru/play/embed/VIDEO_ID_3"), # ЗАМЕНИТЬ НА РЕАЛЬНЫЙ ID
 ]
 
-videos = []
-for data in videos_data: # <-- ИСПРАВЛЕНО: было videos_
-    video = Video(
-        module_id=data["module_id"],
-        title=data["title"],
-        description=data["description"],
-        video_type=data["video_type"],
-        video_url=data["video_url"]
-    )
-    videos.append(video)
-
-db.add_all(videos)
-db.commit()
-
-# --- Создаём запись студента на курс ---
-enrollment = Enrollment(user_id=student.id, course_id=course.id, role="student")
-db.add(enrollment)
-db.commit()
-
-# --- Создаём пример сабмишена с комментариями ---
-# Создаём файл с кодом
-example_code = """import numpy as np
+# Пример сабмишена с комментариями преподавателя
+EXAMPLE_CODE = """import numpy as np
 
 # Создаём массив
 arr = np.array([1, 2, 3, 4, 5])
@@ -173,23 +223,294 @@ print(result)
 # Ошибка: переменная 'data' не определена
 print(data)
 """
-if not os.path.exists("uploads"):
-    os.makedirs("uploads")
-with open("uploads/example_code.py", "w", encoding="utf-8") as f:
-    f.write(example_code)
-
-submission = Submission(
-    assignment_id=assignments[0].id, # ДЗ 1: NumPy
-    student_id=student.id,
-    file_path="uploads/example_code.py",
-    status="reviewed",
-    feedback="Хорошая работа, но есть пара замечаний по эффективности.",
-    grade=8
-)
-db.add(submission)
-db.commit()
-
-# --- Закрываем сессию ---
-db.close()
-
-print("✅ Демо-данные успешно созданы в db.sqlite")
\ No newline at end of file
+
+
+def seed_demo(engine) -> bool:
+    """Демо-курс. False — демо-данные уже есть."""
+    with engine.begin() as conn:
+        if conn.scalar(select(User.id).where(User.email == DEMO_STUDENT_EMAIL)) is not None:
+            return False
+
+        student_id, _teacher_id = insert_returning_ids(conn, User, [
+            {"email": DEMO_STUDENT_EMAIL, "name": "Алиса", "role": "student"},
+            {"email": DEMO_TEACHER_EMAIL, "name": "Борис", "role": "teacher"},
+        ])
+        course_id, = insert_returning_ids(conn, Course, [{
+            "title": "Python для анализа данных",
+            "description": "Изучите Python и основные библиотеки для анализа данных: NumPy, Pandas, Matplotlib, Seaborn.",
+            "tags": "python,data,pandas,numpy,matplotlib,seaborn",
+            "author": "Преподаватель К.",
+            "content": "",  # Не используем, т.к. контент в модулях
+        }])
+        # Каталог: остальные курсы (без модулей) — для поиска на дашборде
+        insert_rows(conn, Course, [{"title": title, "description": description} for title, description in CATALOG])
+
+        module_ids = insert_returning_ids(conn, Module, [
+            {"course_id": course_id, "title": m["title"], "type": m["type"], "content": m.get("content"), "order": i + 1}
+            for i, m in enumerate(DEMO_MODULES)
+        ])
+        now = datetime.datetime.now()
+        assignment_ids = insert_returning_ids(conn, Assignment, [
+            {
+                "module_id": module_ids[index],
+                "title": title,
+                "description": description,
+                "deadline": now + datetime.timedelta(days=days),
+                "test_data": json.dumps({"questions": questions}) if questions else None,
+            }
+            for index, title, description, days, questions in DEMO_ASSIGNMENTS
+        ])
+        insert_rows(conn, Video, [
+            {"module_id": module_ids[index], "title": title, "description": description,
+             "video_type": "rutube", "video_url": url}
+            for index, title, description, url in DEMO_VIDEOS
+        ])
+        insert_rows(conn, Enrollment, [{"user_id": student_id, "course_id": course_id, "role": "student"}])
+
+        file_path, sha256, size = write_blob(EXAMPLE_CODE.encode("utf-8"))
+        insert_rows(conn, Submission, [{
+            "assignment_id": assignment_ids[0],  # ДЗ 1: NumPy
+            "student_id": student_id,
+            "file_path": file_path,
+            "file_name": "example_code.py",
+            "status": "reviewed",
+            "feedback": "Хорошая работа, но есть пара замечаний по эффективности.",
+            "grade": 8,
+            "submitted_at": datetime.datetime.utcnow(),
+        }])
+        merge_blob_refs(conn, {sha256: (size, 1)})
+        rebuild_progress(conn)
+    return True
+
+
+# --- Синтетические данные ---
+
+TOPICS = [
+    "python", "data", "ml", "sql", "web", "devops", "security", "math",
+    "geology", "mining", "safety", "ecology", "economics", "iot", "frontend", "backend",
+]
+TITLE_WORDS = [
+    "Основы", "Практикум", "Продвинутый курс", "Введение в", "Интенсив", "Мастерская",
+]
+# Доли типов модулей в курсе
+MODULE_TYPES = (("text", 0.5), ("assignment", 0.35), ("video", 0.15))
+# Доля заданий-тестов среди заданий
+TEST_SHARE = 0.3
+# Сабмишены последних заданий часто ещё не проверены
+PENDING_SHARE = 0.3
+SAMPLE_FILES = 50
+
+
+@dataclass
+class SyntheticConfig:
+    students: int = 1000
+    teachers: int = 20
+    courses: int = 50
+    modules: int = 12  # на курс
+    courses_per_student: float = 2.0  # в среднем (1 + Пуассон)
+    days: int = 90  # сабмишены за последние N дней
+    seed: int = 42
+
+
+def _sample_quiz(rng, n_questions: int) -> dict:
+    questions = []
+    for q in range(n_questions):
+        kind = rng.choice(["single", "single", "multi", "numeric"])
+        options = [f"Вариант {chr(65 + i)}" for i in range(4)]
+        question = {"question": f"Вопрос {q + 1}", "type": kind, "options": options}
+        if kind == "single":
+            question["correct_answer"] = int(rng.integers(4))
+        elif kind == "multi":
+            question["correct_answers"] = sorted(rng.choice(4, size=2, replace=False).tolist())
+        else:
+            question.update(options=[], correct_value=float(rng.integers(1, 100)), tolerance=0.5)
+        questions.append(question)
+    return {"questions": questions}
+
+
+def _random_answers(rng, quiz, skill: float) -> list:
+    """Ответы студента: с вероятностью skill — правильный, иначе случайный."""
+    answers = []
+    for q, question in enumerate(quiz.questions):
+        right = rng.random() < skill
+        if question.type == "numeric":
+            value = float(quiz.values[q])
+            answers.append(value if right else value + float(rng.integers(1, 10)))
+        elif question.type == "multi":
+            mask = int(quiz.correct[q])
+            chosen = [i for i in range(len(question.options)) if mask >> i & 1]
+            answers.append(chosen if right else sorted({int(rng.integers(len(question.options)))}))
+        else:
+            answers.append(int(quiz.correct[q]) if right else int(rng.integers(len(question.options))))
+    return answers
+
+
+def seed_synthetic(engine, config: SyntheticConfig) -> bool:
+    """Синтетика для нагрузочных тестов. False — уже есть."""
+    rng = np.random.default_rng(config.seed)
+    first_email = f"load-student-0@{SYNTHETIC_DOMAIN}"
+    with engine.begin() as conn:
+        # Всё в одной транзакции: первый пользователь есть, только если наполнение завершилось
+        if conn.scalar(select(User.id).where(User.email == first_email)) is not None:
+            return False
+
+        # Пользователи и каталог
+        teacher_ids = insert_returning_ids(conn, User, [
+            {"email": f"load-teacher-{i}@{SYNTHETIC_DOMAIN}", "name": f"Преподаватель {i}", "role": "teacher"}
+            for i in range(config.teachers)
+        ])
+        student_ids = insert_returning_ids(conn, User, [
+            {"email": f"load-student-{i}@{SYNTHETIC_DOMAIN}", "name": f"Студент {i}", "role": "student"}
+            for i in range(config.students)
+        ])
+
+        course_rows, course_teacher = [], []
+        for c in range(config.courses):
+            topics = rng.choice(TOPICS, size=3, replace=False).tolist()
+            teacher = int(rng.integers(config.teachers))
+            course_teacher.append(teacher_ids[teacher])
+            course_rows.append({
+                "title": f"{rng.choice(TITLE_WORDS)} {topics[0]} #{c + 1}",
+                "description": f"Синтетический курс по темам: {', '.join(topics)}.",
+                "tags": ",".join(topics),
+                "author": f"Преподаватель {teacher}",
+            })
+        course_ids = insert_returning_ids(conn, Course, course_rows)
+
+        types, shares = zip(*MODULE_TYPES)
+        module_rows = []
+        for course_id in course_ids:
+            for order, kind in enumerate(rng.choice(types, size=config.modules, p=shares).tolist(), start=1):
+                module_rows.append({
+                    "course_id": course_id, "title": f"Модуль {order}", "type": kind,
+                    "content": f"<p>Материал модуля {order}.</p>" if kind == "text" else None, "order": order,
+                })
+        module_ids = insert_returning_ids(conn, Module, module_rows)
+
+        now = datetime.datetime.now()
+        assignment_rows, assignment_course = [], []
+        video_rows = []
+        for module_id, row in zip(module_ids, module_rows):
+            if row["type"] == "assignment":
+                is_test = rng.random() < TEST_SHARE
+                assignment_rows.append({
+                    "module_id": module_id,
+                    "title": f"{'Тест' if is_test else 'Задание'}: {row['title']}",
+                    "description": "Синтетическое задание.",
+                    "deadline": now + datetime.timedelta(days=int(rng.integers(1, 60))),
+                    "test_data": json.dumps(_sample_quiz(rng, int(rng.integers(3, 11)))) if is_test else None,
+                })
+                assignment_course.append(row["course_id"])
+            elif row["type"] == "video":
+                video_rows.append({
+                    "module_id": module_id, "title": f"Видео: {row['title']}", "description": "",
+                    "video_type": "placeholder", "video_url": None,
+                })
+        assignment_ids = insert_returning_ids(conn, Assignment, assignment_rows)
+        insert_rows(conn, Video, video_rows)
+
+        course_assignments = {course_id: [] for course_id in course_ids}
+        for assignment_id, row, course_id in zip(assignment_ids, assignment_rows, assignment_course):
+            quiz = compile_quiz(row["test_data"]) if row["test_data"] else None
+            course_assignments[course_id].append((assignment_id, quiz))
+
+        # Популярность курсов — закон Ципфа (немного хитов, длинный хвост)
+        popularity = 1.0 / np.arange(1, config.courses + 1)
+        popularity = rng.permutation(popularity / popularity.sum())
+        sample_blobs = [
+            write_blob(f"# Решение {i}\nimport numpy as np\n\nprint(np.arange({i}).sum())\n".encode("utf-8"))
+            for i in range(SAMPLE_FILES)
+        ]
+        blob_refs = {}
+
+        # Записи на курсы и сабмишены
+        enrollment_rows = [
+            {"user_id": teacher_id, "course_id": course_id, "role": "teacher"}
+            for course_id, teacher_id in zip(course_ids, course_teacher)
+        ]
+        submission_rows = []
+        horizon = datetime.timedelta(days=config.days)
+        start = datetime.datetime.utcnow() - horizon
+        for student_id in student_ids:
+            n_courses = min(config.courses, 1 + int(rng.poisson(max(config.courses_per_student - 1, 0))))
+            skill = float(rng.beta(5, 2))  # доля правильных ответов в тестах
+            for course_idx in rng.choice(config.courses, size=n_courses, replace=False, p=popularity):
+                course_id = course_ids[course_idx]
+                enrollment_rows.append({"user_id": student_id, "course_id": course_id, "role": "student"})
+                assignments = course_assignments[course_id]
+                # Сколько заданий по порядку студент успел сдать до того, как бросил/остановился
+                done = int(round(rng.beta(2, 2) * len(assignments)))
+                moments = np.sort(rng.random(done)) * horizon.total_seconds()
+                for k, ((assignment_id, quiz), offset) in enumerate(zip(assignments[:done], moments)):
+                    submitted_at = start + datetime.timedelta(seconds=float(offset))
+                    if quiz is not None:
+                        answers = _random_answers(rng, quiz, skill)
+                        result = grade(quiz, *encode_answers(quiz, [answers]))
+                        submission_rows.append({
+                            "assignment_id": assignment_id, "student_id": student_id,
+                            "file_path": None, "file_name": None, "status": "reviewed",
+                            "grade": round(float(result.percent[0])),  # колонка Integer, как в submit_test
+                            "feedback": feedback_text(int(result.correct[0]), result.total),
+                            "test_answers": json.dumps(answers), "submitted_at": submitted_at,
+                        })
+                        continue
+                    file_path, sha256, size = sample_blobs[int(rng.integers(SAMPLE_FILES))]
+                    blob_refs[sha256] = (size, blob_refs.get(sha256, (size, 0))[1] + 1)
+                    pending = k >= done - 2 and rng.random() < PENDING_SHARE
+                    submission_rows.append({
+                        "assignment_id": assignment_id, "student_id": student_id, "file_path": file_path,
+                        "file_name": "solution.py", "status": "pending" if pending else "reviewed",
+                        "grade": None if pending else int(rng.integers(4, 11)),
+                        "feedback": None if pending else "Принято.",
+                        "test_answers": None, "submitted_at": submitted_at,
+                    })
+        insert_rows(conn, Enrollment, enrollment_rows)
+        insert_rows(conn, Submission, submission_rows)
+        merge_blob_refs(conn, blob_refs)
+
+        # Материализованный прогресс по истории
+        rebuild_progress(conn)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Наполнение БД демо- и синтетическими данными")
+    parser.add_argument("command", nargs="?", default="demo", choices=["demo", "synthetic"])
+    defaults = SyntheticConfig()
+    parser.add_argument("--students", type=int, default=defaults.students)
+    parser.add_argument("--teachers", type=int, default=defaults.teachers)
+    parser.add_argument("--courses", type=int, default=defaults.courses)
+    parser.add_argument("--modules", type=int, default=defaults.modules, help="модулей на курс")
+    parser.add_argument("--courses-per-student", type=float, default=defaults.courses_per_student)
+    parser.add_argument("--days", type=int, default=defaults.days)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    from .database import engine
+    from .migrate import upgrade_database
+    upgrade_database(engine)
+
+    if args.command == "demo":
+        if seed_demo(engine):
+            print("✅ Демо-данные успешно созданы")
+        else:
+            print("✅ Демо-данные уже есть — пропускаем")
+        return
+
+    config = SyntheticConfig(
+        students=args.students, teachers=args.teachers, courses=args.courses, modules=args.modules,
+        courses_per_student=args.courses_per_student, days=args.days, seed=args.seed,
+    )
+    started = datetime.datetime.now()
+    if not seed_synthetic(engine, config):
+        print("✅ Синтетические данные уже есть — пропускаем")
+        return
+    with engine.connect() as conn:
+        counts = {model.__tablename__: conn.scalar(select(func.count()).select_from(model))
+                  for model in (User, Course, Module, Enrollment, Submission)}
+    elapsed = (datetime.datetime.now() - started).total_seconds()
+    print(f"✅ Синтетические данные созданы за {elapsed:.1f} с: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
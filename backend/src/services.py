@@ -0,0 +1,157 @@
+# src/services.py
+"""Переиспользуемые запросы к БД, которые нужны нескольким роутам."""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, func, distinct, case, and_, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from .models import Submission, Module, Assignment
+
+# Тип модуля → ключ в статистике курса
+MODULE_TYPE_STATS = {"video": "videos", "assignment": "assignments", "text": "texts"}
+
+
+async def get_student_submission(db: AsyncSession, assignment_id: int, student_id: int) -> Optional[Submission]:
+    """
+    Последний сабмишен студента по заданию.
+
+    Фильтр по student_id идёт в SQL (индекс ix_submissions_assignment_student),
+    поэтому сабмишены остальных студентов не загружаются.
+    """
+    return await db.scalar(
+        select(Submission)
+        .where(Submission.assignment_id == assignment_id, Submission.student_id == student_id)
+        .order_by(Submission.id.desc())
+        .limit(1)
+    )
+
+
+async def course_progress(db: AsyncSession, user_id: int, course_id: int) -> dict:
+    """
+    Прогресс студента и статистика модулей курса одним запросом.
+
+    GROUP BY Module.type: сколько модулей каждого типа и у скольких из них
+    есть проверенный сабмишен этого студента. Возвращает
+    {"progress": ..., "total": ..., "stats": {"videos": .., "assignments": .., "texts": ..}}.
+    """
+    reviewed = and_(
+        Submission.assignment_id == Assignment.id,
+        Submission.student_id == user_id,
+        Submission.status == "reviewed",
+    )
+    rows = await db.execute(
+        select(
+            Module.type,
+            func.count(distinct(Module.id)),
+            func.count(distinct(case((Submission.id.is_not(None), Module.id)))),
+        )
+        .select_from(Module)
+        .outerjoin(Assignment, Assignment.module_id == Module.id)
+        .outerjoin(Submission, reviewed)
+        .where(Module.course_id == course_id)
+        .group_by(Module.type)
+    )
+
+    stats = {key: 0 for key in MODULE_TYPE_STATS.values()}
+    completed = 0
+    for module_type, modules_count, completed_count in rows:
+        if module_type in MODULE_TYPE_STATS:
+            stats[MODULE_TYPE_STATS[module_type]] = modules_count
+        if module_type == "assignment":
+            completed = completed_count
+
+    return {"progress": completed, "total": stats["assignments"], "stats": stats}
+
+
+async def course_module_stats(db: AsyncSession, course_id: int) -> dict:
+    """Сколько в курсе видео, заданий и текстов (без сабмишенов)."""
+    rows = await db.execute(
+        select(Module.type, func.count(Module.id))
+        .where(Module.course_id == course_id)
+        .group_by(Module.type)
+    )
+    stats = {key: 0 for key in MODULE_TYPE_STATS.values()}
+    for module_type, modules_count in rows:
+        if module_type in MODULE_TYPE_STATS:
+            stats[MODULE_TYPE_STATS[module_type]] = modules_count
+    return stats
+
+
+class InvalidCursor(ValueError):
+    """Курсор очереди не разбирается (испорчен или подделан в адресе)."""
+
+
+def encode_queue_cursor(submission: Submission) -> str:
+    """Курсор keyset-пагинации: "<submitted_at ISO>|<id>" последней строки страницы."""
+    return f"{submission.submitted_at.isoformat()}|{submission.id}"
+
+
+def decode_queue_cursor(cursor: str):
+    try:
+        submitted_at, submission_id = cursor.rsplit("|", 1)
+        return datetime.fromisoformat(submitted_at), int(submission_id)
+    except ValueError:
+        raise InvalidCursor(cursor) from None
+
+
+async def pending_submissions_page(
+    db: AsyncSession,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    course_id: Optional[int] = None,
+    assignment_id: Optional[int] = None,
+    oldest_first: bool = True,
+):
+    """
+    Страница очереди проверки (status == "pending") по ключу (submitted_at, id).
+
+    Без OFFSET: следующая страница начинается строго после курсора, поэтому
+    стоимость не зависит от размера очереди (индекс ix_submissions_status_submitted_at).
+    Возвращает (сабмишены с загруженными assignment и student, курсор или None).
+    InvalidCursor — если курсор не разбирается.
+    """
+    query = _pending_filter(
+        select(Submission).options(joinedload(Submission.assignment), joinedload(Submission.student)),
+        course_id, assignment_id,
+    )
+
+    key = tuple_(Submission.submitted_at, Submission.id)
+    if cursor:
+        after = tuple_(*decode_queue_cursor(cursor))
+        query = query.where(key > after if oldest_first else key < after)
+    if oldest_first:
+        query = query.order_by(Submission.submitted_at, Submission.id)
+    else:
+        query = query.order_by(Submission.submitted_at.desc(), Submission.id.desc())
+
+    # Берём на одну строку больше — так узнаём, есть ли следующая страница
+    items = (await db.scalars(query.limit(limit + 1))).all()
+    next_cursor = encode_queue_cursor(items[limit - 1]) if len(items) > limit else None
+    return items[:limit], next_cursor
+
+
+async def pending_submissions_count(
+    db: AsyncSession,
+    course_id: Optional[int] = None,
+    assignment_id: Optional[int] = None,
+) -> int:
+    """Размер очереди проверки с теми же фильтрами, что у pending_submissions_page."""
+    return await db.scalar(
+        _pending_filter(select(func.count()).select_from(Submission), course_id, assignment_id)
+    )
+
+
+def _pending_filter(query, course_id: Optional[int], assignment_id: Optional[int]):
+    """Сабмишены на проверке, по курсу и/или заданию (None — все)."""
+    query = query.where(Submission.status == "pending")
+    if assignment_id is not None:
+        query = query.where(Submission.assignment_id == assignment_id)
+    if course_id is not None:
+        query = query.where(Submission.assignment_id.in_(
+            select(Assignment.id)
+            .join(Module, Module.id == Assignment.module_id)
+            .where(Module.course_id == course_id)
+        ))
+    return query
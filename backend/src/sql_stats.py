@@ -0,0 +1,196 @@
+# src/sql_stats.py
+"""
+SQL-запросы на HTTP-запрос: сколько, сколько времени в БД, сколько строк.
+
+События движков SQLAlchemy (before/after_cursor_execute) считают запросы
+в объект QueryStats текущего запроса (ContextVar — у каждого запроса свой,
+в т.ч. внутри greenlet асинхронной сессии). Строки — полученные SELECT
+через Session (ORM и db.execute) плюс затронутые INSERT/UPDATE/DELETE;
+SELECT напрямую через Connection (CLI-скрипты) в строки не попадают.
+SQLStatsMiddleware:
+- добавляет заголовок Server-Timing: db;dur=12.3;desc="7 queries, 40 rows", app;dur=45.6
+  (видно во вкладке Network браузера);
+- пишет строку лога на запрос (logger backend.src.sql_stats, INFO) с полями в extra;
+- запросы дольше SLOW_QUERY_MS пишутся в лог (WARNING) с параметрами.
+
+В тестах:
+    with assert_max_queries(6):
+        client.get("/student/course/1")
+    with track_queries() as stats:       # вне HTTP: сервисная функция
+        await get_student_submission(db, assignment_id, student_id)
+    assert stats.queries == 1 and stats.rows <= 1
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+# SQL_STATS=0 — не считать запросы и не добавлять Server-Timing
+SQL_STATS_ENABLED = os.environ.get("SQL_STATS", "1") != "0"
+# Запросы дольше (мс) — в лог с параметрами
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 100))
+# Параметры executemany бывают огромными — в лог идёт начало
+MAX_LOGGED_PARAMS = 1000
+
+
+@dataclass
+class QueryStats:
+    queries: int = 0
+    db_time: float = 0.0  # секунды
+    rows: int = 0
+    path: str = ""
+    # Тексты запросов — только пока открыт assert_max_queries
+    statements: Optional[List[str]] = None
+
+    def server_timing(self, total: float) -> str:
+        return (
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries, {self.rows} rows", '
+            f"app;dur={total * 1000:.1f}"
+        )
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("sql_stats", default=None)
+# Открытые assert_max_queries: каждый получает статистику завершившихся запросов
+_captures: List[List[QueryStats]] = []
+
+
+def current_stats() -> Optional[QueryStats]:
+    """Статистика текущего HTTP-запроса (None — вне запроса или счёт выключен)."""
+    return _current.get()
+
+
+def _rows_changed(cursor, context) -> int:
+    # INSERT/UPDATE/DELETE — затронутые строки (rowcount из DB-API). Строки
+    # SELECT драйвер до чтения результата не знает — их считает _count_result_rows
+    if context.isinsert or context.isupdate or context.isdelete:
+        return max(cursor.rowcount, 0)
+    return 0
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # На контексте выполнения, а не в conn.info: если execute упадёт, ничего не останется висеть
+    context.sql_stats_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.sql_stats_started
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+        stats.rows += _rows_changed(cursor, context)
+        if stats.statements is not None:
+            stats.statements.append(statement)
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        path = stats.path if stats is not None else "-"
+        logger.warning(
+            "Медленный SQL-запрос %.1f мс (%s): %s | параметры: %.*s",
+            elapsed * 1000, path, " ".join(statement.split()), MAX_LOGGED_PARAMS, repr(parameters),
+            extra={"sql_duration_ms": round(elapsed * 1000, 1), "sql_statement": statement, "http_path": path},
+        )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _count_result_rows(orm_execute_state):
+    """
+    Строки SELECT через Session (AsyncSession — тоже): результат читается
+    целиком и подменяется копией, из которой читает вызывающий. Асинхронные
+    драйверы и так буферизуют весь результат; потоковые запросы не трогаем.
+    """
+    stats = _current.get()
+    options = orm_execute_state.execution_options
+    if stats is None or not orm_execute_state.is_select or options.get("stream_results") or options.get("yield_per"):
+        return None
+    frozen = orm_execute_state.invoke_statement().freeze()
+    stats.rows += len(frozen.data)
+    return frozen()
+
+
+class SQLStatsMiddleware:
+    """ASGI middleware: QueryStats на каждый HTTP-запрос, Server-Timing и строка лога."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not SQL_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(path=scope["path"], statements=[] if _captures else None)
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # Запросы после начала ответа (фоновые задачи) в заголовок уже не попадут — только в лог
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            total = time.perf_counter() - started
+            # Шаблон пути (/student/course/{course_id}) — чтобы логи можно было группировать по роуту
+            route = getattr(scope.get("route"), "path", scope["path"])
+            logger.info(
+                "%s %s %d: %d SQL, db %.1f мс, строк %d, всего %.1f мс",
+                scope["method"], route, status, stats.queries, stats.db_time * 1000, stats.rows, total * 1000,
+                extra={
+                    "http_method": scope["method"],
+                    "http_route": route,
+                    "http_status": status,
+                    "sql_queries": stats.queries,
+                    "sql_time_ms": round(stats.db_time * 1000, 1),
+                    "sql_rows": stats.rows,
+                    "duration_ms": round(total * 1000, 1),
+                },
+            )
+            for captured in _captures:
+                captured.append(stats)
+
+
+@contextmanager
+def track_queries():
+    """Считает SQL-запросы блока вне HTTP-запроса (сервисные функции в тестах, скрипты)."""
+    stats = QueryStats(path="-", statements=[])
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    """
+    Для тестов: каждый HTTP-запрос внутри блока делает не больше limit SQL-запросов.
+    Иначе AssertionError со списком запросов (удобно искать N+1).
+    Работает с TestClient и httpx.ASGITransport — приложение в том же процессе.
+    """
+    captured: List[QueryStats] = []
+    _captures.append(captured)
+    try:
+        yield captured
+    finally:
+        _captures.remove(captured)
+    for stats in captured:
+        if stats.queries > limit:
+            statements = "\n".join(f"  {i}. {' '.join(s.split())}" for i, s in enumerate(stats.statements or [], 1))
+            raise AssertionError(f"{stats.queries} SQL-запросов при лимите {limit}:\n{statements}")
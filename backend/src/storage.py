@@ -0,0 +1,376 @@
+# src/storage.py
+"""
+Приём и хранение файлов заданий.
+
+Тело multipart-запроса читается потоком (request.stream()) и разбирается
+python-multipart без буферизации всего файла: куски по UPLOAD_CHUNK_SIZE
+пишутся во временный файл в пуле потоков, SHA-256 считается там же.
+Лимит размера проверяется на лету — слишком большой файл обрывается сразу,
+не дожидаясь конца загрузки. Готовый файл переносится на место os.replace,
+так что недописанных файлов в uploads/ не бывает.
+
+Файлы хранятся по содержимому (content-addressed): uploads/blobs/ab/cd/<sha256>.
+Одинаковые файлы (повторные отправки, общий стартовый код) лежат на диске
+один раз; таблица blobs считает ссылки из сабмишенов. Блобы без ссылок
+удаляет сборщик мусора:
+    python -m backend.src.storage gc [--dry-run]
+
+Повторная отправка существующего блоба обновляет его mtime: сабмишен с
+новой ссылкой ещё не закоммичен, и gc не должен счесть блоб брошенным.
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, Tuple
+
+from multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+
+from .metrics import UPLOAD_BYTES, UPLOAD_SECONDS
+from .models import Blob, Submission
+
+# Размер куска, который уходит на запись в поток
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Лимит по умолчанию, если у задания не задан свой (Assignment.max_upload_bytes)
+DEFAULT_MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+# Запас на заголовки multipart при проверке Content-Length
+MULTIPART_OVERHEAD = 64 * 1024
+
+SAFE_NAME_RE = re.compile(r"[^\w.\-]+")
+
+UPLOAD_ROOT = Path(os.environ.get("UPLOAD_DIR", "uploads"))
+BLOB_DIR = UPLOAD_ROOT / "blobs"
+# Производные данные блобов (индексы строк и т.п.): cache/<вид>/<sha256>.*
+CACHE_DIR = UPLOAD_ROOT / "cache"
+# Блобы моложе этого не трогает gc: сабмишен на них может быть ещё не закоммичен
+GC_GRACE_SECONDS = 3600
+
+
+class UploadError(Exception):
+    """Некорректный запрос загрузки (не multipart, нет файла)."""
+
+
+class UploadTooLarge(UploadError):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Файл больше {max_bytes / (1024 * 1024):.1f} МБ")
+        self.max_bytes = max_bytes
+
+
+@dataclass
+class ReceivedUpload:
+    """Файл, полностью принятый во временный путь (ещё не на своём месте)."""
+    tmp_path: Path
+    filename: str
+    size: int
+    sha256: str
+
+
+def safe_filename(filename: str) -> str:
+    """Имя файла без каталогов и спецсимволов (../, пробелы и т.п.)."""
+    name = SAFE_NAME_RE.sub("_", Path(filename or "").name).strip("._")
+    return name or "file"
+
+
+class _FilePartSink:
+    """Колбэки python-multipart: собирает байты нужного поля, остальные части пропускает."""
+
+    def __init__(self, field: str, max_bytes: int):
+        self.field = field
+        self.max_bytes = max_bytes
+        self.filename: Optional[str] = None
+        self.size = 0
+        self.pending: list = []
+        self.pending_size = 0
+        self.too_large = False
+        self._found = False
+        self._in_target = False
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+    def on_part_begin(self) -> None:
+        self._disposition = b""
+        self._in_target = False
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        if name == self.field and b"filename" in options and not self._found:
+            self._found = True
+            self._in_target = True
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self._in_target or self.too_large:
+            return
+        self.size += end - start
+        if self.size > self.max_bytes:
+            self.too_large = True
+            return
+        self.pending.append(data[start:end])
+        self.pending_size += end - start
+
+    def on_part_end(self) -> None:
+        self._in_target = False
+
+    def take_pending(self) -> bytes:
+        chunk = b"".join(self.pending)
+        self.pending.clear()
+        self.pending_size = 0
+        return chunk
+
+
+def _write_chunk(f, hasher, chunk: bytes) -> None:
+    f.write(chunk)
+    hasher.update(chunk)
+
+
+def _finish_file(f) -> None:
+    # fsync откладываем до store_blob: дубликат удалится, так и не дойдя до диска
+    f.flush()
+    f.close()
+
+
+def _discard(f, path: Path) -> None:
+    f.close()
+    path.unlink(missing_ok=True)
+
+
+async def receive_upload(request: Request, tmp_dir: Path, max_bytes: int, field: str = "file") -> ReceivedUpload:
+    """
+    Принимает файл из multipart-поля field во временный файл в tmp_dir.
+
+    tmp_dir должен быть на той же файловой системе, что и итоговый путь,
+    иначе перенос на место не будет атомарным. UploadTooLarge — если файл больше
+    max_bytes (частичный файл удаляется).
+    """
+    started = time.perf_counter()
+    outcome = "aborted"  # клиент оборвал соединение и т.п.
+    try:
+        upload = await _receive_upload(request, tmp_dir, max_bytes, field)
+        outcome = "ok"
+    except UploadTooLarge:
+        outcome = "too_large"
+        raise
+    except UploadError:
+        outcome = "error"
+        raise
+    finally:
+        UPLOAD_SECONDS.observe(time.perf_counter() - started, outcome)
+    UPLOAD_BYTES.observe(upload.size)
+    return upload
+
+
+async def _receive_upload(request: Request, tmp_dir: Path, max_bytes: int, field: str) -> ReceivedUpload:
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadError("Ожидается multipart/form-data")
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+        # Заведомо больше лимита — даже не начинаем читать тело
+        raise UploadTooLarge(max_bytes)
+
+    sink = _FilePartSink(field, max_bytes)
+    parser = MultipartParser(params[b"boundary"], sink.callbacks())
+    hasher = hashlib.sha256()
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = tmp_dir / f"{uuid.uuid4().hex}.part"
+    f = await asyncio.to_thread(open, tmp_path, "wb")
+    try:
+        async for body_chunk in request.stream():
+            parser.write(body_chunk)
+            if sink.too_large:
+                raise UploadTooLarge(max_bytes)
+            if sink.pending_size >= UPLOAD_CHUNK_SIZE:
+                await asyncio.to_thread(_write_chunk, f, hasher, sink.take_pending())
+        parser.finalize()
+        if sink.filename is None:
+            raise UploadError("Файл не передан")
+        if sink.pending_size:
+            await asyncio.to_thread(_write_chunk, f, hasher, sink.take_pending())
+        await asyncio.to_thread(_finish_file, f)
+    except BaseException:
+        await asyncio.to_thread(_discard, f, tmp_path)
+        raise
+
+    return ReceivedUpload(tmp_path=tmp_path, filename=sink.filename, size=sink.size, sha256=hasher.hexdigest())
+
+
+async def discard_upload(upload: ReceivedUpload) -> None:
+    await asyncio.to_thread(upload.tmp_path.unlink, True)
+
+
+# --- Content-addressed хранилище ---
+
+def blob_path(sha256: str, blob_dir: Path = BLOB_DIR) -> Path:
+    """Путь блоба: два уровня шардинга по префиксу хэша (до 65536 каталогов)."""
+    return blob_dir / sha256[:2] / sha256[2:4] / sha256
+
+
+def _place_blob(tmp_path: Path, path: Path) -> bool:
+    try:
+        # Свежий mtime — gc не тронет блоб, пока сабмишен с новой ссылкой не закоммичен
+        os.utime(path)
+        tmp_path.unlink(missing_ok=True)
+        return False
+    except FileNotFoundError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return True
+
+
+async def store_blob(upload: ReceivedUpload, blob_dir: Path = BLOB_DIR) -> Tuple[Path, bool]:
+    """
+    Кладёт принятый файл в хранилище. Возвращает (путь блоба, создан ли новый).
+
+    Если такое содержимое уже есть, временный файл просто удаляется.
+    """
+    path = blob_path(upload.sha256, blob_dir)
+    created = await asyncio.to_thread(_place_blob, upload.tmp_path, path)
+    return path, created
+
+
+def _upsert(dialect_name: str):
+    return postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+
+
+async def add_blob_ref(db: AsyncSession, sha256: str, size: int) -> None:
+    """+1 ссылка на блоб — в той же транзакции, что и сабмишен."""
+    insert = _upsert(db.get_bind().dialect.name)
+    stmt = insert(Blob).values(sha256=sha256, size=size, refcount=1)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[Blob.sha256],
+        set_={"refcount": Blob.refcount + 1},
+    ))
+
+
+def _remove_blob(path: Path, deadline: float) -> bool:
+    """
+    Удаляет блоб, если его mtime всё ещё не позже deadline.
+
+    Блоб сначала переносится в сторону: если store_blob успел обновить mtime
+    до переноса, блоб возвращается на место; если после — utime не найдёт
+    файл, и store_blob положит свою копию заново.
+    """
+    trash = path.with_name(path.name + ".gc")
+    try:
+        os.replace(path, trash)
+    except FileNotFoundError:
+        return False
+    if trash.stat().st_mtime > deadline:
+        os.replace(trash, path)
+        return False
+    trash.unlink()
+    return True
+
+
+def collect_garbage(engine, blob_dir: Path = BLOB_DIR, grace_seconds: float = GC_GRACE_SECONDS, dry_run: bool = False) -> dict:
+    """
+    Удаляет блобы, на которые не ссылается ни один сабмишен.
+
+    Счётчики в blobs пересчитываются по submissions.file_path (источник
+    правды), затем удаляются файлы без ссылок старше grace_seconds и
+    строки blobs с нулевым счётчиком. Брошенные временные файлы в .tmp
+    и кэши (CACHE_DIR) удалённых блобов тоже удаляются.
+    """
+    deadline = time.time() - grace_seconds
+    prefix = str(blob_dir) + os.sep
+    with engine.begin() as conn:
+        paths = conn.scalars(
+            select(Submission.file_path).where(Submission.file_path.like(prefix + "%"))
+        ).all()
+        refs: dict = {}
+        for path in paths:
+            sha256 = Path(path).name
+            refs[sha256] = refs.get(sha256, 0) + 1
+
+        stored = dict(conn.execute(select(Blob.sha256, Blob.refcount)).all())
+        fixed = 0
+        for sha256, refcount in stored.items():
+            if refs.get(sha256, 0) != refcount:
+                fixed += 1
+                if not dry_run:
+                    conn.execute(update(Blob).where(Blob.sha256 == sha256).values(refcount=refs.get(sha256, 0)))
+
+        removed, freed = 0, 0
+        for path in blob_dir.glob("??/??/*"):
+            if path.name in refs or path.stat().st_mtime > deadline:
+                continue
+            size = path.stat().st_size
+            if dry_run or _remove_blob(path, deadline):
+                removed += 1
+                freed += size
+
+        for path in (blob_dir.parent / CACHE_DIR.name).glob("*/*"):
+            if path.name.split(".")[0] not in refs and path.stat().st_mtime <= deadline and not dry_run:
+                path.unlink(missing_ok=True)
+
+        tmp_removed = 0
+        for path in (blob_dir.parent / ".tmp").glob("*.part"):
+            if path.stat().st_mtime <= deadline:
+                tmp_removed += 1
+                if not dry_run:
+                    path.unlink(missing_ok=True)
+
+        if not dry_run:
+            cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+            conn.execute(delete(Blob).where(Blob.refcount == 0, Blob.created_at < cutoff))
+
+    return {"removed": removed, "freed_bytes": freed, "refcounts_fixed": fixed, "tmp_removed": tmp_removed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обслуживание хранилища файлов заданий")
+    parser.add_argument("command", choices=["gc"])
+    parser.add_argument("--dry-run", action="store_true", help="только показать, что будет удалено")
+    parser.add_argument("--grace-seconds", type=float, default=GC_GRACE_SECONDS)
+    args = parser.parse_args()
+
+    from .database import engine
+    if args.command == "gc":
+        result = collect_garbage(engine, grace_seconds=args.grace_seconds, dry_run=args.dry_run)
+        action = "Будет удалено" if args.dry_run else "Удалено"
+        print(
+            f"✅ {action} блобов: {result['removed']} ({result['freed_bytes'] / (1024 * 1024):.1f} МБ), "
+            f"временных файлов: {result['tmp_removed']}, исправлено счётчиков: {result['refcounts_fixed']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# src/template_cache.py
+"""
+Кэши шаблонов Jinja2.
+
+1. Байткод на диске (FileSystemBytecodeCache, JINJA_CACHE_DIR): шаблон
+   компилируется в Python-код один раз на все воркеры и перезапуски —
+   при следующем старте воркер только загружает байткод (marshal).
+   Изменённый шаблон перекомпилируется сам: ключ — имя и исходник.
+2. precompile_templates — загрузка всех шаблонов при старте воркера,
+   чтобы первый запрос к странице не платил за компиляцию.
+3. Кэш фрагментов — тег {% cache %} с объектом Fragment из роута:
+       summary = Fragment("course-summary", course.id, course.updated_at)
+       if not summary.cached:
+           stats = await course_module_stats(db, course.id)   # только для фрагмента
+       ...
+       {% cache summary %} ... {% endcache %}
+   Версия в ключе — то, что роут уже прочитал (courses.updated_at меняется и
+   при изменении модулей курса, см. models). Готовый HTML берётся из кэша при
+   создании Fragment, поэтому роут знает о попадании до запросов к БД и может
+   их пропустить, а вытеснение между проверкой и рендером ничего не ломает.
+   В фрагмент нельзя класть данные конкретного пользователя.
+"""
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from jinja2 import FileSystemBytecodeCache, TemplateError, nodes
+from jinja2.ext import Extension
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+JINJA_CACHE_DIR = Path(os.environ.get("JINJA_CACHE_DIR", "spool/jinja"))
+# Фрагментов в памяти процесса (HTML небольших блоков страницы)
+FRAGMENT_CACHE_SIZE = int(os.environ.get("FRAGMENT_CACHE_SIZE", 4096))
+
+FRAGMENT_CACHE = registry.counter(
+    "template_fragment_cache_total", "Обращения к кэшу фрагментов шаблонов", ["fragment", "result"]
+)
+
+
+class FragmentCache:
+    """LRU готовых фрагментов HTML по ключу (имя, части ключа...)."""
+
+    def __init__(self, maxsize: int = FRAGMENT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[tuple, str]" = OrderedDict()
+
+    def get(self, key: tuple) -> Optional[str]:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def set(self, key: tuple, value: str) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+fragment_cache = FragmentCache()
+
+
+class Fragment:
+    """Ключ фрагмента и его HTML из кэша (None — фрагмент надо рендерить)."""
+
+    def __init__(self, name: str, *key):
+        self.key = (name, *key)
+        self.html = fragment_cache.get(self.key)
+
+    @property
+    def cached(self) -> bool:
+        return self.html is not None
+
+
+class FragmentCacheExtension(Extension):
+    """Тег {% cache fragment %} ... {% endcache %}: fragment — объект Fragment из роута."""
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        fragment = parser.parse_expression()
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(self.call_method("_render", [fragment]), [], [], body).set_lineno(lineno)
+
+    def _render(self, fragment: Fragment, caller):
+        name = str(fragment.key[0])
+        if fragment.html is not None:
+            FRAGMENT_CACHE.inc(1, name, "hit")
+            return fragment.html
+        FRAGMENT_CACHE.inc(1, name, "miss")
+        fragment.html = caller()
+        fragment_cache.set(fragment.key, fragment.html)
+        return fragment.html
+
+
+def setup_template_caches(env) -> None:
+    """Байткод на диске и тег {% cache %} для окружения Jinja2Templates."""
+    JINJA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    env.bytecode_cache = FileSystemBytecodeCache(str(JINJA_CACHE_DIR))
+    env.add_extension(FragmentCacheExtension)
+
+
+def precompile_templates(env) -> int:
+    """Загружает (компилирует или берёт из байткода) все .html-шаблоны. Возвращает их число."""
+    loaded = 0
+    for name in env.list_templates(extensions=["html"]):
+        try:
+            env.get_template(name)
+            loaded += 1
+        except TemplateError:
+            # Сломанный шаблон не должен ронять старт — ошибка всплывёт на его странице
+            logger.exception("Шаблон %s не компилируется", name)
+    return loaded
@@ -0,0 +1,61 @@
+# src/user_cache.py
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Снимок пользователя для кэша — не привязан к сессии SQLAlchemy."""
+    id: int
+    email: str
+    name: str
+    role: str
+
+    @classmethod
+    def from_model(cls, user) -> "CachedUser":
+        return cls(id=user.id, email=user.email, name=user.name, role=user.role)
+
+
+class UserCache:
+    """
+    Кэш пользователей на процесс: LRU + TTL, ключ — session["user_id"].
+
+    Каждый воркер uvicorn держит свою копию, поэтому после изменения
+    пользователя запись нужно сбросить через invalidate().
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[int, tuple[float, CachedUser]]" = OrderedDict()
+
+    def get(self, user_id: int) -> Optional[CachedUser]:
+        entry = self._data.get(user_id)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._data[user_id]
+            return None
+        self._data.move_to_end(user_id)
+        return user
+
+    def set(self, user: CachedUser) -> None:
+        self._data[user.id] = (time.monotonic() + self.ttl, user)
+        self._data.move_to_end(user.id)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        self._data.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+user_cache = UserCache()
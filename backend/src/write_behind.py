@@ -0,0 +1,287 @@
+# src/write_behind.py
+"""
+Отложенная запись сабмишенов тестов (write-behind).
+
+Тест проверяется в роуте, результат сразу уходит студенту, а строка
+Submission (и student_progress) пишется фоновой задачей пачками: одна
+транзакция на BATCH_SIZE сабмишенов или на всё, что накопилось за
+FLUSH_INTERVAL секунд. Когда сотни студентов сдают тест одновременно,
+это одна запись в SQLite вместо сотен конкурирующих коммитов.
+
+Выключено по умолчанию (QUIZ_WRITE_BEHIND=1 — включить): пока пачка не
+записана, студент, обновивший страницу, не видит своего сабмишена и
+прогресса. Включать под пиковую нагрузку (контрольная у всего потока).
+
+Надёжность:
+- каждый принятый сабмишен сначала дописывается строкой JSON в журнал
+  spool/submissions/<pid>.jsonl (write без fsync — падение процесса
+  переживает, данные остаются в page cache ОС);
+- перед сбросом пачки журнал переименовывается в <pid>.<seq>.flushing и
+  удаляется только после commit;
+- при остановке (shutdown) очередь сбрасывается до конца;
+- при старте журналы, оставшиеся от упавших процессов, досылаются в БД.
+  У каждой записи журнала свой attempt_id (уникальный в submissions):
+  если процесс упал между commit и удалением журнала, уже записанные
+  сабмишены при досылке пропускаются.
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from .database import AsyncSessionLocal
+from .models import Submission
+from .progress import record_submissions_batch
+
+logger = logging.getLogger(__name__)
+
+# QUIZ_WRITE_BEHIND=1 — писать сабмишены тестов пачками; по умолчанию — прямо в запросе
+WRITE_BEHIND_ENABLED = os.environ.get("QUIZ_WRITE_BEHIND", "0") == "1"
+SPOOL_DIR = Path(os.environ.get("SUBMISSION_SPOOL_DIR", "spool/submissions"))
+# Сбрасываем пачку, как только набралось столько сабмишенов...
+BATCH_SIZE = int(os.environ.get("SUBMISSION_BATCH_SIZE", 200))
+# ...или прошло столько секунд с первого несброшенного
+FLUSH_INTERVAL = float(os.environ.get("SUBMISSION_FLUSH_INTERVAL", 0.25))
+# Пауза перед повтором, если БД недоступна
+RETRY_DELAY = 1.0
+
+
+def _entry(assignment_id: int, student_id: int, grade: float, feedback: str, test_answers: str) -> dict:
+    return {
+        "attempt_id": uuid.uuid4().hex,
+        "assignment_id": assignment_id,
+        "student_id": student_id,
+        "grade": grade,
+        "feedback": feedback,
+        "test_answers": test_answers,
+        "submitted_at": datetime.utcnow().isoformat(),
+    }
+
+
+def _submission(entry: dict) -> Submission:
+    return Submission(
+        assignment_id=entry["assignment_id"],
+        student_id=entry["student_id"],
+        file_path=None,
+        status="reviewed",
+        feedback=entry["feedback"],
+        grade=entry["grade"],
+        test_answers=entry["test_answers"],
+        submitted_at=datetime.fromisoformat(entry["submitted_at"]),
+        attempt_id=entry.get("attempt_id"),  # в журналах до миграции 0005 ключа нет
+    )
+
+
+def _read_journal(path: Path) -> List[dict]:
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Недописанная последняя строка при падении
+                logger.warning("Пропущена битая строка журнала %s", path)
+    return entries
+
+
+class SubmissionWriteBehind:
+    """Очередь сабмишенов тестов + фоновая задача, пишущая их пачками."""
+
+    def __init__(
+        self,
+        session_factory,
+        spool_dir: Path = SPOOL_DIR,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+    ):
+        self.session_factory = session_factory
+        self.spool_dir = spool_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: List[dict] = []
+        self._journal = None
+        self._journal_path: Optional[Path] = None
+        self._seq = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.flushed = 0
+        self.batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        """Досылает журналы прошлых запусков и запускает фоновую задачу."""
+        if self.running:
+            return
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self._journal_path = self.spool_dir / f"{os.getpid()}.jsonl"
+        await self._recover()
+        self._journal = open(self._journal_path, "a", encoding="utf-8")
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def submit(self, assignment_id: int, student_id: int, grade: float, feedback: str, test_answers: str) -> None:
+        """Принимает проверенный сабмишен. Возвращается сразу, запись — в фоне."""
+        entry = _entry(assignment_id, student_id, grade, feedback, test_answers)
+        self._journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        self._pending.append(entry)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def stop(self) -> None:
+        """Сбрасывает всё накопленное и останавливает задачу (shutdown приложения)."""
+        if not self.running:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await self._task
+        except Exception:
+            logger.exception("Очередь не сброшена до конца, остаток — в журналах %s", self.spool_dir)
+        self._task = None
+        self._journal.close()
+        self._journal = None
+        # Всё записано — пустой журнал не нужен
+        if not self._pending and self._journal_path.stat().st_size == 0:
+            self._journal_path.unlink()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._pending:
+                await self._flush_pending()
+            if self._stopping and not self._pending:
+                return
+
+    def _rotate(self) -> Path:
+        """Текущий журнал → <pid>.<seq>.flushing, новые сабмишены идут в свежий файл."""
+        self._seq += 1
+        flushing = self.spool_dir / f"{os.getpid()}.{self._seq}.flushing"
+        self._journal.close()
+        os.replace(self._journal_path, flushing)
+        self._journal = open(self._journal_path, "a", encoding="utf-8")
+        return flushing
+
+    async def _flush_pending(self) -> None:
+        # Забираем всё накопленное: журнал после ротации содержит ровно эти записи
+        batch, self._pending = self._pending, []
+        flushing = self._rotate()
+        try:
+            await self._write(batch)
+        except Exception:
+            if self._stopping:
+                raise
+            # Журнал пачки остаётся на диске — её дошлёт следующий запуск
+            logger.exception("Пачка из %d сабмишенов оставлена в %s", len(batch), flushing)
+            return
+        flushing.unlink(missing_ok=True)
+
+    async def _write(self, batch: List[dict]) -> None:
+        """
+        Пишет пачку транзакциями по batch_size. Если БД недоступна (OperationalError) —
+        повторяем ту же часть; если часть нарушает ограничения — пишем её по одному.
+        """
+        for i in range(0, len(batch), self.batch_size):
+            chunk = batch[i:i + self.batch_size]
+            while True:
+                try:
+                    await self._write_chunk(chunk)
+                    break
+                except OperationalError:
+                    if self._stopping:
+                        raise
+                    logger.exception("Не удалось записать %d сабмишенов, повтор", len(chunk))
+                    await asyncio.sleep(RETRY_DELAY)
+                except IntegrityError:
+                    logger.exception("Пачка не записалась, пишем сабмишены по одному")
+                    for entry in chunk:
+                        await self._write_one(entry)
+                    break
+            self.flushed += len(chunk)
+            self.batches += 1
+
+    async def _write_chunk(self, chunk: List[dict]) -> None:
+        async with self.session_factory() as db:
+            # Досылка журнала после падения: часть пачки могла быть уже записана
+            keys = [entry["attempt_id"] for entry in chunk if entry.get("attempt_id")]
+            written = set((await db.scalars(
+                select(Submission.attempt_id).where(Submission.attempt_id.in_(keys))
+            )).all()) if keys else set()
+            if written:
+                logger.info("Пропущено уже записанных сабмишенов: %d", len(written))
+                chunk = [entry for entry in chunk if entry.get("attempt_id") not in written]
+                if not chunk:
+                    return
+            db.add_all([_submission(entry) for entry in chunk])
+            await db.flush()
+            await record_submissions_batch(
+                db, Counter((entry["student_id"], entry["assignment_id"]) for entry in chunk)
+            )
+            await db.commit()
+
+    async def _write_one(self, entry: dict) -> None:
+        try:
+            await self._write_chunk([entry])
+        except IntegrityError:
+            # Например, задание удалили, пока сабмишен ждал в очереди
+            logger.exception("Сабмишен отброшен: %s", entry)
+
+    async def _recover(self) -> None:
+        """
+        Журналы завершившихся процессов (в т.ч. с нашим pid — в контейнере он
+        повторяется). Файл сначала забираем себе (rename) — от гонки воркеров.
+        """
+        for path in sorted(self.spool_dir.iterdir()):
+            owner = _journal_owner(path)
+            if owner is None or (owner != os.getpid() and _alive(owner)):
+                continue
+            base = path.name.rsplit(".", 2)[0] if path.suffix == ".recovering" else path.name.replace(".", "-")
+            claimed = path.with_name(f"{base}.{os.getpid()}.recovering")
+            try:
+                os.replace(path, claimed)
+            except FileNotFoundError:
+                continue  # забрал другой воркер
+            entries = _read_journal(claimed)
+            if entries:
+                logger.warning("Досылаем %d сабмишенов из журнала %s", len(entries), path.name)
+                await self._write(entries)
+            claimed.unlink()
+
+
+def _journal_owner(path: Path) -> Optional[int]:
+    """pid процесса, который пишет (или досылает) журнал; None — не файл журнала."""
+    parts = path.name.split(".")
+    if parts[-1] not in ("jsonl", "flushing", "recovering"):
+        return None
+    owner = parts[-2] if parts[-1] == "recovering" else parts[0]
+    return int(owner) if owner.isdigit() else None
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+submission_queue = SubmissionWriteBehind(AsyncSessionLocal)
@@ -0,0 +1,110 @@
+# tests/conftest.py
+"""
+Общие фикстуры: приложение на временной БД с синтетикой.
+
+Модули backend.src читают окружение и относительные пути (db.sqlite,
+uploads/, spool/) при импорте, поэтому рабочий каталог и переменные
+окружения выставляются здесь, до первого импорта приложения.
+
+Запуск из корня репозитория:
+    python -m pytest -q
+"""
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import httpx
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+WORK_DIR = Path(tempfile.mkdtemp(prefix="educationplatform-tests-"))
+(WORK_DIR / "frontend").symlink_to(REPO_ROOT / "frontend")
+os.chdir(WORK_DIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{WORK_DIR / 'db.sqlite'}"
+os.environ.pop("DATABASE_REPLICA_URL", None)
+# Сабмишены тестов пишутся в запросе — их запросы к БД видны в счётчиках
+os.environ["QUIZ_WRITE_BEHIND"] = "0"
+
+from backend.src.seed_data import SyntheticConfig, seed_synthetic  # noqa: E402
+
+# Маленькая синтетика: несколько курсов, у заданий — сабмишены многих студентов
+DATASET = SyntheticConfig(students=80, teachers=2, courses=4, modules=10, courses_per_student=2.0, seed=7)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    os.chdir(REPO_ROOT)
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """Синхронный движок временной БД: схема миграциями и синтетика."""
+    from backend.src.database import engine
+    from backend.src.migrate import upgrade_database
+
+    upgrade_database(engine)
+    seed_synthetic(engine, DATASET)
+    return engine
+
+
+@pytest.fixture(scope="session")
+async def app(engine):
+    """Приложение с выполненными startup/shutdown (как под uvicorn)."""
+    from backend.src.main import app
+
+    async with app.router.lifespan_context(app):
+        yield app
+
+
+@pytest.fixture
+async def login(app):
+    """login(email, role) → httpx.AsyncClient с cookie сессии этого пользователя."""
+    clients = []
+
+    async def _login(email: str, role: str = "student") -> httpx.AsyncClient:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+        clients.append(client)
+        response = await client.post("/register", data={"email": email, "role": role})
+        assert response.status_code == 303, response.text
+        return client
+
+    yield _login
+    for client in clients:
+        await client.aclose()
+
+
+@pytest.fixture(scope="session")
+def busiest_assignment(engine):
+    """
+    Файловое задание, которое сдавало больше всего студентов, и один из них:
+    {"assignment_id", "module_id", "course_id", "student_id", "email", "submissions"}.
+    """
+    from sqlalchemy import select, func
+    from backend.src.models import Assignment, Module, Submission, User
+
+    with engine.connect() as conn:
+        assignment_id, module_id, course_id, submissions = conn.execute(
+            select(Assignment.id, Module.id, Module.course_id, func.count(Submission.id))
+            .join(Module, Module.id == Assignment.module_id)
+            .join(Submission, Submission.assignment_id == Assignment.id)
+            .where(Assignment.test_data.is_(None))
+            .group_by(Assignment.id, Module.id, Module.course_id)
+            .order_by(func.count(Submission.id).desc())
+            .limit(1)
+        ).one()
+        student_id, email = conn.execute(
+            select(User.id, User.email)
+            .join(Submission, Submission.student_id == User.id)
+            .where(Submission.assignment_id == assignment_id)
+            .limit(1)
+        ).one()
+    return {
+        "assignment_id": assignment_id, "module_id": module_id, "course_id": course_id,
+        "student_id": student_id, "email": email, "submissions": submissions,
+    }
@@ -0,0 +1,88 @@
+# tests/test_code_viewer.py
+"""
+Строки просмотра файла и строки подсветки делятся одинаково при любых концах
+строк; подсветка строится в отдельном процессе, вытесненная — это промах.
+"""
+import asyncio
+import hashlib
+
+import pytest
+
+from backend.src import code_viewer
+from backend.src.code_viewer import build_line_index, read_lines
+from backend.src.highlighter import HighlightCache, highlight_file
+from backend.src.models import Submission
+from backend.src.storage import blob_path
+
+MIXED = b"a = 1\r\nb = 2\rc = 3\nd = 4\r\r\ne = 5\r"
+EXPECTED = ["a = 1", "b = 2", "c = 3", "d = 4", "", "e = 5"]
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 2, 3, 7, 1024])
+def test_line_index_splits_on_lone_cr(tmp_path, monkeypatch, chunk_bytes):
+    # Маленькие куски: \r\n и одиночный \r попадают на границу куска
+    monkeypatch.setattr(code_viewer, "INDEX_CHUNK_BYTES", chunk_bytes)
+    path = tmp_path / "mixed.py"
+    path.write_bytes(MIXED)
+    assert len(build_line_index(path)) == len(EXPECTED)
+
+
+def test_highlight_lines_match_source_lines(tmp_path):
+    source = tmp_path / "main.py"
+    # Старый редактор (классический Mac OS) оставил одиночные \r посреди файла
+    source.write_bytes(b"".join(
+        b"x_%d = %d%s" % (i, i, b"\r" if i % 250 == 0 else b"\n") for i in range(1000)
+    ))
+    highlighted = tmp_path / "main.py.html"
+    assert highlight_file(str(source), str(highlighted), "main.py")
+
+    plain = read_lines(source, 1, count=2000)
+    html = read_lines(highlighted, 1, count=2000, max_bytes=16 * 1024 * 1024)
+    assert plain.total_lines == html.total_lines == 1000
+
+    mixed = tmp_path / "mixed.py"
+    mixed.write_bytes(MIXED)
+    assert [text for _, text in read_lines(mixed).lines] == EXPECTED
+    assert highlight_file(str(mixed), str(highlighted), "mixed.py")
+    assert read_lines(highlighted).total_lines == len(EXPECTED)
+
+
+def write_blob(content: bytes):
+    path = blob_path(hashlib.sha256(content).hexdigest())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return path
+
+
+@pytest.mark.anyio
+async def test_highlight_is_built_in_background_process(tmp_path):
+    cache = HighlightCache(tmp_path / "highlight")
+    blob = write_blob(b"def answer():\n    return 42\n")
+    try:
+        cache.schedule(blob, "answer.py")
+        for _ in range(600):
+            if cache.lookup(blob.name) is not None:
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        cache.shutdown()
+
+    highlighted = cache.lookup(blob.name)
+    assert highlighted is not None
+    assert read_lines(highlighted).total_lines == 2
+
+
+@pytest.mark.anyio
+async def test_evicted_highlight_is_a_miss(app, tmp_path, monkeypatch):
+    from backend.src import main
+
+    blob = write_blob(b"x = 1\ny = 2\n")
+    scheduled = []
+    # lookup нашёл файл, но evict удалил его до чтения
+    monkeypatch.setattr(main.highlight_cache, "lookup", lambda sha256: tmp_path / "evicted.html")
+    monkeypatch.setattr(main.highlight_cache, "schedule", lambda path, filename: scheduled.append(path))
+
+    page = await main.submission_code_page(Submission(file_path=str(blob), file_name="answer.py"))
+    assert [text for _, text in page.lines] == ["x = 1", "y = 2"]
+    assert not page.html
+    assert scheduled == [blob]
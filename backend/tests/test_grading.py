@@ -0,0 +1,79 @@
+# tests/test_grading.py
+"""Перепроверка теста обновляет оценки и рекомендации; битые ответы — 400 без текста исключений."""
+import time
+
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from backend.src.grading import regrade_assignment
+from backend.src.models import Assignment, Module, Submission, User
+from backend.src.recommendation_cache import recommendation_cache
+
+pytestmark = pytest.mark.anyio
+
+ITEMS = [{"id": 1, "title": "Курс", "reason": "Стартовый курс для всех", "tags": []}]
+
+
+@pytest.fixture
+def quiz(engine):
+    """Тест, который сдавало больше всего студентов: {"assignment_id", "course_id", "students", "email"}."""
+    with engine.connect() as conn:
+        assignment_id, course_id = conn.execute(
+            select(Assignment.id, Module.course_id)
+            .join(Module, Module.id == Assignment.module_id)
+            .join(Submission, Submission.assignment_id == Assignment.id)
+            .where(Assignment.test_data.is_not(None), Submission.test_answers.is_not(None))
+            .group_by(Assignment.id, Module.course_id)
+            .order_by(func.count(Submission.id).desc())
+            .limit(1)
+        ).one()
+        students = conn.scalars(
+            select(Submission.student_id).where(Submission.assignment_id == assignment_id).distinct()
+        ).all()
+        email = conn.scalar(select(User.email).where(User.id == students[0]))
+    return {"assignment_id": assignment_id, "course_id": course_id, "students": sorted(students), "email": email}
+
+
+async def test_regrade_restores_grades_from_answers(app, engine, quiz):
+    submissions = select(Submission.id, Submission.grade).where(Submission.assignment_id == quiz["assignment_id"])
+    with engine.connect() as conn:
+        expected = sorted(conn.execute(submissions).all())
+
+    with engine.begin() as conn:
+        # Оценки, которые не сходятся с ответами (например, старый ключ)
+        conn.execute(update(Submission).where(Submission.assignment_id == quiz["assignment_id"]).values(grade=-1))
+        result = regrade_assignment(conn, quiz["assignment_id"])
+    assert result.students == quiz["students"]
+
+    with engine.connect() as conn:
+        assert sorted(conn.execute(submissions).all()) == expected
+
+
+async def test_regrade_in_session_invalidates_recommendations(app, engine, quiz):
+    student_id = quiz["students"][0]
+    await recommendation_cache.set(student_id, "tfidf", ITEMS, time.time())
+
+    with Session(engine) as session:
+        regrade_assignment(session, quiz["assignment_id"])
+        # До commit рекомендации ещё действуют: перепроверку могут откатить
+        assert await recommendation_cache.get(student_id, "tfidf") == ITEMS
+        session.commit()
+    assert await recommendation_cache.get(student_id, "tfidf") is None
+
+
+@pytest.mark.parametrize("content, expected", [
+    ('{"answers": "0"}', "Ответы должны быть списком"),
+    ('{"answers": [0', "Некорректный JSON"),
+    ('{"answers": [0]}', "не совпадает с количеством вопросов"),
+    ('{"answers": []}', "Не переданы ответы"),
+])
+async def test_malformed_answers_are_bad_request(login, quiz, content, expected):
+    client = await login(quiz["email"])
+    response = await client.post(
+        f"/student/submit-test/{quiz['assignment_id']}",
+        content=content, headers={"content-type": "application/json"},
+    )
+    assert response.status_code == 400
+    assert expected in response.text
+    assert "Error" not in response.text
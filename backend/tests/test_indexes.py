@@ -0,0 +1,24 @@
+# tests/test_indexes.py
+"""Горячие запросы идут по индексам, которые создают миграции (EXPLAIN)."""
+import pytest
+
+from backend.src.database import create_db_engine
+from backend.src.migrate import check_indexes, upgrade_database
+
+
+@pytest.fixture
+def migrated_engine(tmp_path):
+    """Пустая БД, схема — только миграциями (без create_all)."""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'migrated.sqlite'}")
+    upgrade_database(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_hot_queries_use_indexes_after_migrations(migrated_engine):
+    assert check_indexes(migrated_engine) == {}
+
+
+def test_hot_queries_use_indexes_with_data(engine):
+    # На заполненных таблицах планировщик выбирает план заново
+    assert check_indexes(engine) == {}
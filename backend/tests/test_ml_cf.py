@@ -0,0 +1,47 @@
+# tests/test_ml_cf.py
+"""Сохранение item-item модели: версии целиком и атомарная смена текущей."""
+import numpy as np
+
+from backend.src.ml_cf import ItemItemModel, KEEP_VERSIONS, VERSIONS_DIR
+
+
+def make_model(seed: int) -> ItemItemModel:
+    rng = np.random.default_rng(seed)
+    item_ids = np.arange(1, 21, dtype=np.int64) * seed
+    neighbors = rng.integers(0, 20, size=(20, 5), dtype=np.int32)
+    weights = rng.random((20, 5), dtype=np.float32)
+    return ItemItemModel(item_ids, neighbors, weights)
+
+
+def assert_same(loaded: ItemItemModel, expected: ItemItemModel) -> None:
+    np.testing.assert_array_equal(loaded.item_ids, expected.item_ids)
+    np.testing.assert_array_equal(loaded.neighbors, expected.neighbors)
+    np.testing.assert_array_equal(loaded.weights, expected.weights)
+
+
+def test_load_without_model(tmp_path):
+    assert ItemItemModel.load(tmp_path) is None
+
+
+def test_save_switches_versions_as_a_whole(tmp_path):
+    first, second = make_model(1), make_model(2)
+    first_version = first.save(tmp_path)
+    opened = ItemItemModel.load(tmp_path)
+    assert opened.version == first_version
+    assert_same(opened, first)
+
+    second_version = second.save(tmp_path)
+    assert second_version != first_version
+    reloaded = ItemItemModel.load(tmp_path)
+    assert reloaded.version == second_version
+    assert_same(reloaded, second)
+    # Воркер со старой моделью продолжает читать её файлы
+    assert_same(opened, first)
+
+
+def test_old_versions_are_removed(tmp_path):
+    models = [make_model(seed) for seed in range(1, KEEP_VERSIONS + 3)]
+    for model in models:
+        model.save(tmp_path)
+    assert len(list((tmp_path / VERSIONS_DIR).iterdir())) == KEEP_VERSIONS
+    assert_same(ItemItemModel.load(tmp_path), models[-1])
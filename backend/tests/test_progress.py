@@ -0,0 +1,182 @@
+# tests/test_progress.py
+"""Прогресс по курсу считается одним агрегатным запросом, а не запросом на модуль."""
+import pytest
+from sqlalchemy import delete, insert, select
+
+from backend.src import progress
+from backend.src.database import AsyncReadSessionLocal, AsyncSessionLocal
+from backend.src.models import Assignment, Course, Enrollment, Module, StudentProgress, Submission
+from backend.src.progress import read_overall_progress, read_progress, record_submission, record_submissions_batch
+from backend.src.recommendation_cache import recommendation_cache
+from backend.src.services import course_progress
+from backend.src.sql_stats import assert_max_queries, track_queries
+from backend.src.template_cache import fragment_cache
+
+pytestmark = pytest.mark.anyio
+
+# Страница курса без сводки в кэше фрагментов: курс вместе с записью на него,
+# прогресс, статистика модулей, первый модуль, записи для рекомендаций
+COURSE_PAGE_QUERIES = 5
+
+
+def expected_progress(conn, user_id: int, course_id: int) -> dict:
+    """Тот же прогресс «в лоб» — по модулям в Python."""
+    modules = conn.execute(select(Module.id, Module.type).where(Module.course_id == course_id)).all()
+    assignment_modules = {m.id for m in modules if m.type == "assignment"}
+    completed = conn.scalars(
+        select(Assignment.module_id)
+        .join(Submission, Submission.assignment_id == Assignment.id)
+        .where(
+            Assignment.module_id.in_(assignment_modules),
+            Submission.student_id == user_id,
+            Submission.status == "reviewed",
+        )
+    ).all()
+    return {"progress": len(set(completed)), "total": len(assignment_modules)}
+
+
+async def test_course_progress_is_one_query(engine, busiest_assignment):
+    course_id = busiest_assignment["course_id"]
+    with engine.connect() as conn:
+        students = conn.scalars(
+            select(Enrollment.user_id).where(Enrollment.course_id == course_id, Enrollment.role == "student")
+        ).all()
+        expected = {user_id: expected_progress(conn, user_id, course_id) for user_id in students}
+    assert any(e["progress"] for e in expected.values())
+
+    async with AsyncReadSessionLocal() as db:
+        for user_id in students:
+            with track_queries() as stats:
+                summary = await course_progress(db, user_id, course_id)
+            assert stats.queries == 1
+            assert {"progress": summary["progress"], "total": summary["total"]} == expected[user_id]
+
+
+async def test_course_page_queries_do_not_grow_with_modules(engine, login, busiest_assignment):
+    data = busiest_assignment
+    client = await login(data["email"])
+    url = f"/student/course/{data['course_id']}"
+    # Оба замера — без готовых рекомендаций (с запросом записей на курсы) и сводки курса
+    recommendation_cache.invalidate(data["student_id"])
+    fragment_cache.clear()
+    with assert_max_queries(COURSE_PAGE_QUERIES) as before:
+        assert (await client.get(url)).status_code == 200
+
+    # Ещё пять заданий в курсе, все сданы и проверены: число запросов не должно измениться
+    with engine.begin() as conn:
+        module_ids = conn.execute(
+            insert(Module).returning(Module.id, sort_by_parameter_order=True),
+            [{"course_id": data["course_id"], "title": f"Доп. задание {i}", "type": "assignment", "order": 100 + i}
+             for i in range(5)],
+        ).scalars().all()
+        assignment_ids = conn.execute(
+            insert(Assignment).returning(Assignment.id, sort_by_parameter_order=True),
+            [{"module_id": module_id, "title": "Доп. задание"} for module_id in module_ids],
+        ).scalars().all()
+        conn.execute(insert(Submission), [
+            {"assignment_id": assignment_id, "student_id": data["student_id"], "status": "reviewed", "grade": 10}
+            for assignment_id in assignment_ids
+        ])
+    try:
+        recommendation_cache.invalidate(data["student_id"])
+        fragment_cache.clear()
+        with assert_max_queries(COURSE_PAGE_QUERIES) as after:
+            assert (await client.get(url)).status_code == 200
+    finally:
+        with engine.begin() as conn:
+            conn.execute(delete(Submission).where(Submission.assignment_id.in_(assignment_ids)))
+            conn.execute(delete(Assignment).where(Assignment.id.in_(assignment_ids)))
+            conn.execute(delete(Module).where(Module.id.in_(module_ids)))
+
+    assert after[0].queries == before[0].queries
+
+
+async def test_progress_total_follows_modules(engine, busiest_assignment):
+    data = busiest_assignment
+    user_id, course_id = data["student_id"], data["course_id"]
+    async with AsyncReadSessionLocal() as db:
+        before = await read_progress(db, user_id, course_id)
+        overall_before = await read_overall_progress(db, user_id)
+
+    # Задание добавили в курс студента, а его самого записали на новый курс
+    # с двумя заданиями — строки прогресса по новому курсу ещё нет
+    with engine.begin() as conn:
+        new_course_id = conn.execute(
+            insert(Course).returning(Course.id), {"title": "Новый курс"}
+        ).scalar_one()
+        module_ids = conn.execute(
+            insert(Module).returning(Module.id, sort_by_parameter_order=True),
+            [{"course_id": course_id, "title": "Новое задание", "type": "assignment", "order": 100}]
+            + [{"course_id": new_course_id, "title": f"Задание {i}", "type": "assignment", "order": i} for i in (1, 2)],
+        ).scalars().all()
+        conn.execute(insert(Enrollment), {"user_id": user_id, "course_id": new_course_id, "role": "student"})
+    try:
+        async with AsyncReadSessionLocal() as db:
+            after = await read_progress(db, user_id, course_id)
+            overall_after = await read_overall_progress(db, user_id)
+    finally:
+        with engine.begin() as conn:
+            conn.execute(delete(Enrollment).where(Enrollment.course_id == new_course_id))
+            conn.execute(delete(Module).where(Module.id.in_(module_ids)))
+            conn.execute(delete(Course).where(Course.id == new_course_id))
+
+    assert after == {"progress": before["progress"], "total": before["total"] + 1}
+    assert overall_after == {"progress": overall_before["progress"], "total": overall_before["total"] + 3}
+
+
+async def new_reviewed_submission(db, course_id: int, student_id: int) -> int:
+    """Новое задание в курсе и проверенный сабмишен студента (во flush). Возвращает id задания."""
+    module = Module(course_id=course_id, title="Новое задание", type="assignment", order=100)
+    db.add(module)
+    await db.flush()
+    assignment = Assignment(module_id=module.id, title="Новое задание")
+    db.add(assignment)
+    await db.flush()
+    db.add(Submission(assignment_id=assignment.id, student_id=student_id, status="reviewed", grade=100))
+    await db.flush()
+    return assignment.id
+
+
+async def completed(db, user_id: int, course_id: int) -> int:
+    return await db.scalar(select(StudentProgress.completed).where(
+        StudentProgress.user_id == user_id, StudentProgress.course_id == course_id
+    ))
+
+
+async def test_first_submission_survives_concurrent_insert(app, busiest_assignment, monkeypatch):
+    user_id, course_id = busiest_assignment["student_id"], busiest_assignment["course_id"]
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(StudentProgress).where(
+            StudentProgress.user_id == user_id, StudentProgress.course_id == course_id
+        ))
+        assignment_id = await new_reviewed_submission(db, course_id, user_id)
+        expected = await course_progress(db, user_id, course_id)
+
+        # Параллельный первый сабмишен вставил строку раньше нас и нашего сабмишена не видел
+        async def racing_course_progress(db, user_id, course_id):
+            await db.execute(insert(StudentProgress).values(
+                user_id=user_id, course_id=course_id, completed=expected["progress"] - 1, total=expected["total"]
+            ))
+            return expected
+
+        monkeypatch.setattr(progress, "course_progress", racing_course_progress)
+        await record_submission(db, user_id, assignment_id, newly_reviewed=True)
+        assert await completed(db, user_id, course_id) == expected["progress"]
+        await db.rollback()
+
+
+async def test_batch_creates_missing_rows_and_increments_existing(app, busiest_assignment):
+    user_id, course_id = busiest_assignment["student_id"], busiest_assignment["course_id"]
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(StudentProgress).where(
+            StudentProgress.user_id == user_id, StudentProgress.course_id == course_id
+        ))
+        first = await new_reviewed_submission(db, course_id, user_id)
+        await record_submissions_batch(db, {(user_id, first): 1})
+        expected = (await course_progress(db, user_id, course_id))["progress"]
+        assert await completed(db, user_id, course_id) == expected
+
+        second = await new_reviewed_submission(db, course_id, user_id)
+        await record_submissions_batch(db, {(user_id, second): 1})
+        assert await completed(db, user_id, course_id) == expected + 1
+        await db.rollback()
@@ -0,0 +1,108 @@
+# tests/test_query_budgets.py
+"""
+Бюджеты SQL-запросов горячих страниц: N+1 или лишний запрос в роуте
+валит тест со списком запросов. Страница курса и модуля — в test_progress
+и test_submissions (там же проверка, что число запросов не растёт с данными).
+"""
+import json
+import re
+from urllib.parse import unquote
+
+import pytest
+from sqlalchemy import delete, func, select, update
+
+from backend.src.models import Assignment, Enrollment, Module, StudentProgress, Submission, User
+from backend.src.recommendation_cache import recommendation_cache
+from backend.src.sql_stats import assert_max_queries
+
+pytestmark = pytest.mark.anyio
+
+TEACHER_EMAIL = "load-teacher-0@load.test"
+CURSOR_RE = re.compile(r"/teacher/queue\?cursor=([^&\"']+)")
+REVIEW_RE = re.compile(r"/teacher/review/(\d+)")
+
+# Кабинет студента: его курсы, общий прогресс, записи для рекомендаций
+STUDENT_DASHBOARD_QUERIES = 3
+# Задание: задание, сабмишен студента
+ASSIGNMENT_PAGE_QUERIES = 2
+# Кабинет преподавателя: первая страница очереди, число ожидающих, курсы для фильтра
+TEACHER_DASHBOARD_QUERIES = 3
+# Следующая страница очереди — только сама страница
+QUEUE_PAGE_QUERIES = 1
+# Проверка сабмишена: сабмишен вместе с заданием и студентом
+REVIEW_PAGE_QUERIES = 1
+# Ответы на тест: задание, вставка сабмишена и record_submission — курс
+# задания, был ли тест уже сдан, UPDATE строки прогресса
+SUBMIT_TEST_QUERIES = 5
+
+
+async def test_student_pages(login, busiest_assignment):
+    data = busiest_assignment
+    client = await login(data["email"])
+
+    # Без готовых рекомендаций — самый дорогой вариант кабинета
+    recommendation_cache.invalidate(data["student_id"])
+    with assert_max_queries(STUDENT_DASHBOARD_QUERIES):
+        assert (await client.get("/student/dashboard")).status_code == 200
+    with assert_max_queries(ASSIGNMENT_PAGE_QUERIES):
+        assert (await client.get(f"/student/assignment/{data['assignment_id']}")).status_code == 200
+
+
+async def test_teacher_pages(login):
+    client = await login(TEACHER_EMAIL, "teacher")
+
+    with assert_max_queries(TEACHER_DASHBOARD_QUERIES):
+        response = await client.get("/teacher/dashboard")
+    assert response.status_code == 200
+    cursor = CURSOR_RE.search(response.text)
+    review = REVIEW_RE.search(response.text)
+    assert cursor and review
+
+    with assert_max_queries(QUEUE_PAGE_QUERIES):
+        assert (await client.get("/teacher/queue", params={"cursor": unquote(cursor.group(1))})).status_code == 200
+    with assert_max_queries(REVIEW_PAGE_QUERIES):
+        assert (await client.get(f"/teacher/review/{review.group(1)}")).status_code == 200
+
+
+async def test_submit_test(engine, login):
+    # Студент пересдаёт тест теми же ответами, что уже сдавал
+    with engine.connect() as conn:
+        assignment_id, course_id, student_id, email, answers = conn.execute(
+            select(Assignment.id, Module.course_id, User.id, User.email, Submission.test_answers)
+            .join(Module, Module.id == Assignment.module_id)
+            .join(Submission, Submission.assignment_id == Assignment.id)
+            .join(User, User.id == Submission.student_id)
+            .where(Submission.test_answers.is_not(None))
+            .limit(1)
+        ).one()
+        last_id = conn.scalar(select(func.max(Submission.id)))
+        progress = StudentProgress.__table__
+        row = progress.c.user_id == student_id, progress.c.course_id == course_id
+        saved = conn.execute(select(progress.c.completed, progress.c.last_activity).where(*row)).one()
+    client = await login(email)
+
+    try:
+        with assert_max_queries(SUBMIT_TEST_QUERIES):
+            response = await client.post(f"/student/submit-test/{assignment_id}", json={"answers": json.loads(answers)})
+        assert response.status_code == 200, response.text
+    finally:
+        with engine.begin() as conn:
+            conn.execute(delete(Submission).where(Submission.id > last_id))
+            conn.execute(update(progress).where(*row).values(**saved._mapping))
+
+
+async def test_pages_redirect_students_not_enrolled(engine, login, busiest_assignment):
+    data = busiest_assignment
+    # Студент, не записанный на курс
+    with engine.connect() as conn:
+        email = conn.scalar(
+            select(User.email).where(
+                User.role == "student",
+                ~User.id.in_(select(Enrollment.user_id).where(Enrollment.course_id == data["course_id"])),
+            ).limit(1)
+        )
+    outsider = await login(email)
+    course_url = f"/student/course/{data['course_id']}"
+    assert (await outsider.get(course_url)).headers["location"] == "/"
+    assert (await outsider.get(f"{course_url}/module/{data['module_id']}")).headers["location"] == "/student/courses"
+    assert (await outsider.get(f"{course_url}/module/0")).headers["location"] == "/student/courses"
@@ -0,0 +1,84 @@
+# tests/test_recommendation_cache.py
+"""Кэш рекомендаций: любой k из одного списка, инвалидация видна другим воркерам."""
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import select
+
+from backend.src.database import AsyncReadSessionLocal
+from backend.src.ml_recommender import recommendations_for_user, recommender
+from backend.src.models import Enrollment
+from backend.src.recommendation_cache import LOCAL_TTL, RecommendationCache, SQLiteTier, recommendation_cache
+
+pytestmark = pytest.mark.anyio
+
+ITEMS = [{"id": 1, "title": "Курс", "reason": "Стартовый курс для всех", "tags": []}]
+
+
+async def test_cached_list_serves_larger_k(app, busiest_assignment):
+    student_id = busiest_assignment["student_id"]
+    async with AsyncReadSessionLocal() as db:
+        course_ids = (await db.scalars(select(Enrollment.course_id).where(Enrollment.user_id == student_id))).all()
+        expected = recommender.recommend_for_user(list(course_ids), k=2)
+        assert len(expected) == 2
+
+        recommendation_cache.invalidate(student_id)
+        assert len(await recommendations_for_user(db, student_id, k=1)) == 1
+        # Второй вызов — из кэша, но с полным списком, а не с одним закэшированным
+        assert await recommendations_for_user(db, student_id, k=2) == expected
+    assert recommendation_cache.hits > 0
+
+
+def workers(tmp_path, poll_interval: float = 0):
+    """Два «воркера»: у каждого свой первый уровень, второй — общий файл."""
+    path = str(tmp_path / "recommendations.sqlite")
+    return (
+        RecommendationCache(tier2=SQLiteTier(path), poll_interval=poll_interval),
+        RecommendationCache(tier2=SQLiteTier(path), poll_interval=poll_interval),
+    )
+
+
+async def test_invalidation_reaches_other_worker(tmp_path):
+    first, second = workers(tmp_path)
+    await first.set(7, "tfidf", ITEMS, time.time())
+    assert await second.get(7, "tfidf") == ITEMS  # из второго уровня в первый уровень second
+
+    # Commit в first: событие ORM видит только он. Вне event loop запись во второй уровень синхронная
+    await asyncio.to_thread(first.invalidate, 7)
+    assert await second.get(7, "tfidf") is None
+
+    await second.set(8, "tfidf", ITEMS, time.time())
+    await asyncio.to_thread(first.clear)
+    assert await second.get(8, "tfidf") is None
+
+
+async def test_list_computed_before_invalidation_is_not_served(tmp_path):
+    first, second = workers(tmp_path)
+    computed_at = time.time()  # second прочитал записи на курсы...
+    await asyncio.to_thread(first.invalidate, 7)  # ...first закоммитил запись на курс...
+    await second.set(7, "tfidf", ITEMS, computed_at)  # ...second кэширует устаревший список
+    assert await second.get(7, "tfidf") is None
+    assert await first.get(7, "tfidf") is None
+
+
+def test_local_only_cache_has_short_ttl():
+    assert RecommendationCache().ttl == LOCAL_TTL
+
+
+async def test_first_level_hit_does_not_touch_tier2(tmp_path, monkeypatch):
+    first, second = workers(tmp_path, poll_interval=3600)
+    await second.set(7, "tfidf", ITEMS, time.time())
+    await second.get(7, "tfidf")  # первый опрос журнала
+
+    async def no_io(*args):
+        raise AssertionError("обращение ко второму уровню при попадании в первый")
+
+    monkeypatch.setattr(asyncio, "to_thread", no_io)
+    assert await second.get(7, "tfidf") == ITEMS
+    monkeypatch.undo()
+
+    # Чужая инвалидация видна после следующего опроса журнала
+    await asyncio.to_thread(first.invalidate, 7)
+    second._next_poll = 0.0
+    assert await second.get(7, "tfidf") is None
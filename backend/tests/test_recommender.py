@@ -0,0 +1,67 @@
+# tests/test_recommender.py
+"""Индекс рекомендаций: строится при старте, изменения курсов подтягивает из БД."""
+import asyncio
+
+import pytest
+from sqlalchemy import delete, insert, select, update
+
+from backend.src.database import AsyncSessionLocal
+from backend.src.ml_recommender import recommender
+from backend.src.models import Course
+
+pytestmark = pytest.mark.anyio
+
+
+def indexed_title(course_id):
+    return recommender._current().titles.get(course_id)
+
+
+async def test_index_is_built_at_startup(app, engine):
+    assert recommender.loaded
+    with engine.connect() as conn:
+        total = conn.execute(select(Course.id)).all()
+    assert len(recommender._current().course_ids) == len(total)
+    # Каталог не менялся — синхронизация ничего не пересобирает
+    assert not await asyncio.to_thread(recommender.sync, engine)
+
+
+async def test_sync_picks_up_changes_from_other_processes(app, engine):
+    # Изменения через Core, без событий ORM — как из другого воркера или скрипта
+    with engine.begin() as conn:
+        course_id = conn.execute(
+            insert(Course).returning(Course.id), {"title": "Маркшейдерское дело", "tags": "горное дело"}
+        ).scalar_one()
+    try:
+        assert await asyncio.to_thread(recommender.sync, engine)
+        assert indexed_title(course_id) == "Маркшейдерское дело"
+
+        with engine.begin() as conn:
+            conn.execute(update(Course).where(Course.id == course_id).values(title="Маркшейдерия"))
+        assert await asyncio.to_thread(recommender.sync, engine)
+        assert indexed_title(course_id) == "Маркшейдерия"
+    finally:
+        with engine.begin() as conn:
+            conn.execute(delete(Course).where(Course.id == course_id))
+    assert await asyncio.to_thread(recommender.sync, engine)
+    assert indexed_title(course_id) is None
+
+
+async def test_orm_commit_wakes_background_sync(app, engine):
+    index = recommender._current()
+    async with AsyncSessionLocal() as db:
+        course = Course(title="Буровзрывные работы", tags="горное дело")
+        db.add(course)
+        await db.commit()
+        course_id = course.id
+    try:
+        # Commit не ждёт пересборки: запросы до неё отвечают по прежнему индексу
+        assert course_id not in index.titles
+        for _ in range(100):
+            if indexed_title(course_id) is not None:
+                break
+            await asyncio.sleep(0.02)
+        assert indexed_title(course_id) == "Буровзрывные работы"
+    finally:
+        with engine.begin() as conn:
+            conn.execute(delete(Course).where(Course.id == course_id))
+        await asyncio.to_thread(recommender.sync, engine)
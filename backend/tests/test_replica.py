@@ -0,0 +1,38 @@
+# tests/test_replica.py
+"""Читающие страницы при отстающей реплике: сессия только что созданного пользователя не теряется."""
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from backend.src.database import create_async_db_engine, create_db_engine, get_read_db
+from backend.src.migrate import upgrade_database
+from backend.src.user_cache import user_cache
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def lagging_replica(app, tmp_path):
+    """get_read_db на пустой БД со схемой — реплика, до которой ещё не дошли записи."""
+    url = f"sqlite:///{tmp_path / 'replica.sqlite'}"
+    engine = create_db_engine(url)
+    upgrade_database(engine)
+    engine.dispose()
+    replica = create_async_db_engine(url, read_only=True)
+    sessions = async_sessionmaker(bind=replica, autoflush=False, expire_on_commit=False)
+
+    async def get_lagging_db():
+        async with sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_read_db] = get_lagging_db
+    yield
+    del app.dependency_overrides[get_read_db]
+    await replica.dispose()
+
+
+async def test_new_user_is_found_on_primary(lagging_replica, login):
+    client = await login("replica-lag@test.example")
+    # Следующий запрос обслуживает другой воркер — в его кэше пользователя нет
+    user_cache.clear()
+    response = await client.get("/student/dashboard")
+    assert response.status_code == 200
@@ -0,0 +1,62 @@
+# tests/test_search.py
+"""Поиск по каталогу: FTS5 (SQLite) и запасной ILIKE для других СУБД."""
+import pytest
+from sqlalchemy import delete, insert
+
+from backend.src.database import AsyncReadSessionLocal
+from backend.src.models import Course
+from backend.src.search import search_courses, search_courses_like
+
+pytestmark = pytest.mark.anyio
+
+COURSES = [
+    {"title": "Геология для горняков", "description": "Породы и минералы", "tags": "geology", "author": "Иванов"},
+    {"title": "Охрана труда", "description": "Техника безопасности в шахте", "tags": "охрана труда,геология", "author": "Петров"},
+    {"title": "Скидка 100% на Python", "description": "Курс по Python", "tags": "python", "author": "Сидоров"},
+    {"title": "Основы SQL", "description": "SELECT, JOIN, индексы", "tags": "sql_basics", "author": "Иванов"},
+]
+
+
+@pytest.fixture
+def catalog(engine, app):
+    """Курсы с известными словами; app — чтобы по завершении сессии закрылись асинхронные движки."""
+    with engine.begin() as conn:
+        ids = conn.execute(
+            insert(Course).returning(Course.id, sort_by_parameter_order=True), COURSES
+        ).scalars().all()
+    yield dict(zip((c["title"] for c in COURSES), ids))
+    with engine.begin() as conn:
+        conn.execute(delete(Course).where(Course.id.in_(ids)))
+
+
+async def titles(search, q, limit=20):
+    async with AsyncReadSessionLocal() as db:
+        return [course.title for course in await search(db, q, limit)]
+
+
+async def test_fts_ranks_title_above_tags(catalog):
+    # «геолог» в названии первого курса и только в тегах второго
+    assert await titles(search_courses, "геолог") == ["Геология для горняков", "Охрана труда"]
+    assert await titles(search_courses, "геолог", limit=1) == ["Геология для горняков"]
+
+
+async def test_fts_ignores_query_syntax(catalog):
+    # Кавычки, ^ и скобки из ввода не ломают MATCH
+    assert await titles(search_courses, 'индексы" ^ (') == ["Основы SQL"]
+    assert await titles(search_courses, "***") == []
+
+
+async def test_like_fallback_searches_fts_columns(catalog):
+    # Автор и теги — как в FTS, а не только название и описание.
+    # lower() в SQLite понимает только ASCII — кириллица здесь в исходном регистре
+    assert await titles(search_courses_like, "Петров") == ["Охрана труда"]
+    assert await titles(search_courses_like, "SQL_BASICS") == ["Основы SQL"]
+    # Все слова запроса должны найтись
+    assert await titles(search_courses_like, "Иванов sql") == ["Основы SQL"]
+
+
+async def test_like_fallback_escapes_wildcards(catalog):
+    assert await titles(search_courses_like, "100%") == ["Скидка 100% на Python"]
+    # _ и % из ввода — обычные символы, а не «любой символ»
+    assert await titles(search_courses_like, "s_l") == []
+    assert await titles(search_courses_like, "%") == ["Скидка 100% на Python"]
@@ -0,0 +1,38 @@
+# tests/test_seed_data.py
+"""Синтетика наполняется одной транзакцией: упавший запуск можно просто повторить."""
+import pytest
+from sqlalchemy import func, select
+
+from backend.src import seed_data
+from backend.src.database import create_db_engine
+from backend.src.migrate import upgrade_database
+from backend.src.models import StudentProgress, Submission, User
+
+CONFIG = seed_data.SyntheticConfig(students=20, teachers=2, courses=3, modules=5)
+
+
+@pytest.fixture
+def empty_engine(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'seed.sqlite'}")
+    upgrade_database(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_failed_seed_leaves_nothing_and_reruns(empty_engine, monkeypatch):
+    def failing_rebuild(conn):
+        raise RuntimeError("сбой в конце наполнения")
+
+    monkeypatch.setattr(seed_data, "rebuild_progress", failing_rebuild)
+    with pytest.raises(RuntimeError):
+        seed_data.seed_synthetic(empty_engine, CONFIG)
+    with empty_engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(User)) == 0
+
+    monkeypatch.undo()
+    assert seed_data.seed_synthetic(empty_engine, CONFIG)
+    assert not seed_data.seed_synthetic(empty_engine, CONFIG)
+    with empty_engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(StudentProgress)) > 0
+        grades = conn.scalars(select(Submission.grade).where(Submission.grade.is_not(None))).all()
+    assert grades and all(type(grade) is int for grade in grades)
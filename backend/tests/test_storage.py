@@ -0,0 +1,57 @@
+# tests/test_storage.py
+"""Хранилище блобов: повторная отправка защищает блоб от gc."""
+import hashlib
+import os
+import time
+
+import pytest
+
+from backend.src.storage import ReceivedUpload, _remove_blob, blob_path, collect_garbage, store_blob
+
+pytestmark = pytest.mark.anyio
+
+CONTENT = b"print('hello')\n"
+GRACE = 3600
+
+
+def upload_in(tmp_path, content: bytes = CONTENT) -> ReceivedUpload:
+    (tmp_path / ".tmp").mkdir(exist_ok=True)
+    part = tmp_path / ".tmp" / f"{time.monotonic_ns()}.part"
+    part.write_bytes(content)
+    return ReceivedUpload(part, "main.py", len(content), hashlib.sha256(content).hexdigest())
+
+
+def make_old(path) -> None:
+    old = time.time() - 2 * GRACE
+    os.utime(path, (old, old))
+
+
+async def test_duplicate_upload_refreshes_blob_mtime(tmp_path, engine):
+    blob_dir = tmp_path / "blobs"
+    path, created = await store_blob(upload_in(tmp_path), blob_dir)
+    assert created
+    make_old(path)
+    # Блоб без ссылок и старше grace — кандидат на удаление (dry_run: общую БД тестов не меняем)
+    assert collect_garbage(engine, blob_dir, grace_seconds=GRACE, dry_run=True)["removed"] == 1
+
+    duplicate = upload_in(tmp_path)
+    same_path, created = await store_blob(duplicate, blob_dir)
+    assert (same_path, created) == (path, False)
+    assert not duplicate.tmp_path.exists()
+    # Сабмишен с новой ссылкой ещё не закоммичен — gc блоб не трогает
+    assert collect_garbage(engine, blob_dir, grace_seconds=GRACE, dry_run=True)["removed"] == 0
+
+
+def test_gc_keeps_blob_touched_after_its_check(tmp_path):
+    path = blob_path(hashlib.sha256(CONTENT).hexdigest(), tmp_path)
+    path.parent.mkdir(parents=True)
+    path.write_bytes(CONTENT)
+    deadline = time.time() - GRACE
+
+    # gc уже решил, что блоб старый, а store_blob успел обновить mtime
+    assert not _remove_blob(path, deadline)
+    assert path.read_bytes() == CONTENT
+
+    make_old(path)
+    assert _remove_blob(path, deadline)
+    assert not path.exists() and not list(path.parent.iterdir())
@@ -0,0 +1,93 @@
+# tests/test_submissions.py
+"""
+Сабмишен текущего студента ищется фильтром в SQL — чужие сабмишены не
+загружаются; ошибка записи загруженного файла не уходит клиенту.
+"""
+import pytest
+from sqlalchemy import delete, insert, select
+
+from sqlalchemy.orm import Session
+
+from backend.src.database import AsyncReadSessionLocal
+from backend.src.models import Submission, User
+from backend.src.services import get_student_submission
+from backend.src.sql_stats import assert_max_queries, track_queries
+from backend.src.template_cache import fragment_cache
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_get_student_submission_loads_one_row(app, busiest_assignment):
+    data = busiest_assignment
+    # Иначе тест ничего не проверяет: у задания должны быть сабмишены других студентов
+    assert data["submissions"] > 1
+
+    async with AsyncReadSessionLocal() as db:
+        with track_queries() as stats:
+            submission = await get_student_submission(db, data["assignment_id"], data["student_id"])
+
+    assert submission is not None
+    assert submission.student_id == data["student_id"]
+    assert stats.queries == 1
+    assert stats.rows == 1
+
+
+async def test_rows_are_counted_on_sync_engine(engine, busiest_assignment):
+    # У синхронного драйвера нет буфера строк до чтения результата — считает Session
+    with Session(engine) as db, track_queries() as stats:
+        submissions = db.scalars(
+            select(Submission).where(Submission.assignment_id == busiest_assignment["assignment_id"])
+        ).all()
+
+    assert stats.queries == 1
+    assert stats.rows == len(submissions) == busiest_assignment["submissions"]
+
+
+async def test_module_page_rows_do_not_grow_with_other_submissions(engine, login, busiest_assignment):
+    data = busiest_assignment
+    client = await login(data["email"])
+    url = f"/student/course/{data['course_id']}/module/{data['module_id']}"
+
+    # Оба замера — без навигации в кэше фрагментов (со списком модулей)
+    fragment_cache.clear()
+    with assert_max_queries(6) as before:
+        assert (await client.get(url)).status_code == 200
+
+    # Ещё по сабмишену от каждого другого студента — страница должна прочитать столько же строк
+    with engine.begin() as conn:
+        others = conn.scalars(select(User.id).where(User.role == "student", User.id != data["student_id"])).all()
+        conn.execute(insert(Submission), [
+            {"assignment_id": data["assignment_id"], "student_id": student_id, "status": "pending", "grade": 0}
+            for student_id in others
+        ])
+    try:
+        fragment_cache.clear()
+        with assert_max_queries(6) as after:
+            assert (await client.get(url)).status_code == 200
+    finally:
+        with engine.begin() as conn:
+            conn.execute(delete(Submission).where(
+                Submission.assignment_id == data["assignment_id"],
+                Submission.student_id.in_(others),
+                Submission.file_path.is_(None),
+                Submission.test_answers.is_(None),
+            ))
+
+    assert after[0].rows == before[0].rows
+
+
+async def test_upload_failure_does_not_leak_details(login, busiest_assignment, monkeypatch):
+    from backend.src import main
+
+    async def failing_store_blob(upload):
+        raise OSError(28, "No space left on device", "/srv/uploads/blobs/secret")
+
+    monkeypatch.setattr(main, "store_blob", failing_store_blob)
+    client = await login(busiest_assignment["email"])
+    response = await client.post(
+        f"/student/submit/{busiest_assignment['assignment_id']}",
+        files={"file": ("solution.py", b"print(1)\n", "text/x-python")},
+    )
+    assert response.status_code == 500
+    assert "/srv/uploads" not in response.text
+    assert "No space left" not in response.text
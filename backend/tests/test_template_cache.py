@@ -0,0 +1,60 @@
+# tests/test_template_cache.py
+"""
+Сводка курса и навигация по модулям берутся из кэша фрагментов без своих
+запросов и обновляются, когда меняются модули курса.
+"""
+import re
+
+import pytest
+from sqlalchemy.orm import Session
+
+from backend.src.models import Module
+from backend.src.recommendation_cache import recommendation_cache
+from backend.src.sql_stats import assert_max_queries
+from backend.src.template_cache import fragment_cache
+
+pytestmark = pytest.mark.anyio
+
+ASSIGNMENTS_RE = re.compile(r'(\d+)</h5>\s*<p class="card-text mb-0">Практик')
+# Страница курса со сводкой в кэше: курс вместе с записью на него, прогресс, записи для рекомендаций
+CACHED_COURSE_PAGE_QUERIES = 3
+# Страница модуля с навигацией в кэше: модуль вместе с записью на курс, сабмишен студента
+CACHED_MODULE_PAGE_QUERIES = 2
+
+
+async def test_course_summary_is_cached_by_course_version(engine, login, busiest_assignment):
+    data = busiest_assignment
+    client = await login(data["email"])
+    url = f"/student/course/{data['course_id']}"
+    fragment_cache.clear()
+    first = await client.get(url)
+    assignments = int(ASSIGNMENTS_RE.search(first.text).group(1))
+
+    recommendation_cache.invalidate(data["student_id"])
+    with assert_max_queries(CACHED_COURSE_PAGE_QUERIES):
+        cached = await client.get(url)
+    assert ASSIGNMENTS_RE.search(cached.text).group(1) == str(assignments)
+
+    # Новый модуль меняет версию курса — сводка рендерится заново
+    with Session(engine) as session:
+        module = Module(course_id=data["course_id"], title="Доп. задание", type="assignment", order=100)
+        session.add(module)
+        session.commit()
+        try:
+            response = await client.get(url)
+        finally:
+            session.delete(module)
+            session.commit()
+    assert ASSIGNMENTS_RE.search(response.text).group(1) == str(assignments + 1)
+
+
+async def test_module_nav_is_cached(login, busiest_assignment):
+    data = busiest_assignment
+    client = await login(data["email"])
+    url = f"/student/course/{data['course_id']}/module/{data['module_id']}"
+    fragment_cache.clear()
+    first = await client.get(url)
+
+    with assert_max_queries(CACHED_MODULE_PAGE_QUERIES):
+        cached = await client.get(url)
+    assert cached.text == first.text
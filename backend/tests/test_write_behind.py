@@ -0,0 +1,45 @@
+# tests/test_write_behind.py
+"""Досылка журнала отложенной записи после падения не создаёт дублей сабмишенов."""
+import json
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from backend.src.database import AsyncSessionLocal
+from backend.src.models import Submission
+from backend.src.write_behind import SubmissionWriteBehind, _entry
+
+pytestmark = pytest.mark.anyio
+
+# pid процесса, которого точно нет: его журналы досылает любой воркер
+DEAD_PID = 2 ** 22 + 1
+
+
+async def test_replayed_journal_skips_committed_entries(app, engine, tmp_path):
+    with engine.connect() as conn:
+        assignment_id, student_id = conn.execute(
+            select(Submission.assignment_id, Submission.student_id)
+            .where(Submission.test_answers.is_not(None))
+            .limit(1)
+        ).one()
+    entries = [_entry(assignment_id, student_id, 50, "Тест пройден.", "[]") for _ in range(3)]
+    keys = [entry["attempt_id"] for entry in entries]
+    queue = SubmissionWriteBehind(AsyncSessionLocal, spool_dir=tmp_path)
+
+    # Процесс записал пачку и упал, не удалив её журнал
+    await queue._write(entries[:2])
+    (tmp_path / f"{DEAD_PID}.1.flushing").write_text(
+        "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries), encoding="utf-8"
+    )
+    try:
+        await queue.start()
+        await queue.stop()
+        with engine.connect() as conn:
+            written = conn.scalar(
+                select(func.count()).select_from(Submission).where(Submission.attempt_id.in_(keys))
+            )
+        assert written == len(entries)
+        assert not list(tmp_path.glob("*.flushing"))
+    finally:
+        with engine.begin() as conn:
+            conn.execute(delete(Submission).where(Submission.attempt_id.in_(keys)))